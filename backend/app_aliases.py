@@ -2,11 +2,11 @@
 
 from __future__ import annotations
 
-import json
-import os
 from typing import Dict, List, Optional
 
-APP_INDEX_PATH = os.path.join(os.path.dirname(__file__), "app_index.json")
+from .app_index import DEFAULT_PATH, get_app_index
+
+APP_INDEX_PATH = DEFAULT_PATH
 
 
 def _normalize(text: str) -> str:
@@ -25,16 +25,11 @@ def load_app_index() -> Dict[str, str]:
           ...
         }
 
-    Keys are normalized app "display names" (lowercased).
+    Keys are normalized app "display names" (lowercased). Shared with
+    mac_actions and discover_apps through backend.app_index: parsed once,
+    re-read only when the file changes. Treat the dict as read-only.
     """
-    if not os.path.exists(APP_INDEX_PATH):
-        return {}
-
-    with open(APP_INDEX_PATH, "r") as f:
-        data = json.load(f)
-
-    # ensure keys are normalized
-    return {_normalize(name): path for name, path in data.items()}
+    return get_app_index(APP_INDEX_PATH).get()
 
 
 def resolve_app_candidates(user_query: str) -> List[str]:
@@ -50,49 +45,16 @@ def resolve_app_candidates(user_query: str) -> List[str]:
 
       ['Microsoft Word', 'Microsoft Excel', 'Microsoft PowerPoint']
 
-    The matching is purely data-driven from app_index.json.
-    No app names are hardcoded.
+    The matching is purely data-driven from app_index.json (ranked by
+    .app_matcher). No app names are hardcoded.
     """
     query = _normalize(user_query)
     if not query:
         return []
 
-    index = load_app_index()
-    candidates: List[str] = []
-
-    for norm_name in index.keys():
-        full = norm_name  # already normalized
-        words = full.split()
-
-        # full match
-        if query == full:
-            candidates.append(full)
-            continue
-
-        # query matches a whole word exactly: "chrome" in "google chrome"
-        if query in words:
-            candidates.append(full)
-            continue
-
-        # query is a prefix of the full name: "google" -> "google chrome"
-        if full.startswith(query + " "):
-            candidates.append(full)
-            continue
-
-        # query is a prefix of any word: "vis" -> "visual studio code"
-        if any(w.startswith(query) for w in words):
-            candidates.append(full)
-            continue
-
-    # deduplicate while preserving order
-    seen = set()
-    unique: List[str] = []
-    for name in candidates:
-        if name not in seen:
-            seen.add(name)
-            unique.append(name)
-
-    return unique
+    # Same ranking as mac_actions.open_app: best first, typos only when
+    # nothing matches as typed.
+    return [name for name, _ in get_app_index(APP_INDEX_PATH).matcher().resolve(query)]
 
 
 def get_app_path(display_name: str) -> Optional[str]:
@@ -100,6 +62,4 @@ def get_app_path(display_name: str) -> Optional[str]:
     Given a (possibly not-normalized) display name, return the app path,
     or None if not found.
     """
-    index = load_app_index()
-    norm = _normalize(display_name)
-    return index.get(norm)
\ No newline at end of file
+    return get_app_index(APP_INDEX_PATH).lookup(display_name)
\ No newline at end of file
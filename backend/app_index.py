@@ -0,0 +1,249 @@
+# backend/app_index.py
+"""
+The app index (normalized app name -> .app path), loaded once per process.
+
+Every reader goes through one AppIndex per file: discover_apps.load_app_index,
+app_aliases and mac_actions all get the same dict and the same AppMatcher.
+The file is stat'ed on each access and re-parsed only when its inode, mtime
+or size changed (another process rebuilt it); a missing or corrupt file is
+rebuilt by scanning. Rebuilds write a temp file and rename it over the old
+one, so readers never see a half-written index. With BACKGROUND_RELOAD a
+changed file is parsed (and its matcher built) by a background thread
+while lookups keep getting the previous snapshot.
+
+Usage:
+    index = get_app_index()          # backend/app_index.json
+    index.get()                      # {"safari": "/Applications/Safari.app", ...}
+    index.matcher().resolve("safri")
+    index.rebuild()                  # rescan and replace the file
+    index.apply({"zed": "/Applications/Zed.app"}, ["safari"])   # a delta (see .app_watcher)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .app_matcher import AppMatcher, normalize
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_index.json")
+
+# Matchers kept for indexes that aren't the current one of an AppIndex
+# (an index pinned by a test or benchmark, one being replaced)
+MATCHER_SLOTS = 4
+
+# Re-read a changed file in a background thread and keep answering with the
+# previous snapshot until the new one and its matcher are built (set in the
+# pre-fork server's workers, where another process rewrites the file)
+BACKGROUND_RELOAD = False
+
+# (inode, mtime_ns, size) of the file a snapshot was parsed from
+Stamp = Tuple[int, int, int]
+
+_matchers: "OrderedDict[int, Tuple[Dict[str, str], AppMatcher]]" = OrderedDict()
+_matchers_lock = threading.Lock()
+# id(index) -> lock held while its matcher is built
+_building: Dict[int, threading.Lock] = {}
+
+_indexes: Dict[str, "AppIndex"] = {}
+_indexes_lock = threading.Lock()
+
+
+def _stamp(path: str) -> Optional[Stamp]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _scan(path: str) -> Dict[str, str]:
+    from .discover_apps import scan_for_index  # discover_apps loads through this module
+
+    return scan_for_index(path)
+
+
+def matcher_for(index: Dict[str, str]) -> AppMatcher:
+    """
+    The AppMatcher for this index dict, built once per dict. Callers that
+    get the same snapshot share one matcher; concurrent first lookups wait
+    for one build instead of each building their own, and lookups on other
+    dicts don't wait at all.
+    """
+    key = id(index)
+    with _matchers_lock:
+        hit = _matchers.get(key)
+        if hit is not None and hit[0] is index:
+            _matchers.move_to_end(key)
+            return hit[1]
+        building = _building.setdefault(key, threading.Lock())
+    with building:
+        with _matchers_lock:
+            hit = _matchers.get(key)
+            if hit is not None and hit[0] is index:
+                return hit[1]
+        matcher = AppMatcher(index)
+        with _matchers_lock:
+            # Holding the dict keeps its id from being reused
+            _matchers[key] = (index, matcher)
+            while len(_matchers) > MATCHER_SLOTS:
+                _matchers.popitem(last=False)
+            _building.pop(key, None)
+        return matcher
+
+
+class AppIndex:
+    """
+    One app index file, cached in memory.
+
+    get() returns a snapshot dict that callers must treat as read-only: it
+    is replaced, never mutated, when the file changes. Reading the current
+    snapshot takes no lock; writers (save, apply, rebuild) and re-reads of
+    a changed file are serialized.
+    """
+
+    def __init__(self, path: str, scan: Optional[Callable[[], Dict[str, str]]] = None) -> None:
+        self.path = path
+        self.scan = scan or (lambda: _scan(path))
+        self._lock = threading.RLock()
+        # (stamp of the file it matches, index)
+        self._snapshot: Optional[Tuple[Optional[Stamp], Dict[str, str]]] = None
+        self._reloading = False
+        self._bad_stamp: Optional[Stamp] = None  # a changed file that failed to load in the background
+        self.loads = 0
+
+    def get(self) -> Dict[str, str]:
+        """The current index; re-read only if the file changed since the last read."""
+        snapshot = self._snapshot
+        stamp = _stamp(self.path)
+        if snapshot is not None and snapshot[0] == stamp:
+            return snapshot[1]
+        if snapshot is not None and stamp is not None and BACKGROUND_RELOAD:
+            if stamp != self._bad_stamp:
+                self._reload_in_background()
+            return snapshot[1]
+        with self._lock:
+            stamp = _stamp(self.path)
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot[0] == stamp:
+                return snapshot[1]
+            if stamp is None:
+                print(f"[WARN] {os.path.basename(self.path)} missing — rebuilding.")
+                return self.rebuild()
+            try:
+                data = self._read()
+            except (OSError, ValueError):
+                print(f"[WARN] {os.path.basename(self.path)} is invalid — rebuilding.")
+                return self.rebuild()
+            self._snapshot = (stamp, data)
+            return data
+
+    def _reload_in_background(self) -> None:
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, name="app-index-reload", daemon=True).start()
+
+    def _reload(self) -> None:
+        try:
+            with self._lock:
+                before = self._snapshot
+                stamp = _stamp(self.path)
+                if stamp is None or (before is not None and before[0] == stamp):
+                    return
+                try:
+                    data = self._read()
+                except (OSError, ValueError):
+                    print(f"[WARN] {os.path.basename(self.path)} is invalid — keeping the previous index.")
+                    self._bad_stamp = stamp
+                    return
+            matcher_for(data)  # built before any lookup can see the new index
+            with self._lock:
+                if self._snapshot is before:  # not replaced by a save() meanwhile
+                    self._snapshot = (stamp, data)
+        finally:
+            self._reloading = False
+
+    def _read(self) -> Dict[str, str]:
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("app index is not a JSON object")
+        self.loads += 1
+        return {normalize(name): path for name, path in data.items() if normalize(name)}
+
+    def matcher(self) -> AppMatcher:
+        return matcher_for(self.get())
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Path of the app with exactly this (normalized) name, or None."""
+        return self.get().get(normalize(name))
+
+    def save(self, apps: Dict[str, str], warm: bool = False) -> Dict[str, str]:
+        """
+        Replace the file atomically with `apps` and make it the current
+        index. warm=True builds its matcher before readers can see it.
+        """
+        data = {normalize(name): path for name, path in apps.items() if normalize(name)}
+        with self._lock:
+            if warm:
+                matcher_for(data)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp, self.path)
+            finally:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+            self._snapshot = (_stamp(self.path), data)
+            return data
+
+    def apply(self, added: Dict[str, str], removed: Iterable[str], warm: bool = True) -> Dict[str, str]:
+        """Add/replace `added` and drop `removed` in the current index, then save it."""
+        with self._lock:
+            data = dict(self.get())
+            for name in removed:
+                data.pop(normalize(name), None)
+            data.update(added)
+            return self.save(data, warm=warm)
+
+    def rebuild(self, scan: Optional[Callable[[], Dict[str, str]]] = None) -> Dict[str, str]:
+        """Rescan the filesystem (with `scan`, default self.scan) and save the result."""
+        with self._lock:
+            return self.save((scan or self.scan)())
+
+    def invalidate(self) -> None:
+        """Forget the snapshot: the next get() re-reads the file."""
+        self._snapshot = None
+
+
+def get_app_index(path: Optional[str] = None) -> AppIndex:
+    """The process-wide AppIndex for `path` (default: backend/app_index.json)."""
+    key = os.path.abspath(os.path.expanduser(str(path or DEFAULT_PATH)))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = AppIndex(key)
+        return index
+
+
+def _after_fork_in_child() -> None:
+    # A lock held by another thread at fork time would stay held forever in
+    # the child (PreforkServer forks while an AppWatcher may be saving).
+    global _matchers_lock, _indexes_lock
+    _matchers_lock = threading.Lock()
+    _indexes_lock = threading.Lock()
+    _building.clear()
+    for index in _indexes.values():
+        index._lock = threading.RLock()
+        index._reloading = False  # its reload thread wasn't forked
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
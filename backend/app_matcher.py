@@ -0,0 +1,294 @@
+# backend/app_matcher.py
+"""
+Ranked, typo-tolerant app name matching.
+
+Built once from the app index (normalized name -> .app path), then each
+lookup touches only the candidates its index entries point at:
+
+    matcher = AppMatcher(index)
+    matcher.search("chrome")    # [(80.0, "google chrome", "/Applications/Google Chrome.app"), ...]
+    matcher.resolve("safri")    # [("safari", "/Applications/Safari.app")]
+
+Scores (0-100, see score_name):
+    100  exact name
+     90  the name starts with the query at a word boundary  ("google" -> "google chrome")
+     85  the name starts with the query mid-word             ("saf" -> "safari")
+     80  the query is a whole word (or words) of the name    ("chrome" -> "google chrome")
+     70  every query word starts a word of the name          ("vis code" -> "visual studio code")
+     60  the query (3+ chars) is a substring of the name     ("hrome" -> "google chrome")
+    <50  typo: trigram similarity with the name or a run of its words ("chrme" -> "chrome"),
+         less per extra word in the latter case
+Ties go to the shorter name, so "safari" ranks above "safari technology preview".
+
+Candidates come from a sorted name list and a sorted word list (prefixes,
+by bisect) and a trigram index (substrings and typos), so lookups stay well
+under a millisecond on tens of thousands of bundles:
+
+    python -m benchmarks.bench_micro --apps 30000
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+# (score, name, path)
+AppMatch = Tuple[float, str, str]
+
+EXACT_SCORE = 100.0
+SUBSTRING_SCORE = 60.0
+# Below this trigram similarity a name is not a typo of the query
+FUZZY_MIN_SIMILARITY = 0.4
+# A typo match is taken alone only this far ahead of the next one
+FUZZY_MARGIN = 5.0
+# Typo score lost per extra name word when only a run of its words matched
+FUZZY_WORD_PENALTY = 0.06
+# Vocabulary words checked per query word for typos (those sharing the most trigrams)
+FUZZY_WORDS = 32
+# Names scored per typo lookup (shortest first among those with a close word)
+FUZZY_CANDIDATES = 32
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip, collapse spaces (the app index key form)."""
+    return " ".join(text.lower().split())
+
+
+def _gram_set(text: str) -> FrozenSet[str]:
+    padded = f" {text} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+# Queries and vocabulary words repeat: cache their trigrams
+_grams = lru_cache(maxsize=65536)(_gram_set)
+
+
+def _dice(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+
+def similarity(query: str, name: str) -> float:
+    """Trigram similarity (0-1) of `query` with `name` or its best run of words."""
+    q = _grams(query)
+    best = _dice(q, _grams(name))
+    words = name.split()
+    k = len(query.split())
+    if len(words) > k:
+        for i in range(len(words) - k + 1):
+            best = max(best, _dice(q, _grams(" ".join(words[i : i + k]))))
+    return best
+
+
+def score_name(query: str, name: str) -> float:
+    """Score (0-100) of one normalized name for a normalized query; 0 = no match."""
+    if not query or not name:
+        return 0.0
+    if name == query:
+        return EXACT_SCORE
+    if name.startswith(query):
+        return 90.0 if name[len(query)] == " " else 85.0
+    if f" {query} " in f" {name} ":
+        return 80.0
+    words = name.split()
+    if all(any(w.startswith(qw) for w in words) for qw in query.split()):
+        return 70.0
+    if len(query) >= 3 and query in name:
+        return SUBSTRING_SCORE
+    sim = similarity(query, name)
+    if sim < FUZZY_MIN_SIMILARITY:
+        return 0.0
+    if sim > _dice(_grams(query), _grams(name)):
+        # Matched a run of words: longer names are less likely what was meant
+        sim -= FUZZY_WORD_PENALTY * max(0, len(words) - len(query.split()))
+    return round(50.0 * max(sim, 0.0), 1)
+
+
+def _prefix_bounds(sorted_keys: Sequence[str], prefix: str, lo: int = 0, hi: Optional[int] = None) -> Tuple[int, int]:
+    """[start, end) of the keys starting with `prefix` in a sorted list."""
+    hi = len(sorted_keys) if hi is None else hi
+    start = bisect.bisect_left(sorted_keys, prefix, lo, hi)
+    end = bisect.bisect_left(sorted_keys, prefix + "\uffff", start, hi)
+    return start, end
+
+
+class AppMatcher:
+    def __init__(self, index: Dict[str, str]) -> None:
+        self.names: List[str] = []
+        self.paths: List[str] = []
+        exact: Dict[str, int] = {}
+        words: Dict[str, List[int]] = {}
+        grams: Dict[str, List[int]] = {}
+        word_grams: Dict[str, List[str]] = {}
+
+        for raw_name, path in index.items():
+            name = normalize(raw_name)
+            if not name or name in exact:
+                continue
+            i = len(self.names)
+            self.names.append(name)
+            self.paths.append(path)
+            exact[name] = i
+            for w in set(name.split()):
+                words.setdefault(w, []).append(i)
+            for g in _gram_set(name):
+                grams.setdefault(g, []).append(i)
+
+        self._exact = exact
+        order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self._sorted_names = [self.names[i] for i in order]
+        self._sorted_name_ids = order
+        self._sorted_words = sorted(words)
+        # Sets, so intersections run without copying
+        self._word_ids = {w: frozenset(ids) for w, ids in words.items()}
+        self._grams = {g: frozenset(ids) for g, ids in grams.items()}
+        # Typos are looked up per word, in the (much smaller) vocabulary
+        for w in words:
+            for g in _grams(w):
+                word_grams.setdefault(g, []).append(w)
+        self._word_grams = word_grams
+        # Tie-break within a score: shorter name first, then alphabetical
+        self._by_rank = sorted(range(len(self.names)), key=lambda i: (len(self.names[i]), self.names[i]))
+        self._rank = [0] * len(self.names)
+        for r, i in enumerate(self._by_rank):
+            self._rank[i] = r
+        # Per word, the ranks of the names containing it (ascending): typo
+        # lookups walk these and stop after FUZZY_CANDIDATES names
+        self._word_ranks = {w: sorted(self._rank[i] for i in ids) for w, ids in words.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # ---------- candidate generation ----------
+
+    def _word_prefix_ids(self, prefix: str) -> Set[int]:
+        start, end = _prefix_bounds(self._sorted_words, prefix)
+        return set().union(*(self._word_ids[w] for w in self._sorted_words[start:end]))
+
+    def _tiers(self, q: str, seen: Set[int]) -> Iterator[Tuple[float, Set[int]]]:
+        """
+        The names scoring >= SUBSTRING_SCORE, grouped by score, best first
+        and disjoint (the same tiers as score_name). Computed lazily: a
+        lookup whose limit the first tiers fill never builds the rest.
+        `seen` collects the ids yielded so far.
+        """
+
+        def new(ids: Iterable[int]) -> Set[int]:
+            fresh = set(ids) - seen
+            seen.update(fresh)
+            return fresh
+
+        i = self._exact.get(q)
+        if i is not None:
+            yield EXACT_SCORE, new((i,))
+        start, end = _prefix_bounds(self._sorted_names, q)
+        word_start, word_end = _prefix_bounds(self._sorted_names, q + " ", start, end)
+        yield 90.0, new(self._sorted_name_ids[word_start:word_end])
+        yield 85.0, new(self._sorted_name_ids[start:end])
+
+        q_words = q.split()
+        whole = sorted((self._word_ids.get(w, frozenset()) for w in q_words), key=len)
+        if whole and whole[0]:
+            ids = whole[0].intersection(*whole[1:])
+            if len(q_words) > 1:
+                ids = {i for i in ids if f" {q} " in f" {self.names[i]} "}
+            yield 80.0, new(ids)
+        per_word = sorted((self._word_prefix_ids(w) for w in q_words), key=len)
+        if per_word:
+            yield 70.0, new(per_word[0].intersection(*per_word[1:]))
+
+        if len(q) >= 3:
+            postings = sorted((self._grams.get(q[i : i + 3], frozenset()) for i in range(len(q) - 2)), key=len)
+            ids = postings[0].intersection(*postings[1:]) - seen
+            yield SUBSTRING_SCORE, new(i for i in ids if q in self.names[i])
+
+    def _close_words(self, word: str) -> List[str]:
+        """Vocabulary words within FUZZY_MIN_SIMILARITY of `word`."""
+        shared: Counter = Counter()
+        for g in _grams(word):
+            shared.update(self._word_grams.get(g, ()))
+        target = _grams(word)
+        return [w for w, _ in shared.most_common(FUZZY_WORDS) if _dice(target, _grams(w)) >= FUZZY_MIN_SIMILARITY]
+
+    def _typo_candidates(self, q: str, exclude: Set[int]) -> List[int]:
+        """
+        Up to FUZZY_CANDIDATES names, shortest first, with a close word for
+        every query word (or, if no name has all of them, for any).
+        """
+        close = [set(self._close_words(qw)) for qw in q.split()]
+        if len(close) == 1:
+            return self._walk(close[0], lambda i: i not in exclude)
+        per_word = [set().union(*(self._word_ids[w] for w in words)) for words in close]
+        ids = per_word[0].intersection(*per_word[1:]) or set().union(*per_word)
+        return heapq.nsmallest(FUZZY_CANDIDATES, ids - exclude, key=self._rank.__getitem__)
+
+    def _walk(self, words: Set[str], keep: Callable[[int], bool]) -> List[int]:
+        """Names containing any of `words` in rank order, filtered, up to FUZZY_CANDIDATES."""
+        picked: List[int] = []
+        last = -1
+        for r in heapq.merge(*(self._word_ranks[w] for w in words)):
+            if r == last:
+                continue
+            last = r
+            i = self._by_rank[r]
+            if keep(i):
+                picked.append(i)
+                if len(picked) >= FUZZY_CANDIDATES:
+                    break
+        return picked
+
+    # ---------- lookups ----------
+
+    def search(self, query: str, limit: Optional[int] = 10, fuzzy: bool = True) -> List[AppMatch]:
+        """Ranked (score, name, path) matches, best first (limit=None: all of them)."""
+        q = normalize(query)
+        if not q:
+            return []
+        rank = self._rank.__getitem__
+        seen: Set[int] = set()
+
+        ranked: List[Tuple[float, int]] = []
+        for score, ids in self._tiers(q, seen):
+            room = None if limit is None else limit - len(ranked)
+            if room is not None and room < len(ids):
+                ranked.extend((score, i) for i in heapq.nsmallest(room, ids, key=rank))
+            else:
+                ranked.extend((score, i) for i in sorted(ids, key=rank))
+            if limit is not None and len(ranked) >= limit:
+                break
+
+        if fuzzy and (limit is None or len(ranked) < limit):
+            typos = [(score_name(q, self.names[i]), i) for i in self._typo_candidates(q, seen)]
+            typos = sorted((m for m in typos if m[0] > 0), key=lambda m: (-m[0], rank(m[1])))
+            ranked.extend(typos if limit is None else typos[: limit - len(ranked)])
+        return [(score, self.names[i], self.paths[i]) for score, i in ranked]
+
+    def resolve(self, query: str, limit: int = 50) -> List[Tuple[str, str]]:
+        """
+        The (name, path) pairs `query` most likely means, best first:
+          - an exact name alone;
+          - else every name scoring at least SUBSTRING_SCORE (up to `limit`);
+          - else (typos) the best one if it clearly wins, or the close ones.
+        """
+        q = normalize(query)
+        i = self._exact.get(q)
+        if i is not None:
+            return [(self.names[i], self.paths[i])]
+        strong = self.search(q, limit=limit, fuzzy=False)
+        if strong:
+            return [(n, p) for _, n, p in strong]
+        ranked = self.search(q, limit=5)
+        if not ranked:
+            return []
+        best = ranked[0][0]
+        if len(ranked) == 1 or best - ranked[1][0] >= FUZZY_MARGIN:
+            return [ranked[0][1:]]
+        return [(n, p) for s, n, p in ranked if best - s < FUZZY_MARGIN]
+
+    def path(self, name: str) -> Optional[str]:
+        i = self._exact.get(normalize(name))
+        return None if i is None else self.paths[i]
@@ -0,0 +1,359 @@
+# backend/app_watcher.py
+"""
+Keep the app index live while Sunny runs.
+
+An AppWatcher thread watches the application folders (the non-bundle
+directories discover_apps.scan_apps walks) and, when one changes, rescans
+incrementally and applies the difference to the shared index: new bundles
+are added, deleted ones dropped (only under a root that could be listed,
+and never on a scan that found nothing), in memory (backend.app_index) and in
+app_index.json. The new index and its matcher are built before they are
+published, so lookups keep using the previous snapshot until then and
+never wait for a rescan.
+
+Change notification, best available first:
+    inotify   Linux (libc through ctypes)
+    kqueue    macOS / BSD (select.kqueue vnode events on each directory)
+    poll      anywhere: an incremental rescan every `interval` seconds
+Event backends also rescan every RESCAN_INTERVAL_S in case an event was
+missed; bursts (an installer copying a bundle) are coalesced.
+
+Usage:
+    python -m backend.app_watcher                    # watch APP_ROOTS, print changes
+    python -m backend.app_watcher --poll --interval 2 --root /tmp/fake-apps
+    python -m backend.server --watch-apps
+
+    with AppWatcher():
+        ...
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .app_index import AppIndex, get_app_index
+from .app_matcher import normalize
+from .discover_apps import APP_INDEX_PATH, APP_ROOTS, DirState, load_scan_state, save_scan_state, scan_apps, scan_state_path
+from .metrics import counter, histogram
+
+# Seconds between rescans with the polling backend
+POLL_INTERVAL_S = 5.0
+# Safety rescan with an event backend (events can be dropped or overflow)
+RESCAN_INTERVAL_S = 60.0
+# Events closer together than this are handled by one rescan...
+DEBOUNCE_S = 0.3
+# ...but a steady stream of them still gets one at least this often
+MAX_DEBOUNCE_S = 3.0
+
+INDEX_CHANGES = counter("sunny_app_index_changes_total", "Apps added to / removed from the index by the watcher", ["change"])
+RESCAN_SECONDS = histogram("sunny_app_rescan_seconds", "Incremental app rescans by the watcher")
+
+# (apps added {name: path}, names removed)
+OnChange = Callable[[Dict[str, str], List[str]], None]
+
+
+# ---------- change notification ----------
+
+class _PollSource:
+    """No notifications: wait() just times out (or returns on wake())."""
+
+    name = "poll"
+
+    def __init__(self) -> None:
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+
+    def watch(self, dirs: Sequence[str]) -> None:
+        pass
+
+    def wait(self, timeout: float) -> bool:
+        """True if a watched directory changed, False on timeout or wake()."""
+        select.select([self._wake_r], [], [], timeout)
+        self._drain_wake()
+        return False
+
+    def wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+
+    def _drain_wake(self) -> None:
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        for fd in (self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class _InotifySource(_PollSource):
+    name = "inotify"
+
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    IN_ONLYDIR = 0x01000000
+    MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = [ctypes.c_int, ctypes.c_int]
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        self._watches: Dict[str, int] = {}
+        super().__init__()
+
+    def watch(self, dirs: Sequence[str]) -> None:
+        wanted = set(dirs)
+        for path in [p for p in self._watches if p not in wanted]:
+            self._rm(self._fd, self._watches.pop(path))
+        for path in wanted - set(self._watches):
+            wd = self._add(self._fd, os.fsencode(path), self.MASK)
+            if wd >= 0:
+                self._watches[path] = wd
+
+    def wait(self, timeout: float) -> bool:
+        readable, _, _ = select.select([self._fd, self._wake_r], [], [], timeout)
+        self._drain_wake()
+        if self._fd not in readable:
+            return False
+        # Which directory changed doesn't matter: the rescan finds it by mtime
+        try:
+            while os.read(self._fd, 65536):
+                pass
+        except OSError:
+            pass
+        return True
+
+    def close(self) -> None:
+        super().close()
+        os.close(self._fd)
+
+
+class _KqueueSource(_PollSource):
+    name = "kqueue"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._kq = select.kqueue()
+        self._fds: Dict[str, int] = {}
+        self._kq.control([select.kevent(self._wake_r, select.KQ_FILTER_READ, select.KQ_EV_ADD)], 0)
+
+    def watch(self, dirs: Sequence[str]) -> None:
+        wanted = set(dirs)
+        for path in [p for p in self._fds if p not in wanted]:
+            os.close(self._fds.pop(path))  # closing the fd removes its event
+        # O_EVTONLY (macOS) watches without keeping the volume busy
+        flags = getattr(os, "O_EVTONLY", os.O_RDONLY)
+        fflags = select.KQ_NOTE_WRITE | select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME
+        for path in wanted - set(self._fds):
+            try:
+                fd = os.open(path, flags)
+            except OSError:
+                continue
+            self._fds[path] = fd
+            event = select.kevent(fd, select.KQ_FILTER_VNODE, select.KQ_EV_ADD | select.KQ_EV_CLEAR, fflags)
+            self._kq.control([event], 0)
+
+    def wait(self, timeout: float) -> bool:
+        events = self._kq.control(None, 64, timeout)
+        self._drain_wake()
+        return any(e.ident != self._wake_r for e in events)
+
+    def close(self) -> None:
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+        self._kq.close()
+        super().close()
+
+
+def _make_source(backend: str) -> _PollSource:
+    if backend in ("auto", "inotify") and sys.platform.startswith("linux"):
+        try:
+            return _InotifySource()
+        except (OSError, AttributeError):
+            if backend == "inotify":
+                raise
+    if backend in ("auto", "kqueue") and hasattr(select, "kqueue"):
+        return _KqueueSource()
+    if backend not in ("auto", "poll"):
+        raise ValueError(f"app watcher backend {backend!r} is not available here")
+    return _PollSource()
+
+
+# ---------- watcher ----------
+
+class AppWatcher:
+    """
+    Background thread that keeps `index` (default: the shared app index)
+    in step with the bundles under `roots` (default: APP_ROOTS).
+
+    sync() does one rescan + update and can be called directly.
+    """
+
+    def __init__(
+        self,
+        index_path: Optional[Path] = None,
+        roots: Optional[Sequence[str]] = None,
+        backend: str = "auto",
+        interval: Optional[float] = None,
+        on_change: Optional[OnChange] = None,
+    ) -> None:
+        self.index_path = Path(index_path or APP_INDEX_PATH)
+        self.index: AppIndex = get_app_index(self.index_path)
+        self.roots = list(APP_ROOTS if roots is None else roots)
+        self.on_change = on_change
+        self._state: Dict[str, DirState] = load_scan_state(scan_state_path(self.index_path))
+        self._source = _make_source(backend)
+        self.backend = self._source.name
+        self.interval = interval if interval is not None else (
+            POLL_INTERVAL_S if self.backend == "poll" else RESCAN_INTERVAL_S
+        )
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._synced = threading.Event()
+        self.rescans = 0
+
+    def sync(self) -> Tuple[Dict[str, str], List[str]]:
+        """Rescan incrementally and apply the difference. Returns (added, removed)."""
+        t0 = time.perf_counter()
+        stats: Dict[str, int] = {}
+        found, state = scan_apps(self.roots, self._state, stats)
+        apps: Dict[str, str] = {}
+        for name, path in found.items():
+            apps.setdefault(normalize(name), path)
+
+        if not self.index_path.exists():
+            # Nothing to diff against (and get() would scan again to rebuild it)
+            added, removed = dict(apps), []
+            self.index.save(apps, warm=True)
+        else:
+            current = self.index.get()
+            added = {name: path for name, path in apps.items() if current.get(name) != path}
+            removed = self._gone(current, apps)
+            if added or removed:
+                self.index.apply(added, removed)
+        if added or removed:
+            INDEX_CHANGES.labels(change="added").inc(len(added))
+            INDEX_CHANGES.labels(change="removed").inc(len(removed))
+            print(f"[INFO] App index updated: +{len(added)} -{len(removed)} ({len(apps)} apps)")
+        if stats.get("listed") or state.keys() != self._state.keys():
+            save_scan_state(scan_state_path(self.index_path), self.roots, state)
+        self._state = state
+        self._source.watch(list(state))
+        self.rescans += 1
+        RESCAN_SECONDS.observe(time.perf_counter() - t0)
+        if (added or removed) and self.on_change is not None:
+            self.on_change(added, removed)
+        return added, removed
+
+    def _gone(self, current: Dict[str, str], apps: Dict[str, str]) -> List[str]:
+        """
+        Indexed names the scan no longer finds. Only names under a root that
+        could be listed count: a missing or unreadable root, or a scan that
+        found nothing at all, says nothing about what is installed there.
+        """
+        if not apps:
+            if current:
+                print(f"[WARN] App scan found nothing under {self.roots}; keeping the {len(current)} indexed apps.")
+            return []
+        roots = [
+            os.path.join(root, "")
+            for root in map(os.path.expanduser, self.roots)
+            if os.path.isdir(root) and os.access(root, os.R_OK | os.X_OK)
+        ]
+        return [
+            name for name, path in current.items()
+            if name not in apps and any(os.path.join(path, "").startswith(root) for root in roots)
+        ]
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"[WARN] App watcher rescan failed: {e!r}")
+            self._synced.set()
+            if not self._source.wait(self.interval) or self._stop.is_set():
+                continue
+            # Let a burst of changes settle into one rescan
+            deadline = time.monotonic() + MAX_DEBOUNCE_S
+            while not self._stop.is_set() and time.monotonic() < deadline and self._source.wait(DEBOUNCE_S):
+                pass
+
+    def start(self) -> "AppWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="app-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def wait_synced(self, timeout: Optional[float] = None) -> bool:
+        """Block until the first rescan has been applied."""
+        return self._synced.wait(timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._source.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._source.close()
+
+    def __enter__(self) -> "AppWatcher":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keep the app index in step with the installed apps.")
+    parser.add_argument("--root", action="append", help="directory to watch (repeatable; default: APP_ROOTS)")
+    parser.add_argument("--index", default=None, help="index file (default: backend/app_index.json)")
+    parser.add_argument("--poll", action="store_true", help="poll instead of inotify / kqueue")
+    parser.add_argument("--interval", type=float, default=None, help="seconds between safety rescans")
+    args = parser.parse_args()
+
+    def show(added: Dict[str, str], removed: List[str]) -> None:
+        for name, path in sorted(added.items()):
+            print(f"  + {name}  {path}")
+        for name in sorted(removed):
+            print(f"  - {name}")
+
+    watcher = AppWatcher(args.index, args.root, "poll" if args.poll else "auto", args.interval, show)
+    print(f"[OK] Watching {len(watcher.roots)} root(s) with {watcher.backend}. Ctrl-C to stop.")
+    with watcher:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# backend/async_http.py
+"""
+Minimal asyncio HTTP/1.1 client with per-host keep-alive pooling.
+
+Only what llm_client needs to talk to Ollama: JSON POST/GET, Content-Length
+and chunked responses, connection reuse. No extra dependencies, and no thread
+per request — everything runs on the caller's event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+_Conn = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+_HostKey = Tuple[str, int, bool]
+
+
+class AsyncHTTPPool:
+    """
+    Keep-alive connection pool bound to one event loop.
+
+    At most `max_per_host` connections are open per host; extra requests wait
+    for a free connection instead of opening new sockets.
+    """
+
+    def __init__(self, max_per_host: int = 16, timeout: float = 120.0) -> None:
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._idle: Dict[_HostKey, List[_Conn]] = {}
+        self._limits: Dict[_HostKey, asyncio.Semaphore] = {}
+        self.connections_opened = 0
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        json_body: Optional[Any] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, bytes]:
+        """
+        Send one request and return (status, body).
+        Raises requests.HTTPError on non-2xx, asyncio.TimeoutError on timeout.
+        """
+        parts = urlsplit(url)
+        use_ssl = parts.scheme == "https"
+        host = parts.hostname or "localhost"
+        port = parts.port or (443 if use_ssl else 80)
+        key = (host, port, use_ssl)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        body = b"" if json_body is None else json.dumps(json_body).encode("utf-8")
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "Connection: keep-alive\r\n"
+            "Accept: application/json\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode("latin-1")
+
+        limit = self._limits.setdefault(key, asyncio.Semaphore(self.max_per_host))
+        async with limit:
+            status, payload = await asyncio.wait_for(
+                self._send(key, head + body),
+                timeout=self.timeout if timeout is None else timeout,
+            )
+
+        if not 200 <= status < 300:
+            raise requests.HTTPError(f"{status} error for url: {url}")
+        return status, payload
+
+    async def _send(self, key: _HostKey, data: bytes) -> Tuple[int, bytes]:
+        conn = self._checkout(key)
+        reused = conn is not None
+
+        while True:
+            if conn is None:
+                conn = await self._connect(key)
+            reader, writer = conn
+            try:
+                writer.write(data)
+                await writer.drain()
+                status, headers, payload = await _read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection: retry once.
+                conn, reused = None, False
+                continue
+            except BaseException:
+                writer.close()
+                raise
+
+            if headers.get("connection", "").lower() == "close":
+                writer.close()
+            else:
+                self._idle.setdefault(key, []).append(conn)
+            return status, payload
+
+    def _checkout(self, key: _HostKey) -> Optional[_Conn]:
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    async def _connect(self, key: _HostKey) -> _Conn:
+        host, port, use_ssl = key
+        self.connections_opened += 1
+        return await asyncio.open_connection(host, port, ssl=use_ssl or None)
+
+    async def aclose(self) -> None:
+        """Close every idle connection."""
+        for conns in self._idle.values():
+            for _, writer in conns:
+                writer.close()
+        self._idle.clear()
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("connection closed before response")
+    status = int(status_line.split()[1])
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readline()  # trailing CRLF (no trailers expected)
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        return status, headers, b"".join(chunks)
+
+    if "content-length" in headers:
+        return status, headers, await reader.readexactly(int(headers["content-length"]))
+
+    # No length: body runs until the server closes the connection.
+    headers["connection"] = "close"
+    return status, headers, await reader.read()
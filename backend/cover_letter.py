@@ -2,6 +2,8 @@ import requests
 from bs4 import BeautifulSoup
 from docx import Document
 
+from .tracing import span
+
 
 def scrape_job_details(url: str) -> str:
     """Fetch job description text from a webpage."""
@@ -31,7 +33,8 @@ def create_cover_letter(content: str, output_path: str = "Cover_Letter.docx"):
 
 def generate_cover_letter(job_url: str, applicant_name: str = "Applicant"):
     """High-level function: scrape → generate text → export to Word."""
-    job_text = scrape_job_details(job_url)
+    with span("scrape"):
+        job_text = scrape_job_details(job_url)
 
     # Very simple template — your Nunnarivu model can improve this later
     cover_letter = f"""
@@ -47,5 +50,6 @@ Best regards,
 {applicant_name}
 """
 
-    file_path = create_cover_letter(cover_letter)
+    with span("docx"):
+        file_path = create_cover_letter(cover_letter)
     return file_path
\ No newline at end of file
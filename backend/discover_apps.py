@@ -1,58 +1,218 @@
 # backend/discover_apps.py
 
-import os
+"""
+Discover installed .app bundles and maintain the app index.
+
+The scanner walks each root with os.scandir (the roots in parallel) and
+treats bundles as leaves: "Google Chrome.app" is indexed, the helper apps
+inside its Contents/ are not, and frameworks/plugins are never entered.
+Each directory's mtime and listing is stored next to the index
+(app_index.dirs.json), so a rescan only re-lists directories whose mtime
+changed; the rest costs one stat each.
+
+Usage:
+    python -m backend.discover_apps                 # load (build if missing)
+    from backend.discover_apps import rebuild_app_index
+    rebuild_app_index()                             # incremental rescan
+    rebuild_app_index(full=True)                    # ignore the stored mtimes
+    scan_apps(["/tmp/fake-apps"])                   # any roots, e.g. a synthetic tree
+"""
+
+from __future__ import annotations
+
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .app_index import get_app_index
 
 APP_INDEX_PATH = Path(__file__).with_name("app_index.json")
 
+# Searched in this order: the first bundle found for a name wins
+APP_ROOTS: List[str] = [
+    "/Applications",
+    "/System/Applications",
+    "/System/Library/CoreServices",
+    str(Path.home() / "Applications"),
+]
+
+# Bundle directories: never descended into (only .app ones are indexed)
+BUNDLE_SUFFIXES = (".app", ".framework", ".bundle", ".plugin", ".appex", ".xpc", ".kext")
+
+# Per-directory scan state, stored as <index>.dirs.json
+SCAN_STATE_VERSION = 1
 
-def _iter_app_bundles() -> Dict[str, str]:
+# {"mtime": st_mtime_ns, "dirs": [subdirectory paths], "apps": {name: bundle path}}
+DirState = Dict[str, Any]
+
+
+def _list_dir(path: str, mtime: int) -> Optional[DirState]:
+    """One directory's bundles and subdirectories (None if unreadable)."""
+    apps: Dict[str, str] = {}
+    dirs: List[str] = []
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return None
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        try:
+            if not entry.is_dir():
+                continue
+        except OSError:
+            continue
+        lower = entry.name.lower()
+        if lower.endswith(".app"):
+            # Canonical name = bundle name without .app, lowercased
+            apps.setdefault(entry.name[:-4].strip().lower(), entry.path)
+        elif not lower.endswith(BUNDLE_SUFFIXES) and not entry.is_symlink():
+            dirs.append(entry.path)
+    return {"mtime": mtime, "dirs": dirs, "apps": apps}
+
+
+def _walk(root: str, previous: Dict[str, DirState], stats: Dict[str, int]) -> Dict[str, DirState]:
     """
-    Walk standard macOS application locations and yield .app bundles.
+    Depth-first walk of one root. A directory whose mtime matches
+    `previous` is not listed again: adding, removing or renaming an entry
+    changes the mtime of its parent, so its stored listing is current.
+    """
+    state: Dict[str, DirState] = {}
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            # Stat before listing: a change during the listing bumps the
+            # mtime past the stored one, so the next scan lists it again
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        entry = previous.get(path)
+        if entry is not None and entry.get("mtime") == mtime:
+            stats["reused"] = stats.get("reused", 0) + 1
+        else:
+            entry = _list_dir(path, mtime)
+            stats["listed"] = stats.get("listed", 0) + 1
+            if entry is None:
+                continue
+        state[path] = entry
+        stack.extend(reversed(entry["dirs"]))
+    return state
+
+
+def scan_apps(
+    roots: Optional[Sequence[str]] = None,
+    previous: Optional[Dict[str, DirState]] = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> Tuple[Dict[str, str], Dict[str, DirState]]:
+    """
+    Scan `roots` (default APP_ROOTS) in parallel.
+
+    Returns ({name: bundle path}, per-directory state). Pass the state of
+    the previous scan as `previous` to rescan incrementally. `stats`, if
+    given, gets the number of directories "listed" and "reused".
+    """
+    roots = [os.path.expanduser(str(r)) for r in (APP_ROOTS if roots is None else roots)]
+    previous = previous or {}
+    per_root: List[Dict[str, int]] = [{} for _ in roots]
+    if len(roots) > 1:
+        with ThreadPoolExecutor(max_workers=len(roots), thread_name_prefix="app-scan") as pool:
+            parts = list(pool.map(_walk, roots, [previous] * len(roots), per_root))
+    else:
+        parts = [_walk(r, previous, st) for r, st in zip(roots, per_root)]
+
+    apps: Dict[str, str] = {}
+    state: Dict[str, DirState] = {}
+    for part in parts:
+        for path, entry in part.items():
+            if path in state:  # nested roots
+                continue
+            state[path] = entry
+            for name, bundle in entry["apps"].items():
+                # Only keep the first path we see for a given name
+                apps.setdefault(name, bundle)
+    if stats is not None:
+        for st in per_root:
+            for key, n in st.items():
+                stats[key] = stats.get(key, 0) + n
+    return apps, state
+
+
+def _iter_app_bundles(roots: Optional[Sequence[str]] = None) -> Dict[str, str]:
+    """
+    Full scan of the standard macOS application locations (or `roots`).
 
     We do NOT hard-code any specific app names. Everything is discovered
     dynamically from the filesystem.
     """
-    roots = [
-        "/Applications",
-        "/System/Applications",
-        "/System/Library/CoreServices",
-        str(Path.home() / "Applications"),
-    ]
-
-    seen: Dict[str, str] = {}
-    for root in roots:
-        root_path = Path(root)
-        if not root_path.exists():
-            continue
+    return scan_apps(roots)[0]
 
-        for entry in root_path.rglob("*.app"):
-            if not entry.is_dir():
-                continue
 
-            # Canonical name = bundle name without .app, lowercased
-            name = entry.stem.strip().lower()
-            # Only keep the first path we see for a given name (stable enough)
-            if name not in seen:
-                seen[name] = str(entry)
+def scan_state_path(index_path: Optional[Path] = None) -> Path:
+    return Path(index_path or APP_INDEX_PATH).with_suffix(".dirs.json")
+
 
-    return seen
+def load_scan_state(path: Path) -> Dict[str, DirState]:
+    """The stored per-directory state, or {} if missing, corrupt or outdated."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != SCAN_STATE_VERSION:
+        return {}
+    dirs = data.get("dirs")
+    return dirs if isinstance(dirs, dict) else {}
+
+
+def save_scan_state(path: Path, roots: Sequence[str], state: Dict[str, DirState]) -> None:
+    """Write the per-directory state atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": SCAN_STATE_VERSION, "roots": list(roots), "dirs": state}, f)
+    os.replace(tmp, path)
+
+
+def scan_for_index(
+    index_path: Optional[Path] = None,
+    roots: Optional[Sequence[str]] = None,
+    full: bool = False,
+) -> Dict[str, str]:
+    """
+    Scan for the index at `index_path`, reusing its stored directory state
+    unless `full`, and store the new state.
+    """
+    state_path = scan_state_path(index_path)
+    previous = {} if full else load_scan_state(state_path)
+    roots = APP_ROOTS if roots is None else roots
+    apps, state = scan_apps(roots, previous)
+    save_scan_state(state_path, roots, state)
+    return apps
 
 
-def rebuild_app_index(index_path: Optional[Path] = None) -> Dict[str, str]:
+def rebuild_app_index(
+    index_path: Optional[Path] = None,
+    roots: Optional[Sequence[str]] = None,
+    full: bool = False,
+) -> Dict[str, str]:
     """
     Rebuild the app index JSON file by scanning the filesystem.
     Returns the dict {normalized_name: full_path}.
+
+    Only directories changed since the last scan are listed again (all of
+    them with full=True). The file is replaced atomically and every module
+    reading it through backend.app_index sees the new index on its next
+    lookup.
     """
     if index_path is None:
         index_path = APP_INDEX_PATH
 
-    apps = _iter_app_bundles()
-    index_path.parent.mkdir(parents=True, exist_ok=True)
-    with index_path.open("w", encoding="utf-8") as f:
-        json.dump(apps, f, indent=2)
+    apps = get_app_index(index_path).rebuild(lambda: scan_for_index(index_path, roots, full))
 
     print(f"[OK] Discovered {len(apps)} apps.")
     print(f"[OK] Written to: {index_path}")
@@ -62,26 +222,17 @@ def rebuild_app_index(index_path: Optional[Path] = None) -> Dict[str, str]:
 def load_app_index(index_path: Optional[Path] = None) -> Dict[str, str]:
     """
     Load the app index. If missing or corrupted, rebuild automatically.
+
+    Cached in memory (backend.app_index): the JSON is parsed again only
+    when the file changes. Treat the returned dict as read-only.
     """
     if index_path is None:
         index_path = APP_INDEX_PATH
 
-    if not index_path.exists():
-        print("[WARN] app_index.json missing — rebuilding.")
-        return rebuild_app_index(index_path=index_path)
-
-    try:
-        with index_path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if not isinstance(data, dict):
-            raise ValueError("app_index is not a JSON object")
-        return data
-    except Exception:
-        print("[WARN] app_index.json is invalid — rebuilding.")
-        return rebuild_app_index(index_path=index_path)
+    return get_app_index(index_path).get()
 
 
 if __name__ == "__main__":
     # Manual CLI:
-    #   python backend/discover_apps.py
-    load_app_index()
\ No newline at end of file
+    #   python -m backend.discover_apps
+    load_app_index()
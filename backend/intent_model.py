@@ -0,0 +1,339 @@
+# backend/intent_model.py
+"""
+Small learned intent classifier (NumPy only).
+
+Hashed character n-grams -> linear softmax over router actions. It catches
+phrasings the hand-written rules in .intents don't ("could you bring up
+safari for me"); the args are then filled by intents.extract_args().
+
+Training data:
+  - the interaction store + logs/nunnarivu_interactions.jsonl
+    (label = logged assistant_action)
+  - nunnarivu_finetune/data/train.jsonl (label derived from the reply text)
+
+The trained weights are saved as one compressed float16 .npz (a few KB;
+empty hash buckets compress away) and load in a few milliseconds.
+
+Retrain and print per-action precision/recall:
+    python -m backend.intent_model
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .interaction_store import DEFAULT_PATH as INTERACTION_STORE_PATH, open_store
+    from .intents import extract_args
+except ImportError:  # running as a plain script
+    from interaction_store import DEFAULT_PATH as INTERACTION_STORE_PATH, open_store
+    from intents import extract_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.expanduser("~/nunnarivu/models/intent_model.npz")
+TRAIN_FILES = [
+    INTERACTION_STORE_PATH,
+    os.path.join(ROOT, "logs", "nunnarivu_interactions.jsonl"),
+    os.path.join(ROOT, "nunnarivu_finetune", "data", "train.jsonl"),
+]
+
+N_BUCKETS = 1 << 14
+NGRAM_RANGE = (2, 4)
+
+# Below this probability the router asks the LLM instead
+CONFIDENCE_THRESHOLD = 0.8
+
+# Predicted actions that still go to the LLM: "none" needs a generated reply
+# and a shell command must never be guessed from free text
+LLM_ONLY_ACTIONS = {"none", "run_shell"}
+
+Example = Tuple[str, str]  # (text, action)
+
+
+# ---------- Features ----------
+
+
+def featurize(text: str, n_buckets: int = N_BUCKETS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashed char n-grams plus whole words of `text`.
+    Returns (bucket indices, L2-normalised counts).
+    """
+    normalized = " ".join(text.strip().lower().split())
+    padded = f" {normalized} "
+    grams = [
+        padded[i : i + n]
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1)
+        for i in range(len(padded) - n + 1)
+    ]
+    grams.extend("w:" + w for w in normalized.split())
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    # crc32, not hash(): must be stable across processes
+    buckets = np.fromiter(
+        (zlib.crc32(g.encode("utf-8")) % n_buckets for g in grams), dtype=np.int64, count=len(grams)
+    )
+    idx, counts = np.unique(buckets, return_counts=True)
+    vals = counts.astype(np.float32)
+    vals /= np.linalg.norm(vals)
+    return idx, vals
+
+
+def _batch(texts: Sequence[str], n_buckets: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sparse rows for many texts: (row ids, bucket ids, values)."""
+    rows, cols, vals = [], [], []
+    for r, text in enumerate(texts):
+        idx, v = featurize(text, n_buckets)
+        rows.append(np.full(len(idx), r, dtype=np.int64))
+        cols.append(idx)
+        vals.append(v)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+
+
+# ---------- Model ----------
+
+
+class IntentModel:
+    def __init__(self, labels: Sequence[str], weights: np.ndarray, bias: np.ndarray) -> None:
+        self.labels = list(labels)
+        self.weights = weights  # (n_buckets, n_labels)
+        self.bias = bias  # (n_labels,)
+
+    @property
+    def n_buckets(self) -> int:
+        return self.weights.shape[0]
+
+    def probabilities(self, text: str) -> np.ndarray:
+        idx, vals = featurize(text, self.n_buckets)
+        scores = vals @ self.weights[idx] + self.bias
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Most likely action and its probability."""
+        p = self.probabilities(text)
+        best = int(p.argmax())
+        return self.labels[best], float(p[best])
+
+    # ---------- training ----------
+
+    @classmethod
+    def train(
+        cls,
+        examples: Sequence[Example],
+        n_buckets: int = N_BUCKETS,
+        epochs: int = 300,
+        lr: float = 2.0,
+        l2: float = 1e-4,
+    ) -> "IntentModel":
+        """
+        Full-batch gradient descent on softmax cross-entropy. Classes are
+        weighted by inverse frequency: the logs are mostly "open_app".
+        """
+        if not examples:
+            raise ValueError("no training examples")
+        labels = sorted({a for _, a in examples})
+        y = np.array([labels.index(a) for _, a in examples])
+        rows, cols, vals = _batch([t for t, _ in examples], n_buckets)
+
+        n, k = len(examples), len(labels)
+        target = np.zeros((n, k), dtype=np.float32)
+        target[np.arange(n), y] = 1.0
+        class_weight = n / (k * np.bincount(y, minlength=k).astype(np.float32))
+        sample_weight = class_weight[y][:, None]
+
+        weights = np.zeros((n_buckets, k), dtype=np.float32)
+        bias = np.zeros(k, dtype=np.float32)
+        for _ in range(epochs):
+            scores = np.zeros((n, k), dtype=np.float32)
+            np.add.at(scores, rows, vals[:, None] * weights[cols])
+            scores += bias
+            scores -= scores.max(axis=1, keepdims=True)
+            p = np.exp(scores)
+            p /= p.sum(axis=1, keepdims=True)
+
+            delta = sample_weight * (p - target) / n
+            grad = np.zeros_like(weights)
+            np.add.at(grad, cols, vals[:, None] * delta[rows])
+            weights -= lr * (grad + l2 * weights)
+            bias -= lr * delta.sum(axis=0)
+
+        return cls(labels, weights, bias)
+
+    # ---------- persistence ----------
+
+    def save(self, path: str = MODEL_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp,
+            labels=np.array(self.labels),
+            weights=self.weights.astype(np.float16),
+            bias=self.bias,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> "IntentModel":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                [str(x) for x in data["labels"]],
+                data["weights"].astype(np.float32),
+                data["bias"],
+            )
+
+
+_model: Optional[IntentModel] = None
+_model_loaded = False
+
+
+def get_model() -> Optional[IntentModel]:
+    """The saved model, loaded once. None if it hasn't been trained yet."""
+    global _model, _model_loaded
+    if not _model_loaded:
+        _model_loaded = True
+        if os.path.exists(MODEL_PATH):
+            try:
+                _model = IntentModel.load(MODEL_PATH)
+            except Exception as e:
+                print(f"[WARN] Could not load intent model {MODEL_PATH}: {e}")
+    return _model
+
+
+def set_model(model: Optional[IntentModel]) -> None:
+    """Replace the loaded model (None = disable)."""
+    global _model, _model_loaded
+    _model, _model_loaded = model, True
+
+
+def predict_intent(text: str, threshold: Optional[float] = None) -> Optional[Dict[str, object]]:
+    """
+    {"action", "args", "confidence"} if the model is confident and the args
+    could be filled from `text`, else None.
+
+    Actions in LLM_ONLY_ACTIONS are never returned ("run the tests for
+    me" is not a command line).
+    """
+    model = get_model()
+    if model is None:
+        return None
+    action, confidence = model.predict(text)
+    if action in LLM_ONLY_ACTIONS or confidence < (CONFIDENCE_THRESHOLD if threshold is None else threshold):
+        return None
+    args = extract_args(action, text)
+    if args is None:
+        return None
+    return {"action": action, "args": args, "confidence": confidence}
+
+
+# ---------- Training data ----------
+
+_REPLY_LABELS = [
+    (re.compile(r"^opening (?:your )?.+ folder", re.I), "open_folder"),
+    (re.compile(r"^opening ", re.I), "open_app"),
+    (re.compile(r"^setting (?:the )?volume", re.I), "set_volume"),
+]
+
+
+def _label_from_reply(reply: str) -> str:
+    for pattern, action in _REPLY_LABELS:
+        if pattern.search(reply):
+            return action
+    return "none"
+
+
+def load_examples(paths: Iterable[str] = TRAIN_FILES) -> List[Example]:
+    """
+    (text, action) pairs from interaction logs/stores and instruction files.
+    Instruction rows with an "input" depend on context the classifier
+    never sees, so they're skipped.
+    """
+    out: List[Example] = []
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"[WARN] No training file at {path}")
+            continue
+        store = open_store(path)
+        for row in store.iter_entries():
+            if "user_text" in row:
+                action = (row.get("assistant_action") or {}).get("action")
+                if row["user_text"].strip() and action:
+                    out.append((row["user_text"], action))
+            elif "instruction" in row and not row.get("input"):
+                out.append((row["instruction"], _label_from_reply(row.get("output", ""))))
+        store.close()
+    return out
+
+
+# ---------- Evaluation ----------
+
+
+def cross_validate(examples: Sequence[Example], folds: int = 5, **train_kwargs) -> Dict[str, Dict[str, float]]:
+    """Per-action precision/recall/support over k folds."""
+    order = np.random.default_rng(0).permutation(len(examples))
+    tp: Dict[str, int] = {}
+    fp: Dict[str, int] = {}
+    fn: Dict[str, int] = {}
+    for fold in range(folds):
+        held = set(order[fold::folds].tolist())
+        train = [e for i, e in enumerate(examples) if i not in held]
+        if not train or not held:
+            continue
+        model = IntentModel.train(train, **train_kwargs)
+        for i in held:
+            text, gold = examples[i]
+            pred, _ = model.predict(text)
+            if pred == gold:
+                tp[gold] = tp.get(gold, 0) + 1
+            else:
+                fp[pred] = fp.get(pred, 0) + 1
+                fn[gold] = fn.get(gold, 0) + 1
+
+    report = {}
+    for action in sorted({a for _, a in examples}):
+        t, p, n = tp.get(action, 0), fp.get(action, 0), fn.get(action, 0)
+        report[action] = {
+            "precision": t / (t + p) if t + p else 0.0,
+            "recall": t / (t + n) if t + n else 0.0,
+            "support": t + n,
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Retrain the intent classifier.")
+    parser.add_argument("--data", nargs="*", default=TRAIN_FILES, help="JSONL logs / instruction files")
+    parser.add_argument("--out", default=MODEL_PATH)
+    parser.add_argument("--folds", type=int, default=5)
+    args = parser.parse_args()
+
+    examples = load_examples(args.data)
+    if not examples:
+        print("[WARN] No training examples found.")
+        return
+    print(f"[INFO] {len(examples)} examples")
+
+    report = cross_validate(examples, folds=args.folds)
+    print(f"{'action':<22} {'precision':>9} {'recall':>7} {'support':>8}")
+    for action, row in report.items():
+        print(f"{action:<22} {row['precision']:9.2f} {row['recall']:7.2f} {row['support']:8d}")
+
+    model = IntentModel.train(examples)
+    model.save(args.out)
+
+    t0 = time.perf_counter()
+    IntentModel.load(args.out)
+    load_ms = (time.perf_counter() - t0) * 1000.0
+    size_kb = os.path.getsize(args.out) / 1024.0
+    print(f"[OK] Saved {args.out} ({size_kb:.0f} KB, loads in {load_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+# backend/intents.py
+"""
+Local fast-path intent engine.
+
+Compiled rules that resolve the common commands without asking the LLM:
+
+    "open safari"              -> open_app    {"name": "safari"}
+    "can you start chrome"     -> open_app    {"name": "chrome"}   (installed apps only)
+    "open downloads folder"    -> open_folder {"path": "~/Downloads"}
+    "set volume to 20"         -> set_volume  {"level": 20}
+    "hey sunny volume thirty"  -> set_volume  {"level": 30}
+    "cover letter for https://..." -> create_cover_letter {"url": ..., "name": ...}
+    "hey" / "what can you do"  -> none        (canned reply)
+
+match_intent() returns the same {"action", "args"} shape the LLM path logs
+(plus "assistant_reply" for "none"), or None to fall through to the LLM.
+
+Shell commands never take the fast path: run_shell only comes from the
+LLM, whose output the router validates like every other action.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+
+# ---------- Spoken numbers (the Vosk grammar emits words, not digits) ----------
+
+_UNITS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15,
+    "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+_TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+
+
+def parse_number(text: str) -> Optional[int]:
+    """
+    "20", "20%", "twenty", "thirty five", "one hundred", "hundred" -> int.
+    Returns None if the text isn't a number.
+    """
+    text = text.strip().rstrip("%").strip()
+    if text.isdigit():
+        return int(text)
+
+    words = [w for w in re.split(r"[\s-]+", text) if w and w != "and"]
+    if not words:
+        return None
+
+    total = 0
+    current = 0
+    for w in words:
+        if w in _UNITS:
+            current += _UNITS[w]
+        elif w in _TENS:
+            current += _TENS[w]
+        elif w == "hundred":
+            current = (current or 1) * 100
+        else:
+            return None
+    return total + current
+
+
+# ---------- Rules ----------
+
+# Wake phrase and politeness that don't change the meaning
+_PREFIX = re.compile(
+    r"^(?:(?:hey|hi|ok|okay)\s+sunny[,!.]?\s+)?"
+    r"(?:(?:can|could|would|will)\s+you\s+)?(?:please\s+)?"
+)
+_SUFFIX = re.compile(r"\s*(?:,?\s*please)?[.!?]*$")
+
+# Folders that have no same-named macOS app can skip the word "folder"
+_FOLDERS = {
+    "downloads": "~/Downloads",
+    "documents": "~/Documents",
+    "desktop": "~/Desktop",
+    "pictures": "~/Pictures",
+    "music": "~/Music",
+    "movies": "~/Movies",
+    "home": "~/",
+    "applications": "/Applications",
+}
+_FOLDERS_WITHOUT_SUFFIX = {"downloads", "documents", "desktop"}
+
+GREETING_REPLY = "Hi, I'm Sunny. How can I help you?"
+
+_CANNED: Dict[str, str] = {
+    "what can you do": (
+        "I can control your Mac, open apps and folders, adjust settings, "
+        "run terminal commands, and help you with development."
+    ),
+    "who are you": "I'm Sunny, the assistant of Nunnarivu, your offline AI OS layer.",
+    "what is nunnarivu": (
+        "Nunnarivu is an offline AI OS layer running on your Mac, "
+        "with me as your assistant Sunny."
+    ),
+    "thanks": "You're welcome!",
+    "thank you": "You're welcome!",
+}
+
+Intent = Dict[str, Any]
+_Builder = Callable[["re.Match[str]"], Optional[Intent]]
+
+
+def _volume(m: "re.Match[str]") -> Optional[Intent]:
+    level = parse_number(m.group("level"))
+    if level is None:
+        return None
+    return {"action": "set_volume", "args": {"level": level}}
+
+
+def _folder(m: "re.Match[str]") -> Optional[Intent]:
+    name = m.group("folder")
+    if not m.group("suffix") and name not in _FOLDERS_WITHOUT_SUFFIX:
+        return None  # "open music" is the Music app, "open music folder" is ~/Music
+    return {"action": "open_folder", "args": {"path": _FOLDERS[name]}}
+
+
+def _path(m: "re.Match[str]") -> Intent:
+    return {"action": "open_folder", "args": {"path": m.group("path")}}
+
+
+def _cover_letter(m: "re.Match[str]") -> Intent:
+    name = (m.group("name") or "").strip().title() or "Applicant"
+    return {"action": "create_cover_letter", "args": {"url": m.group("url"), "name": name}}
+
+
+def _open_app(m: "re.Match[str]") -> Optional[Intent]:
+    name = m.group("name").strip()
+    if name in {"it", "that", "this", "them"}:
+        return None  # needs conversation context -> LLM
+    return {"action": "open_app", "args": {"name": name}}
+
+
+def _greeting(m: "re.Match[str]") -> Intent:
+    return {"action": "none", "args": {}, "assistant_reply": GREETING_REPLY}
+
+
+def _canned(m: "re.Match[str]") -> Intent:
+    return {"action": "none", "args": {}, "assistant_reply": _CANNED[m.group("q")]}
+
+
+_NUMBER = r"(?P<level>\d{1,3}\s*%?|[a-z][a-z\s-]*?)(?:\s*(?:percent|%))?"
+_FOLDER_NAMES = "|".join(_FOLDERS)
+
+# Order matters: first match wins. open_app is the catch-all for "open X".
+_RULES: List[Tuple[Pattern[str], _Builder]] = [
+    (re.compile(
+        r"^(?:(?:set|change|turn|put|reduce|lower|raise|increase)\s+)?(?:the\s+)?"
+        r"(?:volume|sound)\s+(?:(?:level\s+)?(?:to|at)\s+)?" + _NUMBER + r"$"
+    ), _volume),
+    (re.compile(
+        r"^(?:open|show)\s+(?:my\s+|the\s+)?(?P<folder>" + _FOLDER_NAMES + r")"
+        r"(?P<suffix>\s+folder)?$"
+    ), _folder),
+    (re.compile(r"^(?:open\s+)?(?:folder\s+)?(?P<path>~(?:/\S*)?|/\S+)$"), _path),
+    (re.compile(
+        r"^(?:create|write|make|generate)?\s*(?:a\s+|my\s+)?cover\s+letter\s+(?:for\s+)?"
+        r"(?P<url>https?://\S+)(?:\s+(?:for|as|named)\s+(?P<name>[a-z][a-z\s.'-]*))?$"
+    ), _cover_letter),
+    (re.compile(r"^(?:open|launch)\s+(?:the\s+)?(?P<name>.+?)(?:\s+app)?$"), _open_app),
+    (re.compile(
+        r"^(?:hey|hi|hello|yo|good\s+(?:morning|afternoon|evening))(?:\s+(?:there|sunny))?$"
+    ), _greeting),
+    (re.compile(r"^(?P<q>" + "|".join(re.escape(q) for q in _CANNED) + r")(?:\s+sunny)?$"), _canned),
+]
+
+
+# "start X" is also "start a timer", "start over", ...: only an app the
+# caller knows about (match_intent's known_app) is opened
+_START_APP = re.compile(r"^start\s+(?:the\s+)?(?P<name>.+?)(?:\s+app)?$")
+
+
+def match_intent(text: str, known_app: Optional[Callable[[str], bool]] = None) -> Optional[Intent]:
+    """
+    Resolve `text` locally, or return None if it needs the LLM.
+    `known_app(name)` says whether `name` is an installed app; without it
+    "start X" is left to the LLM.
+    """
+    normalized = " ".join(text.strip().lower().split())
+    if not normalized:
+        return None
+
+    # Keep "hey sunny" itself a greeting; only strip it in front of a command
+    stripped = _SUFFIX.sub("", _PREFIX.sub("", normalized, count=1))
+    candidates = [stripped] if stripped else []
+    if normalized not in candidates:
+        candidates.append(_SUFFIX.sub("", normalized))
+
+    for candidate in candidates:
+        for pattern, build in _RULES:
+            m = pattern.match(candidate)
+            if m is None:
+                continue
+            intent = build(m)
+            if intent is not None:
+                return intent
+        m = _START_APP.match(candidate)
+        if m is not None and known_app is not None and known_app(m.group("name")):
+            return _open_app(m)
+    return None
+
+
+# ---------- Slot filling for a known action ----------
+#
+# Used when something else (the learned classifier in .intent_model) has
+# already picked the action and only the args need to be pulled out.
+
+_NUMBER_WORDS = "|".join(list(_UNITS) + list(_TENS) + ["hundred"])
+_NUMBER_SPAN = re.compile(
+    r"\b(\d{1,3})\s*%?|\b((?:(?:" + _NUMBER_WORDS + r")[\s-]*)+)"
+)
+_APP_LEAD = re.compile(
+    r"^(?:open|launch|start|bring\s+up|fire\s+up|pull\s+up|show|get|switch\s+to)\s+(?:up\s+)?(?:the\s+|my\s+)?"
+)
+_APP_TAIL = re.compile(r"\s+(?:app|application)?\s*(?:for\s+me|now|up|for\s+a\s+bit)?$")
+_PATH = re.compile(r"(~(?:/\S*)?|/\S+)")
+_URL = re.compile(r"https?://\S+")
+_COVER_NAME = re.compile(r"\b(?:for|as|named)\s+(?P<name>[a-z][a-z\s.'-]*)$")
+
+
+def extract_args(action: str, text: str) -> Optional[Dict[str, Any]]:
+    """
+    Fill the args for `action` from `text`, or None if they can't be found.
+    run_shell is never filled: a shell command only comes from the LLM.
+    """
+    normalized = " ".join(text.strip().lower().split())
+    core = _SUFFIX.sub("", _PREFIX.sub("", normalized, count=1))
+
+    if action == "set_volume":
+        m = _NUMBER_SPAN.search(core)
+        if m is None:
+            return None
+        level = parse_number(m.group(1) or m.group(2))
+        return None if level is None else {"level": level}
+
+    if action == "open_folder":
+        m = _PATH.search(core)
+        if m is not None:
+            return {"path": m.group(1)}
+        for name, path in _FOLDERS.items():
+            if re.search(r"\b" + name + r"\b", core):
+                return {"path": path}
+        return None
+
+    if action == "open_app":
+        name = _APP_TAIL.sub("", _APP_LEAD.sub("", core, count=1)).strip()
+        if not name or name in {"it", "that", "this", "them"} or name == core:
+            return None  # no verb stripped -> not sure what the app is
+        return {"name": name}
+
+    if action == "create_cover_letter":
+        m = _URL.search(core)
+        if m is None:
+            return None
+        args: Dict[str, Any] = {"url": m.group(0)}
+        rest = core[m.end():].strip()
+        n = _COVER_NAME.search(rest)
+        if n is not None:
+            args["name"] = n.group("name").strip().title()
+        return args
+
+    return None
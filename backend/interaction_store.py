@@ -0,0 +1,439 @@
+# backend/interaction_store.py
+"""
+Pluggable storage for interaction log entries.
+
+An entry is the dict the router logs:
+    {"timestamp", "user_text", "assistant_action", "assistant_reply",
+     "latency_ms", "slow", ...}
+
+Backends (picked from the file extension by open_store):
+  - SQLiteStore (.sqlite3 / .sqlite / .db): WAL, batched inserts, indexes on
+    timestamp, action and slow, so "slow open_app calls this week" is an
+    index lookup instead of a full scan. The JSONL log it replaces (same
+    name, .jsonl) is imported the first time the database is opened.
+  - JsonlStore (anything else): the original append-only JSONL file.
+
+CLI (migrate / export / query):
+    python -m backend.interaction_store import ~/nunnarivu/logs/nunnarivu_interactions.jsonl
+    python -m backend.interaction_store export out.jsonl
+    python -m backend.interaction_store query --action open_app --slow --days 7
+"""
+
+from __future__ import annotations
+
+import abc
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+Entry = Dict[str, Any]
+
+DEFAULT_PATH = os.path.expanduser("~/nunnarivu/logs/nunnarivu_interactions.sqlite3")
+SQLITE_SUFFIXES = (".sqlite3", ".sqlite", ".db")
+
+# Columns of their own; any other keys go into the "extra" JSON column
+_CORE_KEYS = ("timestamp", "user_text", "assistant_action", "assistant_reply", "latency_ms", "slow")
+
+
+class InteractionStore(abc.ABC):
+    """Interface every backend implements."""
+
+    path: str
+
+    @abc.abstractmethod
+    def add_many(self, entries: Sequence[Entry]) -> None:
+        """Append `entries` (one batch)."""
+
+    def add(self, entry: Entry) -> None:
+        self.add_many([entry])
+
+    @abc.abstractmethod
+    def query(
+        self,
+        action: Optional[str] = None,
+        slow: Optional[bool] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = None,
+        newest_first: bool = False,
+    ) -> List[Entry]:
+        """Entries matching every given filter, in timestamp order."""
+
+    @abc.abstractmethod
+    def iter_entries(self) -> Iterator[Entry]:
+        """Every entry, oldest first."""
+
+    def count(self) -> int:
+        return sum(1 for _ in self.iter_entries())
+
+    def close(self) -> None:
+        pass
+
+    # ---------- migration ----------
+
+    def import_jsonl(self, path: str, batch_size: int = 1000) -> int:
+        """Append every entry from a JSONL log. Returns how many were read."""
+        n = 0
+        batch: List[Entry] = []
+        for entry in read_jsonl(path):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                self.add_many(batch)
+                n += len(batch)
+                batch = []
+        if batch:
+            self.add_many(batch)
+            n += len(batch)
+        return n
+
+    def export_jsonl(self, path: str) -> int:
+        """Write every entry to a JSONL file. Returns how many were written."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        n = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for entry in self.iter_entries():
+                f.write(json.dumps(entry) + "\n")
+                n += 1
+        return n
+
+
+def read_jsonl(path: str) -> Iterator[Entry]:
+    """Parsed entries from a JSONL log, skipping bad lines."""
+    if not os.path.exists(path):
+        print(f"[WARN] No log file found at {path}")
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"[WARN] Skipping bad line: {line[:80]}...")
+
+
+def _matches(
+    entry: Entry,
+    action: Optional[str],
+    slow: Optional[bool],
+    since: Optional[float],
+    until: Optional[float],
+) -> bool:
+    ts = entry.get("timestamp", 0.0)
+    if action is not None and (entry.get("assistant_action") or {}).get("action") != action:
+        return False
+    if slow is not None and bool(entry.get("slow")) != slow:
+        return False
+    if since is not None and ts < since:
+        return False
+    if until is not None and ts >= until:
+        return False
+    return True
+
+
+class JsonlStore(InteractionStore):
+    """Append-only JSONL file (queries scan the whole file)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def add_many(self, entries: Sequence[Entry]) -> None:
+        if not entries:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(e) + "\n" for e in entries))
+
+    def iter_entries(self) -> Iterator[Entry]:
+        if not os.path.exists(self.path):
+            return iter(())
+        return read_jsonl(self.path)
+
+    def query(
+        self,
+        action: Optional[str] = None,
+        slow: Optional[bool] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = None,
+        newest_first: bool = False,
+    ) -> List[Entry]:
+        rows = [e for e in self.iter_entries() if _matches(e, action, slow, since, until)]
+        rows.sort(key=lambda e: e.get("timestamp", 0.0), reverse=newest_first)
+        return rows[:limit] if limit is not None else rows
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id              INTEGER PRIMARY KEY,
+    timestamp       REAL NOT NULL,
+    user_text       TEXT NOT NULL,
+    action          TEXT,
+    args            TEXT,
+    assistant_reply TEXT,
+    latency_ms      REAL,
+    slow            INTEGER NOT NULL DEFAULT 0,
+    extra           TEXT
+);
+CREATE INDEX IF NOT EXISTS interactions_timestamp ON interactions(timestamp);
+CREATE INDEX IF NOT EXISTS interactions_action ON interactions(action, timestamp);
+CREATE INDEX IF NOT EXISTS interactions_slow ON interactions(slow, timestamp);
+CREATE TABLE IF NOT EXISTS imported_logs (
+    path        TEXT PRIMARY KEY,
+    entries     INTEGER NOT NULL,
+    imported_at REAL NOT NULL
+);
+"""
+
+
+def legacy_jsonl_path(path: str) -> str:
+    """The JSONL log a SQLite store at `path` replaces (same name, .jsonl)."""
+    return os.path.splitext(path)[0] + ".jsonl"
+
+
+class SQLiteStore(InteractionStore):
+    """
+    Interactions in SQLite (WAL). One transaction per add_many() batch.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+        legacy = legacy_jsonl_path(path)
+        if os.path.exists(legacy):
+            self._import_legacy(legacy)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per-thread; WAL lets them work side by side
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_row(entry: Entry) -> Tuple[Any, ...]:
+        action_obj = entry.get("assistant_action") or {}
+        extra = {k: v for k, v in entry.items() if k not in _CORE_KEYS}
+        return (
+            float(entry.get("timestamp", time.time())),
+            entry.get("user_text", ""),
+            action_obj.get("action"),
+            json.dumps(action_obj.get("args", {})),
+            entry.get("assistant_reply"),
+            entry.get("latency_ms"),
+            1 if entry.get("slow") else 0,
+            json.dumps(extra) if extra else None,
+        )
+
+    @staticmethod
+    def _from_row(row: Sequence[Any]) -> Entry:
+        ts, user_text, action, args, reply, latency_ms, slow, extra = row
+        entry: Entry = {
+            "timestamp": ts,
+            "user_text": user_text,
+            "assistant_action": {"action": action, "args": json.loads(args) if args else {}},
+            "assistant_reply": reply,
+        }
+        if latency_ms is not None:
+            entry["latency_ms"] = latency_ms
+            entry["slow"] = bool(slow)
+        if extra:
+            entry.update(json.loads(extra))
+        return entry
+
+    _INSERT = (
+        "INSERT INTO interactions "
+        "(timestamp, user_text, action, args, assistant_reply, latency_ms, slow, extra) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+
+    def add_many(self, entries: Sequence[Entry]) -> None:
+        if not entries:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(self._INSERT, [self._to_row(e) for e in entries])
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _import_legacy(self, path: str) -> None:
+        """
+        Import the JSONL log this store replaces, once: in one transaction
+        that also records it, so concurrent first opens import it only once.
+        The JSONL file itself is left in place.
+        """
+        key = os.path.abspath(path)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM imported_logs WHERE path = ?", (key,)).fetchone() is not None:
+                conn.execute("ROLLBACK")
+                return
+            n = 0
+            for entry in read_jsonl(path):
+                conn.execute(self._INSERT, self._to_row(entry))
+                n += 1
+            conn.execute(
+                "INSERT INTO imported_logs (path, entries, imported_at) VALUES (?, ?, ?)", (key, n, time.time())
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        print(f"[OK] Imported {n} entries from {path} into {self.path}")
+
+    _COLUMNS = "timestamp, user_text, action, args, assistant_reply, latency_ms, slow, extra"
+
+    def iter_entries(self) -> Iterator[Entry]:
+        cur = self._conn().execute(f"SELECT {self._COLUMNS} FROM interactions ORDER BY timestamp, id")
+        for row in cur:
+            yield self._from_row(row)
+
+    def _where(
+        self,
+        action: Optional[str],
+        slow: Optional[bool],
+        since: Optional[float],
+        until: Optional[float],
+    ) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if action is not None:
+            clauses.append("action = ?")
+            params.append(action)
+        if slow is not None:
+            clauses.append("slow = ?")
+            params.append(1 if slow else 0)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(
+        self,
+        action: Optional[str] = None,
+        slow: Optional[bool] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = None,
+        newest_first: bool = False,
+    ) -> List[Entry]:
+        where, params = self._where(action, slow, since, until)
+        order = "DESC" if newest_first else "ASC"
+        sql = f"SELECT {self._COLUMNS} FROM interactions{where} ORDER BY timestamp {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._from_row(r) for r in self._conn().execute(sql, params)]
+
+    def explain(self, **filters: Any) -> str:
+        """SQLite's plan for query(**filters) (to check an index is used)."""
+        where, params = self._where(
+            filters.get("action"), filters.get("slow"), filters.get("since"), filters.get("until")
+        )
+        rows = self._conn().execute(
+            f"EXPLAIN QUERY PLAN SELECT {self._COLUMNS} FROM interactions{where} ORDER BY timestamp",
+            params,
+        ).fetchall()
+        return "\n".join(str(r[-1]) for r in rows)
+
+    def count(self) -> int:
+        (n,) = self._conn().execute("SELECT COUNT(*) FROM interactions").fetchone()
+        return n
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def open_store(path: str) -> InteractionStore:
+    """SQLiteStore for .sqlite3/.sqlite/.db paths, JsonlStore otherwise."""
+    if path.endswith(SQLITE_SUFFIXES):
+        return SQLiteStore(path)
+    return JsonlStore(path)
+
+
+_stores: Dict[str, InteractionStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: str) -> InteractionStore:
+    """Shared store per path (opened on first use)."""
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = _stores[path] = open_store(path)
+    return store
+
+
+def write_batch(batch: Iterable[Tuple[str, Entry]]) -> None:
+    """
+    Log-writer sink: (path, entry) pairs -> one add_many() per store.
+    """
+    by_path: Dict[str, List[Entry]] = defaultdict(list)
+    for path, entry in batch:
+        by_path[path].append(entry)
+    for path, entries in by_path.items():
+        get_store(path).add_many(entries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import, export or query the interaction log.")
+    parser.add_argument("--db", default=DEFAULT_PATH, help="store to use (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("import", help="append a JSONL log to the store")
+    p_import.add_argument("jsonl")
+    p_export = sub.add_parser("export", help="write the store out as JSONL")
+    p_export.add_argument("jsonl")
+    p_query = sub.add_parser("query", help="print matching entries as JSONL")
+    p_query.add_argument("--action")
+    p_query.add_argument("--slow", action="store_true")
+    p_query.add_argument("--days", type=float, help="only the last N days")
+    p_query.add_argument("--limit", type=int)
+
+    args = parser.parse_args()
+    store = open_store(args.db)
+
+    if args.command == "import":
+        n = store.import_jsonl(args.jsonl)
+        print(f"[OK] Imported {n} entries into {args.db}")
+    elif args.command == "export":
+        n = store.export_jsonl(args.jsonl)
+        print(f"[OK] Exported {n} entries to {args.jsonl}")
+    else:
+        since = time.time() - args.days * 86400 if args.days else None
+        t0 = time.perf_counter()
+        rows = store.query(
+            action=args.action, slow=True if args.slow else None, since=since, limit=args.limit
+        )
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        for entry in rows:
+            print(json.dumps(entry))
+        print(f"[INFO] {len(rows)} entries in {elapsed_ms:.1f} ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# backend/llm_broker.py
+"""
+One LLM priority queue for every Sunny process.
+
+An LLMScheduler (.llm_scheduler) only orders the generations of its own
+process, but sunny_voice.py, sunny_dev.py, the CLI and the server's
+workers are separate processes sharing one Ollama box. The broker owns the
+scheduler; every other process takes its slots over a Unix socket:
+
+    client -> broker   "slot voice\n"
+    broker -> client   "ok 12.500\n"      (granted, after 12.5 ms in the queue)
+    ...the client generates, then closes the connection (= release)
+
+    client -> broker   "stats\n"
+    broker -> client   {"voice": {...}, ...}\n
+
+A client that dies or gives up while queued just closes its connection, so
+a slot is never leaked. If no broker is running, RemoteScheduler falls back
+to the scheduler of its own process.
+
+The server hosts the broker (in its event loop, or in its own process with
+--processes); without a server, run it on its own:
+
+Usage:
+    python -m backend.llm_broker                 # at llm_client.LLM_BROKER_PATH
+    python -m backend.llm_broker --path /tmp/sunny-llm.sock
+
+    llm_client.get_scheduler()   # a RemoteScheduler when LLM_BROKER_PATH is set
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Set
+
+try:
+    from .llm_scheduler import (
+        CANCEL_POLL_S,
+        PRIORITIES,
+        QUEUE_WAIT_SECONDS,
+        LLMCancelled,
+        LLMScheduler,
+        Ticket,
+        current_cancel_event,
+        current_priority,
+    )
+except ImportError:  # direct script run fallback (see llm_client)
+    from llm_scheduler import (
+        CANCEL_POLL_S,
+        PRIORITIES,
+        QUEUE_WAIT_SECONDS,
+        LLMCancelled,
+        LLMScheduler,
+        Ticket,
+        current_cancel_event,
+        current_priority,
+    )
+
+# Seconds to wait for the broker's answer to "stats"
+STATS_TIMEOUT_S = 1.0
+
+
+# ---------- broker ----------
+
+class LLMBroker:
+    """Serves `scheduler`'s slots on a Unix socket (asyncio)."""
+
+    def __init__(self, scheduler: LLMScheduler, path: str) -> None:
+        self.scheduler = scheduler
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> "LLMBroker":
+        if broker_alive(self.path):
+            raise OSError(f"an LLM broker is already serving {self.path}")
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left behind by a broker that died
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._server = await asyncio.start_unix_server(self._serve_client, self.path)
+        os.chmod(self.path, 0o600)
+        return self
+
+    async def stop(self) -> None:
+        server, self._server = self._server, None
+        if server is None:
+            return
+        server.close()
+        for writer in list(self._clients):
+            writer.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients.add(writer)
+        try:
+            words = (await reader.readline()).decode("ascii", "replace").split()
+            if words == ["stats"]:
+                writer.write(json.dumps(self.scheduler.stats()).encode("utf-8") + b"\n")
+                await writer.drain()
+            elif len(words) == 2 and words[0] == "slot" and words[1] in PRIORITIES:
+                await self._lease(words[1], reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _lease(self, cls: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Queue for a slot, grant it, hold it until the client hangs up."""
+        gone = asyncio.ensure_future(reader.read())  # returns at EOF
+
+        async def hold() -> None:
+            async with self.scheduler.slot_async(cls) as ticket:
+                writer.write(f"ok {ticket.wait_ms:.3f}\n".encode("ascii"))
+                await writer.drain()
+                await asyncio.shield(gone)
+
+        holder = asyncio.ensure_future(hold())
+        try:
+            await asyncio.wait({holder, gone}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # Gone while queued: leave the queue; gone while holding: release
+            holder.cancel()
+            gone.cancel()
+            await asyncio.gather(holder, gone, return_exceptions=True)
+
+
+async def serve(path: str, scheduler: LLMScheduler) -> None:
+    """Run a broker until SIGINT / SIGTERM."""
+    broker = await LLMBroker(scheduler, path).start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await broker.stop()
+
+
+def broker_alive(path: str) -> bool:
+    """True if a broker answers at `path`."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+# ---------- client ----------
+
+class RemoteScheduler:
+    """
+    The scheduler interface (slot, slot_async, stats) backed by the broker
+    at `path`; `fallback` (this process's own scheduler) is used while no
+    broker answers there.
+    """
+
+    def __init__(self, path: str, fallback: LLMScheduler) -> None:
+        self.path = path
+        self.fallback = fallback
+        self._warned = False
+
+    def _connected(self, ok: bool) -> None:
+        # No socket file just means no broker was started (a standalone
+        # process): say nothing. A socket nobody answers on is worth a warning.
+        if not ok and not self._warned and os.path.exists(self.path):
+            print(f"[WARN] No LLM broker at {self.path}: LLM calls are only ordered within this process.")
+        self._warned = not ok
+
+    @staticmethod
+    def _class(cls: Optional[str]) -> str:
+        cls = cls or current_priority()
+        if cls not in PRIORITIES:
+            raise ValueError(f"unknown priority class {cls!r}")
+        return cls
+
+    @staticmethod
+    def _ticket(cls: str, wait_ms: float) -> Ticket:
+        ticket = Ticket(cls, 0)
+        ticket.wait_ms = wait_ms
+        QUEUE_WAIT_SECONDS.labels(priority=cls).observe(wait_ms / 1000.0)
+        return ticket
+
+    def _request(self, cls: str) -> Optional[socket.socket]:
+        """Connected socket with the slot request sent, or None if no broker answers."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+            sock.sendall(f"slot {cls}\n".encode("ascii"))
+        except OSError:
+            sock.close()
+            self._connected(False)
+            return None
+        self._connected(True)
+        return sock
+
+    @contextmanager
+    def slot(self, cls: Optional[str] = None) -> Iterator[Ticket]:
+        """Hold one of the broker's slots for the block (see LLMScheduler.slot)."""
+        cls = self._class(cls)
+        cancel = current_cancel_event()
+        if cancel is not None and cancel.is_set():
+            raise LLMCancelled()
+        sock = self._request(cls)
+        wait_ms = None
+        if sock is not None:
+            try:
+                wait_ms = _wait_for_grant(sock, cancel)
+            except BaseException:
+                sock.close()  # the broker drops us from its queue
+                raise
+        if wait_ms is None:
+            if sock is not None:
+                sock.close()
+                self._connected(False)
+            with self.fallback.slot(cls) as ticket:
+                yield ticket
+            return
+        try:
+            yield self._ticket(cls, wait_ms)
+        finally:
+            sock.close()
+
+    @asynccontextmanager
+    async def slot_async(self, cls: Optional[str] = None) -> AsyncIterator[Ticket]:
+        """asyncio version of slot()."""
+        cls = self._class(cls)
+        writer = None
+        wait_ms = None
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.path)
+            writer.write(f"slot {cls}\n".encode("ascii"))
+            words = (await reader.readline()).decode("ascii", "replace").split()
+            if len(words) == 2 and words[0] == "ok":
+                wait_ms = float(words[1])
+        except OSError:
+            pass
+        except BaseException:
+            if writer is not None:
+                writer.close()
+            raise
+        self._connected(wait_ms is not None)
+        if wait_ms is None:
+            if writer is not None:
+                writer.close()
+            async with self.fallback.slot_async(cls) as ticket:
+                yield ticket
+            return
+        try:
+            yield self._ticket(cls, wait_ms)
+        finally:
+            writer.close()
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(STATS_TIMEOUT_S)
+                sock.connect(self.path)
+                sock.sendall(b"stats\n")
+                return json.loads(_read_line(sock))
+        except (OSError, ValueError):
+            return self.fallback.stats()
+
+
+def _read_line(sock: socket.socket) -> bytes:
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _wait_for_grant(sock: socket.socket, cancel: Optional[Any]) -> Optional[float]:
+    """Queue wait (ms) once the broker grants the slot; None if it went away."""
+    sock.settimeout(None if cancel is None else CANCEL_POLL_S)
+    data = b""
+    while not data.endswith(b"\n"):
+        try:
+            chunk = sock.recv(64)
+        except socket.timeout:
+            if cancel is not None and cancel.is_set():
+                raise LLMCancelled()
+            continue
+        except OSError:
+            return None
+        if not chunk:
+            return None
+        data += chunk
+    words = data.decode("ascii", "replace").split()
+    if len(words) != 2 or words[0] != "ok":
+        return None
+    sock.settimeout(None)
+    return float(words[1])
+
+
+def main() -> None:
+    from . import llm_client
+
+    parser = argparse.ArgumentParser(description="Share one LLM priority queue between Sunny processes.")
+    parser.add_argument("--path", default=llm_client.LLM_BROKER_PATH, help="Unix socket to serve")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("no --path and llm_client.LLM_BROKER_PATH is not set")
+
+    print(f"[OK] LLM broker on {args.path} (pid {os.getpid()}). Ctrl-C to stop.")
+    asyncio.run(serve(args.path, llm_client.new_scheduler()))
+
+
+if __name__ == "__main__":
+    main()
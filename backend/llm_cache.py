@@ -0,0 +1,164 @@
+# backend/llm_cache.py
+"""
+Persistent LLM response cache shared by every Sunny process.
+
+Backed by SQLite in WAL mode, so the CLI, voice and server processes can read
+and write the same file concurrently. Entries are keyed on the model name plus
+the normalized messages, expire after a TTL and are evicted least-recently-used
+once the cache grows past max_entries.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key       TEXT PRIMARY KEY,
+    response  TEXT NOT NULL,
+    complete  INTEGER NOT NULL,
+    created   REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache(last_used);
+"""
+
+
+def _normalize_content(text: str) -> str:
+    """
+    Whitespace differences shouldn't defeat the cache. Case is kept: prompts
+    that differ only in case (shell commands, paths, code) are different.
+    """
+    return " ".join(text.split())
+
+
+def make_cache_key(model: str, messages: List[Dict[str, str]], **options: object) -> str:
+    """
+    Stable key for (model, normalized messages, extra request options).
+    """
+    normalized = [
+        [m.get("role", "user"), _normalize_content(m.get("content", ""))]
+        for m in messages
+    ]
+    blob = json.dumps([model, normalized, options], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    LRU + TTL cache of LLM replies on disk.
+
+    A row is "complete" when it holds the whole generation. Streams that the
+    caller closed early (the router stops once it has the action) are stored
+    as incomplete: only get(allow_partial=True) returns them, for a caller
+    that would have stopped at the same point.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 5000,
+        ttl_s: float = 24 * 3600.0,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per-thread; WAL lets them work side by side
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, allow_partial: bool = False) -> Optional[Tuple[str, bool]]:
+        """
+        Return (response, complete) or None on a miss / expired entry.
+        """
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT response, complete, created FROM llm_cache WHERE key = ?",
+            (key,),
+        ).fetchone()
+
+        if row is not None and now - row[2] > self.ttl_s:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            row = None
+        if row is not None and not row[1] and not allow_partial:
+            row = None
+
+        if row is None:
+            self._bump("misses")
+            return None
+
+        conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        self._bump("hits")
+        return row[0], bool(row[1])
+
+    def put(self, key: str, response: str, complete: bool = True) -> None:
+        now = time.time()
+        conn = self._conn()
+        if not complete:
+            # Never downgrade a complete answer to a partial one
+            conn.execute(
+                "INSERT OR IGNORE INTO llm_cache VALUES (?, ?, 0, ?, ?)",
+                (key, response, now, now),
+            )
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, 1, ?, ?)",
+                (key, response, now, now),
+            )
+        self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (count,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        self._bump("evictions", excess)
+
+    def _bump(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, int]:
+        (size,) = self._conn().execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": size,
+        }
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
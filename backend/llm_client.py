@@ -1,10 +1,549 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
 import requests
-from typing import List, Dict
+from requests.adapters import HTTPAdapter
+
+# Support both "python -m backend.llm_client" and "python backend/llm_client.py"
+try:
+    from .async_http import AsyncHTTPPool
+    from .llm_cache import LLMCache, make_cache_key
+    from .llm_metrics import LLMMetrics, LLMResult, model_stats, record as record_metrics
+    from .llm_broker import RemoteScheduler
+    from .llm_pool import EndpointPool, NoHealthyEndpoint, is_endpoint_failure
+    from .llm_scheduler import PRIORITIES, LLMCancelled, LLMScheduler, current_cancel_event
+    from . import metrics as _metrics
+    from .privacy import is_very_sensitive, mask_sensitive_text
+    from .tracing import annotate
+except ImportError:  # direct script run fallback
+    from async_http import AsyncHTTPPool
+    from llm_cache import LLMCache, make_cache_key
+    from llm_metrics import LLMMetrics, LLMResult, model_stats, record as record_metrics
+    from llm_broker import RemoteScheduler
+    from llm_pool import EndpointPool, NoHealthyEndpoint, is_endpoint_failure
+    from llm_scheduler import PRIORITIES, LLMCancelled, LLMScheduler, current_cancel_event
+    import metrics as _metrics
+    from privacy import is_very_sensitive, mask_sensitive_text
+    from tracing import annotate
 
 # Talk to the server-side Ollama instance
 OLLAMA_URL = "http://10.2.51.11:11434/api/generate"
 MODEL_NAME = "phi3:latest"
 
+# Optional pool of Ollama hosts. When non-empty, every call goes to the
+# least-loaded healthy host instead of OLLAMA_URL, e.g.
+#   OLLAMA_ENDPOINTS = ["http://10.2.51.11:11434", "http://10.2.51.12:11434"]
+OLLAMA_ENDPOINTS: List[str] = []
+# Re-send a slow request (past the pool's p95) to a second host; first wins
+HEDGE_REQUESTS = False
+
+REQUEST_TIMEOUT = 120  # seconds
+# Fail fast on a dead host instead of waiting out REQUEST_TIMEOUT
+CONNECT_TIMEOUT = 3.0  # seconds
+# Keep the model (and its prompt cache) loaded between calls. If Ollama
+# unloads phi3, the cached system-prompt prefix is lost with it.
+KEEP_ALIVE = "30m"
+# Max keep-alive connections held open to the Ollama host
+POOL_MAXSIZE = 16
+
+# Response cache shared by all Sunny processes (CLI, voice, server)
+CACHE_ENABLED = True
+CACHE_PATH = os.path.expanduser("~/nunnarivu/cache/llm_cache.sqlite3")
+CACHE_MAX_ENTRIES = 5000
+CACHE_TTL_S = 24 * 3600.0
+
+# Generations run at once per Ollama host (match OLLAMA_NUM_PARALLEL) and the
+# share of them each priority class may use (.llm_scheduler). Voice can use
+# every slot, batch work (coding chats, cover letters) only a quarter.
+LLM_SLOTS_PER_HOST = 4
+PRIORITY_SHARES = {"voice": 1.0, "interactive": 0.75, "batch": 0.25}
+# Slots only voice may take, however busy interactive and batch work are
+VOICE_RESERVED_SLOTS = 1
+# Seconds of waiting that count as one priority class better (no starvation)
+PRIORITY_AGING_S = 5.0
+# Unix socket of the LLM broker (.llm_broker) that orders the generations of
+# every Sunny process (voice, dev chat, CLI, server). None: per process only.
+# While nothing listens there, each process orders its own calls (silently
+# if the socket file doesn't exist).
+LLM_BROKER_PATH: Optional[str] = os.path.expanduser("~/nunnarivu/run/llm_broker.sock")
+
+T = TypeVar("T")
+
+# Registry metrics (.metrics); the rolling per-model stats stay in .llm_metrics
+GENERATIONS = _metrics.counter(
+    "sunny_llm_generations_total", "Upstream generations (complete=false: closed early)", ["model", "complete"]
+)
+GENERATION_SECONDS = _metrics.histogram(
+    "sunny_llm_generation_seconds", "Upstream generation wall time", ["model"]
+)
+FIRST_TOKEN_SECONDS = _metrics.histogram(
+    "sunny_llm_first_token_seconds", "Time to the first streamed token", ["model"]
+)
+TOKENS = _metrics.counter("sunny_llm_tokens_total", "Tokens generated", ["model"])
+CACHE_LOOKUPS = _metrics.counter("sunny_llm_cache_total", "Response cache lookups", ["result"])
+
+# ---------- Transport: one keep-alive session per process ----------
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# asyncio connections belong to the loop that opened them -> one pool per loop
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncHTTPPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_session() -> requests.Session:
+    """
+    Return the shared requests.Session used for all Ollama calls.
+
+    Reusing it keeps TCP connections alive between calls, so a voice command
+    or a sunny_dev.py turn doesn't pay a new connect to OLLAMA_URL each time.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=POOL_MAXSIZE,
+                    pool_block=False,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def close_session() -> None:
+    """Drop the shared session (e.g. at shutdown or after changing OLLAMA_URL)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_async_pool() -> AsyncHTTPPool:
+    """Return the keep-alive pool for the running event loop."""
+    loop = asyncio.get_running_loop()
+    pool = _async_pools.get(loop)
+    if pool is None:
+        pool = AsyncHTTPPool(max_per_host=POOL_MAXSIZE, timeout=REQUEST_TIMEOUT)
+        _async_pools[loop] = pool
+    return pool
+
+
+# ---------- Endpoint pool ----------
+
+_pool: Optional[EndpointPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[EndpointPool]:
+    """
+    Return the endpoint pool built from OLLAMA_ENDPOINTS (health probes
+    running), or None when only the single OLLAMA_URL is used.
+    """
+    global _pool
+    if _pool is None and OLLAMA_ENDPOINTS:
+        with _pool_lock:
+            if _pool is None:
+                _pool = EndpointPool(OLLAMA_ENDPOINTS, hedge=HEDGE_REQUESTS).start()
+    return _pool
+
+
+def configure_endpoints(urls: Sequence[str], hedge: bool = False, **pool_options: Any) -> Optional[EndpointPool]:
+    """
+    Switch to a new set of Ollama hosts (an empty list goes back to OLLAMA_URL).
+    Extra options go to EndpointPool (probe_interval_s, hedge_min_delay_ms, ...).
+    """
+    global _pool, OLLAMA_ENDPOINTS, HEDGE_REQUESTS
+    with _pool_lock:
+        if _pool is not None:
+            _pool.stop()
+            _pool = None
+        OLLAMA_ENDPOINTS = list(urls)
+        HEDGE_REQUESTS = hedge
+        if OLLAMA_ENDPOINTS:
+            _pool = EndpointPool(OLLAMA_ENDPOINTS, hedge=hedge, **pool_options).start()
+    set_scheduler(None)  # capacity follows the number of hosts
+    return _pool
+
+
+# ---------- Priority scheduler ----------
+
+_scheduler: Optional[Union[LLMScheduler, RemoteScheduler]] = None
+_scheduler_lock = threading.Lock()
+
+
+def new_scheduler() -> LLMScheduler:
+    """A scheduler sized from LLM_SLOTS_PER_HOST and the number of Ollama hosts."""
+    total = LLM_SLOTS_PER_HOST * max(1, len(OLLAMA_ENDPOINTS))
+    limits = {cls: max(1, int(PRIORITY_SHARES.get(cls, 1.0) * total)) for cls in PRIORITIES}
+    return LLMScheduler(total, limits, aging_s=PRIORITY_AGING_S, reserved=VOICE_RESERVED_SLOTS)
+
+
+def get_scheduler() -> Union[LLMScheduler, RemoteScheduler]:
+    """
+    Return the scheduler every upstream generation takes a slot from: the
+    LLM broker's (shared by every Sunny process) when LLM_BROKER_PATH is
+    set, with this process's own as the fallback.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                local = new_scheduler()
+                _scheduler = RemoteScheduler(LLM_BROKER_PATH, local) if LLM_BROKER_PATH else local
+    return _scheduler
+
+
+def set_scheduler(scheduler: Optional[Union[LLMScheduler, RemoteScheduler]]) -> None:
+    """Swap the scheduler (None rebuilds it from the settings on next use)."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    """Per priority class: running, queued, limit and queue-wait percentiles."""
+    return get_scheduler().stats()
+
+
+def _post_generate(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST a non-streaming /api/generate request and return the JSON reply."""
+
+    def post(url: str) -> Dict[str, Any]:
+        response = get_session().post(url, json=payload, timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT))
+        response.raise_for_status()
+        return response.json()
+
+    pool = get_pool()
+    if pool is None:
+        return post(OLLAMA_URL)
+    return pool.call(lambda ep: post(ep.generate_url))
+
+
+@contextmanager
+def _open_generate_stream(payload: Dict[str, Any]) -> Iterator[Iterable[bytes]]:
+    """
+    Open a streaming /api/generate response and yield its lines. With a
+    pool, a host that fails before its first line fails over to the next,
+    and with hedging a slow first line is raced against a second host
+    (EndpointPool.open_stream); once tokens flow, errors propagate.
+    """
+
+    def post(url: str) -> requests.Response:
+        response = get_session().post(
+            url, json=payload, timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT), stream=True
+        )
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+        return response
+
+    pool = get_pool()
+    if pool is None:
+        response = post(OLLAMA_URL)
+        try:
+            yield response.iter_lines()
+        finally:
+            response.close()
+        return
+
+    with pool.open_stream(lambda ep: post(ep.generate_url)) as lines:
+        yield lines
+
+
+async def _post_generate_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    pool = get_pool()
+    if pool is None:
+        _, body = await get_async_pool().request("POST", OLLAMA_URL, json_body=payload)
+        return json.loads(body)
+
+    tried = []
+    last_error: Optional[BaseException] = None
+    while True:
+        ep = pool.pick(exclude=tried)
+        if ep is None:
+            raise NoHealthyEndpoint(f"no Ollama endpoint answered: {last_error}") from last_error
+        tried.append(ep)
+        try:
+            with pool.use(ep):
+                _, body = await get_async_pool().request("POST", ep.generate_url, json_body=payload)
+                return json.loads(body)
+        except Exception as e:
+            if not is_endpoint_failure(e):
+                raise
+            last_error = e
+
+
+# ---------- Response cache ----------
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[LLMCache]:
+    """
+    Return the shared response cache, or None when caching is off
+    (CACHE_ENABLED = False, or the cache file can't be opened).
+    """
+    global _cache, CACHE_ENABLED
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = LLMCache(
+                        CACHE_PATH,
+                        max_entries=CACHE_MAX_ENTRIES,
+                        ttl_s=CACHE_TTL_S,
+                    )
+                except Exception as e:
+                    print(f"[WARN] LLM cache disabled: {e}")
+                    CACHE_ENABLED = False
+                    return None
+    return _cache
+
+
+def set_cache(cache: Optional[LLMCache]) -> None:
+    """Swap the shared cache (None turns caching off)."""
+    global _cache, CACHE_ENABLED
+    with _cache_lock:
+        _cache = cache
+        CACHE_ENABLED = cache is not None
+
+
+def _cache_key(messages: List[Dict[str, str]], format: Optional[Any] = None) -> Optional[str]:
+    """
+    Cache key for this request, or None if it must not be cached:
+      - very sensitive requests (banking, keychain, ...) are never stored
+      - neither are messages with OTP-like digit runs (unique anyway)
+    """
+    for m in messages:
+        if m.get("role") == "system":
+            continue
+        content = m.get("content", "")
+        if is_very_sensitive(content) or mask_sensitive_text(content) != content:
+            return None
+    return make_cache_key(MODEL_NAME, messages, format=format)
+
+
+# ---------- Singleflight: coalesce identical in-flight requests ----------
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _AsyncCall:
+    def __init__(self, task: "asyncio.Future[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamCall:
+    """
+    One upstream stream, read by every caller with the same key. Whoever
+    needs the next token pulls it from upstream (one at a time); the rest
+    replay the buffer. The upstream is closed once nobody reads it.
+    """
+
+    def __init__(self, open_fn: Callable[[], Iterator[str]]) -> None:
+        self.open_fn = open_fn
+        self.upstream: Optional[Iterator[str]] = None
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.readers = 0
+        self._lock = threading.Lock()
+        self._pump = threading.Lock()
+
+    def token(self, i: int) -> Optional[str]:
+        """Token `i`, or None after the last one."""
+        while True:
+            with self._lock:
+                if i < len(self.tokens):
+                    return self.tokens[i]
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return None
+            with self._pump:
+                with self._lock:
+                    if i < len(self.tokens) or self.done:
+                        continue
+                try:
+                    if self.upstream is None:
+                        self.upstream = self.open_fn()
+                    token = next(self.upstream)
+                except StopIteration:
+                    self._finish(None)
+                except LLMCancelled:
+                    # This reader was cancelled before anything was generated;
+                    # the next one opens the upstream in its own context.
+                    self.upstream = None
+                    raise
+                except Exception as e:
+                    self._finish(e)
+                else:
+                    with self._lock:
+                        self.tokens.append(token)
+
+    def _finish(self, error: Optional[BaseException]) -> None:
+        with self._lock:
+            self.done = True
+            self.error = error
+
+    def close(self) -> None:
+        """Stop the upstream (the last reader left before the end)."""
+        with self._pump:
+            if self.upstream is not None and not self.done:
+                close = getattr(self.upstream, "close", None)
+                if close is not None:
+                    close()
+            self._finish(None)
+
+
+class SingleFlight:
+    """
+    Share one upstream generation between concurrent identical requests.
+
+    The first caller for a key (the leader) does the work; callers that
+    arrive while it's in flight wait for, and receive, the same result.
+    Nothing is remembered after the leader finishes — that's the cache's job.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _StreamCall] = {}
+        self._async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _AsyncCall]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.generations = 0  # upstream generations actually started
+        self.coalesced = 0  # generations saved
+
+    def _count(self, leader: bool) -> None:
+        if leader:
+            self.generations += 1
+        else:
+            self.coalesced += 1
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count(leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stream(self, key: str, open_fn: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        Every caller gets the whole stream. A caller that stops reading
+        early (or is cancelled) only leaves: the upstream keeps going for
+        the others and is closed when the last reader stops.
+        """
+        with self._lock:
+            call = self._streams.get(key)
+            leader = call is None
+            if leader:
+                call = self._streams[key] = _StreamCall(open_fn)
+            call.readers += 1
+            self._count(leader)
+
+        i = 0
+        try:
+            while True:
+                token = call.token(i)
+                if token is None:
+                    return
+                i += 1
+                yield token
+        finally:
+            with self._lock:
+                call.readers -= 1
+                last = call.readers == 0
+                if (last or call.done) and self._streams.get(key) is call:
+                    del self._streams[key]
+            if last:
+                call.close()
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        asyncio version of do(). The work runs as its own task: a caller
+        that is cancelled leaves without cancelling it for the others; it
+        is only cancelled when nobody is left waiting.
+        """
+        loop = asyncio.get_running_loop()
+        calls = self._async.setdefault(loop, {})
+        call = calls.get(key)
+        with self._lock:
+            self._count(call is None)
+        if call is None:
+            call = calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _: calls.pop(key) if calls.get(key) is call else None)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {"generations": self.generations, "coalesced": self.coalesced}
+
+
+_inflight = SingleFlight()
+
+
+def coalescing_stats() -> Dict[str, int]:
+    """How many upstream generations ran vs. were saved by coalescing."""
+    return _inflight.stats()
+
+
+def generation_stats(model: Optional[str] = None) -> Dict[str, Any]:
+    """Rolling Ollama metrics per model (load, prompt eval, tokens/s, ...)."""
+    return model_stats(model)
+
+
+def _flight_key(kind: str, messages: List[Dict[str, str]], format: Optional[Any] = None) -> str:
+    return kind + ":" + make_cache_key(MODEL_NAME, messages, format=format)
+
 
 def _messages_to_prompt(messages: List[Dict[str, str]]) -> str:
     """
@@ -28,25 +567,327 @@ def _messages_to_prompt(messages: List[Dict[str, str]]) -> str:
     return "\n".join(parts)
 
 
-def ask_llm(messages: List[Dict[str, str]]) -> str:
+def _generate_payload(
+    prompt: str,
+    stream: bool,
+    format: Optional[Any] = None,
+    **extra: Any,
+) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "model": MODEL_NAME,
+        "prompt": prompt,
+        "stream": stream,
+        "keep_alive": KEEP_ALIVE,
+    }
+    if format is not None:
+        # "json" or a JSON schema: Ollama constrains decoding to it
+        payload["format"] = format
+    payload.update(extra)
+    return payload
+
+
+def _observe(metrics: LLMMetrics) -> None:
+    """Add to the rolling per-model stats (once per upstream generation)."""
+    if not metrics.model:
+        metrics.model = MODEL_NAME
+    record_metrics(metrics)
+
+    GENERATIONS.labels(model=metrics.model, complete=str(metrics.complete).lower()).inc()
+    if metrics.wall_ms is not None:
+        GENERATION_SECONDS.labels(model=metrics.model).observe(metrics.wall_ms / 1000.0)
+    if metrics.first_token_ms is not None:
+        FIRST_TOKEN_SECONDS.labels(model=metrics.model).observe(metrics.first_token_ms / 1000.0)
+    if metrics.eval_count:
+        TOKENS.labels(model=metrics.model).inc(metrics.eval_count)
+
+
+def _cache_get(cache: LLMCache, key: str, allow_partial: bool = False) -> Optional[Tuple[str, bool]]:
+    hit = cache.get(key, allow_partial=allow_partial)
+    CACHE_LOOKUPS.labels(result="miss" if hit is None else "hit").inc()
+    return hit
+
+
+def _annotate_result(result: LLMResult) -> None:
+    """Attach the metrics to the current request's trace (-> log entry)."""
+    if result.cached:
+        annotate("llm", {"cached": True})
+    elif result.metrics is not None:
+        annotate("llm", result.metrics.to_dict())
+
+
+def ask_llm_result(messages: List[Dict[str, str]], format: Optional[Any] = None) -> LLMResult:
+    """
+    Like ask_llm, but returns the reply with Ollama's generation metrics
+    (load time, prompt eval, tokens/s). Cache hits have no metrics.
+    """
+    cache = get_cache()
+    key = _cache_key(messages, format) if cache is not None else None
+    if key is not None:
+        hit = _cache_get(cache, key)
+        if hit is not None:
+            result = LLMResult(hit[0], cached=True)
+            _annotate_result(result)
+            return result
+
+    def generate() -> LLMResult:
+        prompt = _messages_to_prompt(messages)
+        with get_scheduler().slot() as ticket:
+            started = time.perf_counter()
+            data = _post_generate(_generate_payload(prompt, stream=False, format=format))
+        # For non-streaming, Ollama returns a single JSON object with "response"
+        reply = data.get("response", "").strip()
+        metrics = LLMMetrics.from_response(
+            data, wall_ms=(time.perf_counter() - started) * 1000.0, queue_wait_ms=ticket.wait_ms
+        )
+        _observe(metrics)
+        if key is not None:
+            cache.put(key, reply)
+        return LLMResult(reply, metrics)
+
+    # Concurrent identical calls (voice double-fire, same greeting from
+    # several clients) share one generation.
+    result = _inflight.do(_flight_key("ask", messages, format), generate)
+    _annotate_result(result)
+    return result
+
+
+def ask_llm(messages: List[Dict[str, str]], format: Optional[Any] = None) -> str:
     """
     Talk to the server-side Ollama model (phi3) using /api/generate.
+    Identical requests are answered from the response cache.
+
+    `format` ("json" or a JSON schema) is passed to Ollama to constrain the
+    output, e.g. the router's action schema.
     """
-    prompt = _messages_to_prompt(messages)
+    return ask_llm_result(messages, format).text
 
-    response = requests.post(
-        OLLAMA_URL,
-        json={
-            "model": MODEL_NAME,
-            "prompt": prompt,
-            "stream": False,
-        },
-        timeout=120,
+
+async def ask_llm_result_async(messages: List[Dict[str, str]], format: Optional[Any] = None) -> LLMResult:
+    """asyncio version of ask_llm_result."""
+    cache = get_cache()
+    key = _cache_key(messages, format) if cache is not None else None
+    if key is not None:
+        hit = _cache_get(cache, key)
+        if hit is not None:
+            result = LLMResult(hit[0], cached=True)
+            _annotate_result(result)
+            return result
+
+    async def generate() -> LLMResult:
+        prompt = _messages_to_prompt(messages)
+        async with get_scheduler().slot_async() as ticket:
+            started = time.perf_counter()
+            data = await _post_generate_async(_generate_payload(prompt, stream=False, format=format))
+        reply = data.get("response", "").strip()
+        metrics = LLMMetrics.from_response(
+            data, wall_ms=(time.perf_counter() - started) * 1000.0, queue_wait_ms=ticket.wait_ms
+        )
+        _observe(metrics)
+        if key is not None:
+            cache.put(key, reply)
+        return LLMResult(reply, metrics)
+
+    result = await _inflight.do_async(_flight_key("ask", messages, format), generate)
+    _annotate_result(result)
+    return result
+
+
+async def ask_llm_async(messages: List[Dict[str, str]], format: Optional[Any] = None) -> str:
+    """
+    asyncio version of ask_llm.
+
+    Runs on the caller's event loop over a keep-alive connection pool, so many
+    requests can be in flight at once without a thread per request.
+    """
+    return (await ask_llm_result_async(messages, format)).text
+
+
+def stream_llm(
+    messages: List[Dict[str, str]],
+    format: Optional[Any] = None,
+    allow_partial: bool = False,
+) -> Iterator[str]:
+    """
+    Streaming variant of ask_llm: yield response tokens as Ollama emits them.
+
+    Ollama streams one JSON object per line, each carrying a "response"
+    fragment, and finishes with a line where "done" is true.
+
+    Closing the generator early (e.g. the router already has the action it
+    needs) closes the HTTP response, which makes Ollama stop generating.
+    Only a complete reply is cached; a caller that stopped because it had
+    all it needed stores the prefix with cache_partial(). Such a prefix is
+    only replayed with allow_partial=True, by a caller that stops at the
+    same point (the router's early-stop parser); everyone else gets a
+    complete reply or a fresh generation. A stream abandoned for any other
+    reason (client gone, timeout) stores nothing.
+
+    Generation metrics go to the per-model stats and the current trace;
+    a stream closed early only has client-side timings (complete=False).
+    """
+    cache = get_cache()
+    key = _cache_key(messages, format) if cache is not None else None
+    if key is not None:
+        hit = _cache_get(cache, key, allow_partial=allow_partial)
+        if hit is not None:
+            annotate("llm", {"cached": True})
+            yield hit[0]
+            return
+
+    yield from _inflight.stream(
+        _flight_key("stream", messages, format),
+        lambda: _stream_upstream(messages, key, format),
     )
-    response.raise_for_status()
-    data = response.json()
-    # For non-streaming, Ollama returns a single JSON object with "response"
-    return data.get("response", "").strip()
+
+
+def _stream_upstream(
+    messages: List[Dict[str, str]],
+    key: Optional[str],
+    format: Optional[Any] = None,
+) -> Iterator[str]:
+    cache = get_cache()
+    prompt = _messages_to_prompt(messages)
+
+    parts: List[str] = []
+    finished = False
+    first_token_ms: Optional[float] = None
+    cancel = current_cancel_event()
+    # The slot is held until the stream is closed (early or at the end)
+    with get_scheduler().slot() as ticket:
+        if cancel is not None and cancel.is_set():
+            raise LLMCancelled()
+        started = time.perf_counter()
+        try:
+            with _open_generate_stream(_generate_payload(prompt, stream=True, format=format)) as lines:
+                for line in lines:
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    token = data.get("response", "")
+                    if token:
+                        if first_token_ms is None:
+                            first_token_ms = (time.perf_counter() - started) * 1000.0
+                        parts.append(token)
+                        yield token
+                    if data.get("done"):
+                        finished = True
+                        metrics = LLMMetrics.from_response(
+                            data,
+                            first_token_ms=first_token_ms,
+                            wall_ms=(time.perf_counter() - started) * 1000.0,
+                            queue_wait_ms=ticket.wait_ms,
+                        )
+                        break
+        except GeneratorExit:
+            # Caller stopped reading. Whether the prefix is worth keeping is
+            # its call (cache_partial): it may just have been cancelled.
+            wall_ms = (time.perf_counter() - started) * 1000.0
+            _observe_stream(
+                LLMMetrics(
+                    model=MODEL_NAME,
+                    eval_count=len(parts),
+                    # Client-side estimate: decoding ran from the first token on
+                    eval_ms=wall_ms - first_token_ms if first_token_ms is not None else None,
+                    first_token_ms=first_token_ms,
+                    wall_ms=wall_ms,
+                    queue_wait_ms=ticket.wait_ms,
+                    complete=False,
+                )
+            )
+            raise
+
+    if finished:
+        _observe_stream(metrics)
+        if key is not None:
+            cache.put(key, "".join(parts))
+
+
+def _observe_stream(metrics: LLMMetrics) -> None:
+    _observe(metrics)
+    annotate("llm", metrics.to_dict())
+
+
+def cache_partial(messages: List[Dict[str, str]], text: str, format: Optional[Any] = None) -> None:
+    """
+    Keep `text`, the prefix of a stream_llm reply read until the caller had
+    everything it needed, as a partial cache entry for these messages.
+    """
+    cache = get_cache()
+    key = _cache_key(messages, format) if cache is not None else None
+    if key is not None and text:
+        cache.put(key, text, complete=False)
+
+
+class ChatSession:
+    """
+    Multi-turn conversation that sends only the NEW user turn to Ollama.
+
+    The first turn sends the system prompt via /api/generate's "system" field.
+    Every reply carries a "context" token array; passing it back on the next
+    turn lets Ollama continue from its cached state instead of re-reading the
+    whole flattened history, so per-turn prompt eval stays flat as the
+    conversation grows.
+
+    If the server doesn't return a context, we fall back to the flattened
+    history (same as ask_llm).
+    """
+
+    def __init__(
+        self,
+        system_prompt: str = "",
+        model: Optional[str] = None,
+        priority: Optional[str] = None,
+    ) -> None:
+        self.system_prompt = system_prompt
+        self.model = model
+        self.priority = priority  # scheduler class; None = caller's context
+        self.history: List[Dict[str, str]] = []
+        self.context: Optional[List[int]] = None
+        self.last_prompt_eval_count: Optional[int] = None
+        self.last_metrics: Optional[LLMMetrics] = None
+
+    def _payload(self, user_text: str) -> Dict[str, Any]:
+        extra: Dict[str, Any] = {}
+        if self.model:
+            extra["model"] = self.model
+
+        if self.context is not None:
+            return _generate_payload(user_text, stream=False, context=self.context, **extra)
+
+        if not self.history:
+            if self.system_prompt:
+                extra["system"] = self.system_prompt
+            return _generate_payload(user_text, stream=False, **extra)
+
+        # No server context to continue from: replay the history as one prompt.
+        messages = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        messages += self.history + [{"role": "user", "content": user_text}]
+        return _generate_payload(_messages_to_prompt(messages), stream=False, **extra)
+
+    def ask(self, user_text: str) -> str:
+        with get_scheduler().slot(self.priority) as ticket:
+            started = time.perf_counter()
+            data = _post_generate(self._payload(user_text))
+        reply = data.get("response", "").strip()
+
+        self.last_metrics = LLMMetrics.from_response(
+            data, wall_ms=(time.perf_counter() - started) * 1000.0, queue_wait_ms=ticket.wait_ms
+        )
+        _observe(self.last_metrics)
+        annotate("llm", self.last_metrics.to_dict())
+
+        self.context = data.get("context") or None
+        self.last_prompt_eval_count = data.get("prompt_eval_count")
+        self.history.append({"role": "user", "content": user_text})
+        self.history.append({"role": "assistant", "content": reply})
+        return reply
+
+    def reset(self) -> None:
+        """Forget the conversation (the system prompt is kept)."""
+        self.history = []
+        self.context = None
+        self.last_prompt_eval_count = None
+        self.last_metrics = None
 
 
 if __name__ == "__main__":
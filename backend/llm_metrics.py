@@ -0,0 +1,185 @@
+# backend/llm_metrics.py
+"""
+Ollama generation metrics.
+
+The final /api/generate message carries nanosecond timings:
+
+    total_duration, load_duration,
+    prompt_eval_count, prompt_eval_duration,
+    eval_count, eval_duration
+
+LLMMetrics turns them into milliseconds and tokens/s, and ModelStats keeps
+a rolling window per model, so a slow reply can be put down to a cold model
+load, a long prompt or slow decoding.
+
+Streams the router closes early never get the final message; for those only
+client-side numbers are filled in and `complete` is False: time to first
+token (~ load + prompt eval), tokens received and the time since the first
+token (~ decoding).
+
+`queue_wait_ms` is the time the request waited for a slot in the priority
+scheduler (.llm_scheduler) before it was sent.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# load_duration above this means the model had to be (re)loaded
+COLD_LOAD_MS = 500.0
+
+
+def _ms(ns: Any) -> Optional[float]:
+    return ns / 1e6 if isinstance(ns, (int, float)) else None
+
+
+def _rate(count: Optional[int], ms: Optional[float]) -> Optional[float]:
+    if not count or not ms:
+        return None
+    return count / (ms / 1000.0)
+
+
+class LLMMetrics:
+    def __init__(
+        self,
+        model: str,
+        total_ms: Optional[float] = None,
+        load_ms: Optional[float] = None,
+        prompt_eval_count: Optional[int] = None,
+        prompt_eval_ms: Optional[float] = None,
+        eval_count: Optional[int] = None,
+        eval_ms: Optional[float] = None,
+        first_token_ms: Optional[float] = None,
+        wall_ms: Optional[float] = None,
+        queue_wait_ms: Optional[float] = None,
+        complete: bool = True,
+    ) -> None:
+        self.model = model
+        self.total_ms = total_ms
+        self.load_ms = load_ms
+        self.prompt_eval_count = prompt_eval_count
+        self.prompt_eval_ms = prompt_eval_ms
+        self.eval_count = eval_count
+        self.eval_ms = eval_ms
+        self.first_token_ms = first_token_ms  # client side, streams only
+        self.wall_ms = wall_ms  # client side, request start -> last byte read
+        self.queue_wait_ms = queue_wait_ms  # client side, before the request was sent
+        self.complete = complete
+
+    @classmethod
+    def from_response(cls, data: Dict[str, Any], **client: Any) -> "LLMMetrics":
+        """Build from Ollama's final message (plus client-side timings)."""
+        return cls(
+            model=str(data.get("model") or ""),
+            total_ms=_ms(data.get("total_duration")),
+            load_ms=_ms(data.get("load_duration")),
+            prompt_eval_count=data.get("prompt_eval_count"),
+            prompt_eval_ms=_ms(data.get("prompt_eval_duration")),
+            eval_count=data.get("eval_count"),
+            eval_ms=_ms(data.get("eval_duration")),
+            **client,
+        )
+
+    @property
+    def prompt_tokens_per_s(self) -> Optional[float]:
+        return _rate(self.prompt_eval_count, self.prompt_eval_ms)
+
+    @property
+    def tokens_per_s(self) -> Optional[float]:
+        return _rate(self.eval_count, self.eval_ms)
+
+    @property
+    def cold_load(self) -> bool:
+        return self.load_ms is not None and self.load_ms > COLD_LOAD_MS
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly form for the interaction log (None fields dropped)."""
+        out: Dict[str, Any] = {"model": self.model, "complete": self.complete}
+        for name in (
+            "total_ms", "load_ms", "prompt_eval_count", "prompt_eval_ms",
+            "eval_count", "eval_ms", "first_token_ms", "wall_ms", "queue_wait_ms",
+            "prompt_tokens_per_s", "tokens_per_s",
+        ):
+            value = getattr(self, name)
+            if value is not None:
+                out[name] = round(value, 2) if isinstance(value, float) else value
+        if self.cold_load:
+            out["cold_load"] = True
+        return out
+
+
+class LLMResult:
+    """Reply text plus how it was produced."""
+
+    def __init__(self, text: str, metrics: Optional[LLMMetrics] = None, cached: bool = False) -> None:
+        self.text = text
+        self.metrics = metrics  # None for cache hits
+        self.cached = cached
+
+    def __repr__(self) -> str:
+        return f"LLMResult(text={self.text[:40]!r}, cached={self.cached})"
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class ModelStats:
+    """Rolling window of LLMMetrics for one model."""
+
+    FIELDS = (
+        "total_ms", "load_ms", "prompt_eval_ms", "eval_ms",
+        "first_token_ms", "queue_wait_ms", "tokens_per_s", "prompt_tokens_per_s",
+    )
+
+    def __init__(self, window: int = 200) -> None:
+        self.samples: Deque[LLMMetrics] = deque(maxlen=window)
+        self.requests = 0
+        self.cold_loads = 0
+
+    def add(self, m: LLMMetrics) -> None:
+        self.samples.append(m)
+        self.requests += 1
+        if m.cold_load:
+            self.cold_loads += 1
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"requests": self.requests, "cold_loads": self.cold_loads}
+        for name in self.FIELDS:
+            values = [v for v in (getattr(m, name) for m in self.samples) if v is not None]
+            if values:
+                out[name] = {
+                    "mean": round(sum(values) / len(values), 2),
+                    "p50": round(_percentile(values, 0.5), 2),
+                    "p95": round(_percentile(values, 0.95), 2),
+                }
+        return out
+
+
+_stats: Dict[str, ModelStats] = {}
+_stats_lock = threading.Lock()
+
+
+def record(m: LLMMetrics) -> None:
+    with _stats_lock:
+        stats = _stats.get(m.model)
+        if stats is None:
+            stats = _stats[m.model] = ModelStats()
+        stats.add(m)
+
+
+def model_stats(model: Optional[str] = None) -> Dict[str, Any]:
+    """Summary per model (or for one model)."""
+    with _stats_lock:
+        if model is not None:
+            stats = _stats.get(model)
+            return stats.summary() if stats is not None else {}
+        return {name: s.summary() for name, s in _stats.items()}
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,412 @@
+# backend/llm_pool.py
+"""
+Pool of Ollama endpoints with health probes, least-loaded routing and
+optional hedged requests.
+
+- A background thread probes every endpoint (GET /api/tags). Endpoints that
+  fail a probe or a real request are skipped until a probe succeeds again.
+- Each call goes to the healthy endpoint with the fewest requests in flight
+  (ties -> lower recent latency).
+- With hedging on, if the first endpoint hasn't answered after the pool's
+  recent p95 latency, the same request is sent to a second endpoint and
+  whichever answers first wins. For a stream (open_stream) "answers" means
+  sends its first line (hedged after the p95 time to first line); the
+  losing stream is closed.
+
+Hedges are sent by the pool, below llm_scheduler: the second request of a
+hedged call doesn't take a scheduler slot of its own, so a host can see
+one request per hedged call beyond the scheduler's limit, until one of the
+two answers (a losing stream is closed then; a losing call runs to the end).
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, TypeVar
+
+import requests
+
+T = TypeVar("T")
+
+
+class NoHealthyEndpoint(RuntimeError):
+    """Raised when every endpoint in the pool failed."""
+
+
+class Endpoint:
+    """One Ollama host (base URL like http://10.2.51.11:11434)."""
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.healthy = True
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.latencies_ms: Deque[float] = deque(maxlen=200)  # whole calls / streams
+        self.first_line_ms: Deque[float] = deque(maxlen=200)  # stream opened -> first line
+
+    @property
+    def generate_url(self) -> str:
+        return self.base_url + "/api/generate"
+
+    def recent_latency_ms(self) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        return sum(self.latencies_ms) / len(self.latencies_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.base_url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "avg_latency_ms": round(self.recent_latency_ms(), 1),
+        }
+
+
+class _StreamAttempt:
+    """One endpoint's try at opening a stream (see EndpointPool.open_stream)."""
+
+    def __init__(self, ep: Endpoint) -> None:
+        self.ep = ep
+        self.started = 0.0
+        self.response: Optional[requests.Response] = None
+        self.lines: Iterator[bytes] = iter(())
+        self.first: Optional[bytes] = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        """Lost the race: close its connection, which also ends a pending read."""
+        with self._lock:
+            self.cancelled = True
+            response = self.response
+        if response is not None:
+            response.close()
+
+
+def is_endpoint_failure(exc: BaseException) -> bool:
+    """
+    True if the error says something about the host (down, overloaded,
+    timing out), not about our request. A 4xx is our fault and shouldn't
+    take the endpoint out of rotation.
+    """
+    if isinstance(exc, requests.HTTPError):
+        status = exc.response.status_code if exc.response is not None else None
+        return status is None or status >= 500
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout, OSError, TimeoutError))
+
+
+def _base_url(url: str) -> str:
+    """Accept either a base URL or a full .../api/generate URL."""
+    url = url.rstrip("/")
+    for suffix in ("/api/generate", "/api/chat"):
+        if url.endswith(suffix):
+            return url[: -len(suffix)]
+    return url
+
+
+class EndpointPool:
+    def __init__(
+        self,
+        urls: Sequence[str],
+        probe_interval_s: float = 5.0,
+        probe_timeout_s: float = 2.0,
+        hedge: bool = False,
+        hedge_min_delay_ms: float = 50.0,
+        max_workers: int = 16,
+    ) -> None:
+        if not urls:
+            raise ValueError("EndpointPool needs at least one URL")
+        self.endpoints = [Endpoint(_base_url(u)) for u in urls]
+        self.probe_interval_s = probe_interval_s
+        self.probe_timeout_s = probe_timeout_s
+        self.hedge = hedge
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._probe_thread: Optional[threading.Thread] = None
+        self._probe_session = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+
+    # ---------- health ----------
+
+    def start(self) -> "EndpointPool":
+        """Start the background health probes (idempotent)."""
+        if self._probe_thread is None:
+            self._probe_thread = threading.Thread(
+                target=self._probe_loop, name="llm-pool-probe", daemon=True
+            )
+            self._probe_thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._probe_thread is not None:
+            self._probe_thread.join(timeout=self.probe_timeout_s + 1)
+            self._probe_thread = None
+        self._executor.shutdown(wait=False)
+        self._probe_session.close()
+
+    def _probe_loop(self) -> None:
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.probe_interval_s)
+
+    def probe_all(self) -> None:
+        for ep in self.endpoints:
+            try:
+                r = self._probe_session.get(ep.base_url + "/api/tags", timeout=self.probe_timeout_s)
+                ok = r.ok
+            except requests.RequestException:
+                ok = False
+            with self._lock:
+                ep.healthy = ok
+
+    # ---------- routing ----------
+
+    def pick(self, exclude: Sequence[Endpoint] = ()) -> Optional[Endpoint]:
+        """
+        Least-loaded healthy endpoint (ties: lower recent latency).
+        If every endpoint looks down, the first attempt still tries one
+        rather than failing without sending anything.
+        """
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.healthy and e not in exclude]
+            if not candidates and not exclude:
+                candidates = list(self.endpoints)
+            if not candidates:
+                return None
+            return min(candidates, key=lambda e: (e.in_flight, e.recent_latency_ms()))
+
+    @contextmanager
+    def use(self, ep: Endpoint) -> Iterator[Endpoint]:
+        """Track one request on `ep`: in-flight count, latency, failures."""
+        started = self._begin(ep)
+        failed = False
+        try:
+            yield ep
+        except BaseException as e:
+            # GeneratorExit (caller closed a stream) etc. are not failures
+            failed = is_endpoint_failure(e)
+            raise
+        finally:
+            self._end(ep, started, failed)
+
+    def _begin(self, ep: Endpoint) -> float:
+        with self._lock:
+            ep.in_flight += 1
+            ep.requests += 1
+        return time.perf_counter()
+
+    def _end(self, ep: Endpoint, started: float, failed: bool, record: bool = True) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        with self._lock:
+            ep.in_flight -= 1
+            if failed:
+                ep.failures += 1
+                ep.healthy = False  # until the next successful probe
+            elif record:
+                ep.latencies_ms.append(elapsed_ms)
+
+    def hedge_delay_s(self, stream: bool = False) -> float:
+        """
+        p95 of recent latencies across the pool (never below the floor):
+        of whole calls, or with stream=True of the time to a stream's first line.
+        """
+        with self._lock:
+            samples = sorted(
+                x for e in self.endpoints for x in (e.first_line_ms if stream else e.latencies_ms)
+            )
+        if not samples:
+            return self.hedge_min_delay_ms / 1000.0
+        p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+        return max(p95, self.hedge_min_delay_ms) / 1000.0
+
+    def call(self, fn: Callable[[Endpoint], T]) -> T:
+        """
+        Run fn(endpoint) on the best endpoint.
+
+        Failures fail over to the next healthy endpoint. With hedging on, a
+        duplicate goes to a second endpoint after hedge_delay_s().
+        """
+        tried: List[Endpoint] = []
+        last_error: Optional[BaseException] = None
+
+        while True:
+            ep = self.pick(exclude=tried)
+            if ep is None:
+                break
+            tried.append(ep)
+            try:
+                if self.hedge:
+                    return self._call_hedged(fn, ep, tried)
+                with self.use(ep):
+                    return fn(ep)
+            except Exception as e:
+                if not is_endpoint_failure(e):
+                    raise
+                last_error = e
+
+        raise NoHealthyEndpoint(f"no Ollama endpoint answered: {last_error}") from last_error
+
+    def _run(self, fn: Callable[[Endpoint], T], ep: Endpoint) -> T:
+        with self.use(ep):
+            return fn(ep)
+
+    def _call_hedged(self, fn: Callable[[Endpoint], T], ep: Endpoint, tried: List[Endpoint]) -> T:
+        primary = self._executor.submit(self._run, fn, ep)
+        done, _ = wait([primary], timeout=self.hedge_delay_s())
+        if done:
+            return primary.result()
+
+        backup_ep = self.pick(exclude=tried)
+        if backup_ep is None:
+            return primary.result()
+        tried.append(backup_ep)
+
+        with self._lock:
+            self.hedges_sent += 1
+        backup = self._executor.submit(self._run, fn, backup_ep)
+
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    if fut is backup:
+                        with self._lock:
+                            self.hedges_won += 1
+                    # The loser keeps running in the background; its result
+                    # is dropped.
+                    return fut.result()
+                error = fut.exception()
+        assert error is not None
+        raise error
+
+    # ---------- streams ----------
+
+    @contextmanager
+    def open_stream(self, post: Callable[[Endpoint], requests.Response]) -> Iterator[Iterable[bytes]]:
+        """
+        Open a streaming response with post(endpoint) on the best endpoint
+        and yield its lines.
+
+        An endpoint that fails before its first line fails over to the next
+        one; after that, errors propagate. With hedging on, a second
+        endpoint is asked if no line arrived after hedge_delay_s(stream=True); the
+        first to send one wins and the other is closed.
+        """
+        tried: List[Endpoint] = []
+        last_error: Optional[BaseException] = None
+        while True:
+            ep = self.pick(exclude=tried)
+            if ep is None:
+                raise NoHealthyEndpoint(f"no Ollama endpoint answered: {last_error}") from last_error
+            tried.append(ep)
+            try:
+                if self.hedge:
+                    attempt = self._open_hedged(post, ep, tried)
+                else:
+                    attempt = self._open_on(post, _StreamAttempt(ep))
+                break
+            except Exception as e:
+                if not is_endpoint_failure(e):
+                    raise
+                last_error = e
+
+        failed = False
+        try:
+            yield itertools.chain(() if attempt.first is None else (attempt.first,), attempt.lines)
+        except BaseException as e:
+            failed = is_endpoint_failure(e)
+            raise
+        finally:
+            self._finish(attempt, failed)
+
+    def _open_on(self, post: Callable[[Endpoint], requests.Response], attempt: _StreamAttempt) -> _StreamAttempt:
+        """Open the stream on attempt.ep and read its first line."""
+        attempt.started = self._begin(attempt.ep)
+        try:
+            response = post(attempt.ep)
+            with attempt._lock:
+                attempt.response = response
+                cancelled = attempt.cancelled
+            if cancelled:
+                response.close()
+            attempt.lines = response.iter_lines()
+            attempt.first = next(attempt.lines, None)
+            if not attempt.cancelled:
+                first_ms = (time.perf_counter() - attempt.started) * 1000.0
+                with self._lock:
+                    attempt.ep.first_line_ms.append(first_ms)
+        except BaseException as e:
+            # A stream we closed ourselves says nothing about the endpoint
+            failed = not attempt.cancelled and is_endpoint_failure(e)
+            if attempt.response is not None:
+                attempt.response.close()
+            self._end(attempt.ep, attempt.started, failed, record=not attempt.cancelled)
+            raise
+        return attempt
+
+    def _finish(self, attempt: _StreamAttempt, failed: bool) -> None:
+        if attempt.response is not None:
+            attempt.response.close()
+        self._end(attempt.ep, attempt.started, failed, record=not attempt.cancelled)
+
+    def _open_hedged(
+        self, post: Callable[[Endpoint], requests.Response], ep: Endpoint, tried: List[Endpoint]
+    ) -> _StreamAttempt:
+        primary = _StreamAttempt(ep)
+        attempts = {self._executor.submit(self._open_on, post, primary): primary}
+        done, _ = wait(attempts, timeout=self.hedge_delay_s(stream=True))
+        if not done:
+            backup_ep = self.pick(exclude=tried)
+            if backup_ep is not None:
+                tried.append(backup_ep)
+                with self._lock:
+                    self.hedges_sent += 1
+                backup = _StreamAttempt(backup_ep)
+                attempts[self._executor.submit(self._open_on, post, backup)] = backup
+
+        pending = set(attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((fut for fut in done if fut.exception() is None), None)
+            if winner is None:
+                error = next(iter(done)).exception()
+                continue
+            if attempts[winner] is not primary:
+                with self._lock:
+                    self.hedges_won += 1
+            for fut, attempt in attempts.items():
+                if fut is not winner:
+                    attempt.cancel()
+                    fut.add_done_callback(self._drop_loser)
+            return attempts[winner]
+        assert error is not None
+        raise error
+
+    def _drop_loser(self, fut: "Future[_StreamAttempt]") -> None:
+        # A loser that failed was accounted for in _open_on
+        if fut.exception() is None:
+            self._finish(fut.result(), failed=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "endpoints": [e.stats() for e in self.endpoints],
+                "hedges_sent": self.hedges_sent,
+                "hedges_won": self.hedges_won,
+            }
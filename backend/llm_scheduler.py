@@ -0,0 +1,273 @@
+# backend/llm_scheduler.py
+"""
+Priority scheduler for upstream LLM generations.
+
+Voice commands, terminal/server requests and long batch work (coding
+chats, cover letters) share one Ollama box. Every upstream generation in
+llm_client takes a slot here first:
+
+  - at most `max_concurrent` generations run at once (match Ollama's
+    OLLAMA_NUM_PARALLEL);
+  - each class has its own limit, and `reserved` slots are only ever
+    given to voice, so interactive and batch work together can never take
+    every slot;
+  - a free slot goes to the waiting request with the best priority, where
+    waiting `aging_s` seconds counts as one class better, so batch work is
+    delayed but never starved.
+
+The class comes from the caller's context:
+
+    with llm_priority("voice"):
+        route_message(text)
+
+A request whose client went away can say so with a threading.Event:
+
+    with llm_cancel_on(cancelled):
+        route_message(text)
+
+slot() then raises LLMCancelled instead of queueing, or while queued,
+rather than starting a generation nobody will read.
+
+Cache hits and coalesced followers never take a slot. The time spent
+waiting is reported as `queue_wait_ms` in the LLM metrics and per class in
+stats().
+
+The scheduler orders the requests of one process; the LLM broker
+(.llm_broker) shares one between every Sunny process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from .metrics import histogram
+except ImportError:  # direct script run fallback (see llm_client)
+    from metrics import histogram
+
+# Lower is more urgent
+PRIORITIES: Dict[str, int] = {"voice": 0, "interactive": 1, "batch": 2}
+DEFAULT_PRIORITY = "interactive"
+
+# How often a queued slot() checks its cancel event
+CANCEL_POLL_S = 0.05
+
+QUEUE_WAIT_SECONDS = histogram(
+    "sunny_llm_queue_wait_seconds", "Time a generation waited for a scheduler slot", ["priority"]
+)
+
+_current: ContextVar[str] = ContextVar("nunnarivu_llm_priority", default=DEFAULT_PRIORITY)
+_cancel: ContextVar[Optional[threading.Event]] = ContextVar("nunnarivu_llm_cancel", default=None)
+
+
+class LLMCancelled(Exception):
+    """The request was cancelled (llm_cancel_on) before its generation started."""
+
+
+@contextmanager
+def llm_priority(name: str) -> Iterator[None]:
+    """Run the block's LLM calls in priority class `name`."""
+    if name not in PRIORITIES:
+        raise ValueError(f"unknown priority class {name!r} (expected one of {sorted(PRIORITIES)})")
+    token = _current.set(name)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_priority() -> str:
+    return _current.get()
+
+
+@contextmanager
+def llm_cancel_on(event: threading.Event) -> Iterator[None]:
+    """Abandon the block's LLM calls (LLMCancelled) once `event` is set."""
+    token = _cancel.set(event)
+    try:
+        yield
+    finally:
+        _cancel.reset(token)
+
+
+def current_cancel_event() -> Optional[threading.Event]:
+    return _cancel.get()
+
+
+class Ticket:
+    """One request's place in the queue; `wait_ms` is set once it runs."""
+
+    def __init__(self, cls: str, seq: int) -> None:
+        self.cls = cls
+        self.seq = seq
+        self.enqueued = time.perf_counter()
+        self.wait_ms: Optional[float] = None
+        self._event = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._future: Optional["asyncio.Future[None]"] = None
+
+    def _grant(self) -> None:
+        self.wait_ms = (time.perf_counter() - self.enqueued) * 1000.0
+        if self._future is not None:
+            self._loop.call_soon_threadsafe(_resolve, self._future)
+        else:
+            self._event.set()
+
+
+def _resolve(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class ClassStats:
+    def __init__(self, window: int = 200) -> None:
+        self.granted = 0
+        self.waits: Deque[float] = deque(maxlen=window)
+
+    def summary(self, running: int, queued: int, limit: int) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"running": running, "queued": queued, "limit": limit, "granted": self.granted}
+        if self.waits:
+            waits = sorted(self.waits)
+            out["queue_wait_ms"] = {
+                "mean": round(sum(waits) / len(waits), 2),
+                "p50": round(waits[len(waits) // 2], 2),
+                "p95": round(waits[min(len(waits) - 1, int(0.95 * len(waits)))], 2),
+                "max": round(waits[-1], 2),
+            }
+        return out
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        limits: Optional[Dict[str, int]] = None,
+        aging_s: float = 5.0,
+        reserved: int = 0,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.limits = {cls: max_concurrent for cls in PRIORITIES}
+        self.limits.update(limits or {})
+        self.aging_s = aging_s
+        # Slots only the most urgent class (voice) may use
+        self.reserved = min(reserved, max_concurrent - 1)
+        self._top = min(PRIORITIES, key=PRIORITIES.__getitem__)
+
+        self._lock = threading.Lock()
+        self._waiting: List[Ticket] = []
+        self._running: Dict[str, int] = {cls: 0 for cls in PRIORITIES}
+        self._stats: Dict[str, ClassStats] = {cls: ClassStats() for cls in PRIORITIES}
+        self._seq = itertools.count()
+
+    # ---------- acquire / release ----------
+
+    def _enqueue(self, cls: Optional[str]) -> Ticket:
+        cls = cls or current_priority()
+        if cls not in PRIORITIES:
+            raise ValueError(f"unknown priority class {cls!r}")
+        ticket = Ticket(cls, next(self._seq))
+        return ticket
+
+    def _submit(self, ticket: Ticket) -> None:
+        with self._lock:
+            self._waiting.append(ticket)
+            self._dispatch()
+
+    def _score(self, ticket: Ticket, now: float) -> Tuple[float, int]:
+        aged = (now - ticket.enqueued) / self.aging_s if self.aging_s > 0 else 0.0
+        return PRIORITIES[ticket.cls] - aged, ticket.seq
+
+    def _eligible(self, ticket: Ticket, shared_free: bool) -> bool:
+        if self._running[ticket.cls] >= self.limits[ticket.cls]:
+            return False
+        return shared_free or ticket.cls == self._top
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the best eligible waiters (lock held)."""
+        while self._waiting and sum(self._running.values()) < self.max_concurrent:
+            now = time.perf_counter()
+            others = sum(n for cls, n in self._running.items() if cls != self._top)
+            shared_free = others < self.max_concurrent - self.reserved
+            eligible = [t for t in self._waiting if self._eligible(t, shared_free)]
+            if not eligible:
+                return
+            best = min(eligible, key=lambda t: self._score(t, now))
+            self._waiting.remove(best)
+            self._running[best.cls] += 1
+            best._grant()
+            stats = self._stats[best.cls]
+            stats.granted += 1
+            stats.waits.append(best.wait_ms)
+            QUEUE_WAIT_SECONDS.labels(priority=best.cls).observe(best.wait_ms / 1000.0)
+
+    def _cancel(self, ticket: Ticket) -> None:
+        """Give up a ticket that may or may not have been granted yet."""
+        with self._lock:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                return
+        self.release(ticket)
+
+    def release(self, ticket: Ticket) -> None:
+        with self._lock:
+            self._running[ticket.cls] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, cls: Optional[str] = None) -> Iterator[Ticket]:
+        """Hold one generation slot for the block (class from context if None)."""
+        cancel = current_cancel_event()
+        if cancel is not None and cancel.is_set():
+            raise LLMCancelled()
+        ticket = self._enqueue(cls)
+        self._submit(ticket)
+        try:
+            if cancel is None:
+                ticket._event.wait()
+            else:
+                while not ticket._event.wait(CANCEL_POLL_S):
+                    if cancel.is_set():
+                        raise LLMCancelled()
+        except BaseException:
+            self._cancel(ticket)
+            raise
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def slot_async(self, cls: Optional[str] = None) -> AsyncIterator[Ticket]:
+        """asyncio version of slot(): waits without blocking the event loop."""
+        ticket = self._enqueue(cls)
+        ticket._loop = asyncio.get_running_loop()
+        ticket._future = ticket._loop.create_future()
+        self._submit(ticket)
+        try:
+            await ticket._future
+        except BaseException:
+            self._cancel(ticket)
+            raise
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    # ---------- reporting ----------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = {cls: 0 for cls in PRIORITIES}
+            for t in self._waiting:
+                queued[t.cls] += 1
+            return {
+                cls: self._stats[cls].summary(self._running[cls], queued[cls], self.limits[cls])
+                for cls in PRIORITIES
+            }
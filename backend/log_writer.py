@@ -0,0 +1,193 @@
+# backend/log_writer.py
+"""
+Background writer for the interaction log.
+
+route_message() used to create the log dir and open/append/close the log
+file on every request. Now it only puts the entry on a bounded queue; a
+daemon thread drains the queue in batches and hands each batch to the
+interaction store (.interaction_store: one transaction / append per store).
+
+- An entry waits at most `flush_interval_s` for others to share its write
+  (less once `batch_size` are waiting); flush() and interpreter exit write
+  out everything queued.
+- If the queue is full (disk stalled, burst of traffic) the entry is
+  dropped and counted instead of blocking the request.
+"""
+
+from __future__ import annotations
+
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .interaction_store import write_batch
+
+Entry = Dict[str, Any]
+Batch = List[Tuple[str, Entry]]  # (destination path, entry)
+
+# Longest flush() waits by default (a stalled disk must not hang shutdown)
+FLUSH_TIMEOUT_S = 10.0
+
+# Queue marker: write the current batch now (flush/close)
+_FLUSH: Any = object()
+
+
+class BackgroundLogWriter:
+    def __init__(
+        self,
+        sink: Callable[[Batch], None] = write_batch,
+        max_queue: int = 10_000,
+        batch_size: int = 256,
+        flush_interval_s: float = 0.5,
+    ) -> None:
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._pending = 0  # queued or being written
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def write(self, path: str, entry: Entry) -> bool:
+        """
+        Queue `entry` for `path`. Never blocks; returns False (and counts
+        it) if the queue is full.
+        """
+        self._ensure_started()
+        with self._cond:
+            self._pending += 1
+        try:
+            self._queue.put_nowait((path, entry))
+        except queue.Full:
+            with self._cond:
+                self._pending -= 1
+                self.dropped += 1
+                self._cond.notify_all()
+            return False
+        return True
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT_S) -> bool:
+        """
+        Write out the current batch now and wait until it's on disk.
+        Returns False if that took longer than `timeout` seconds.
+        """
+        self._ensure_started()
+        deadline = time.monotonic() + timeout
+        try:
+            # A full queue behind a stalled disk must not block us either
+            self._queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            return False
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout=max(0.0, deadline - time.monotonic()))
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Write out what's queued and stop the thread. If that takes longer
+        than `timeout` (stalled disk), give up: the daemon thread dies with
+        the interpreter and the entries still queued are lost.
+        """
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        self._stop.set()
+        try:
+            self._queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            print(f"[WARN] Log writer stalled: {self._queue.qsize()} entries not written.")
+            return
+        self._thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        self._thread = None
+        self._stop.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+    # ---------- worker ----------
+
+    def _ensure_started(self) -> None:
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    print("[WARN] Log writer thread died — starting a new one.")
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _FLUSH:
+                if self._stop.is_set():
+                    self._drain()
+                    return
+                continue
+
+            # Linger up to flush_interval_s to batch entries into one write;
+            # a full batch or flush()/close() cuts it short.
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval_s
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _FLUSH:
+                    break
+                batch.append(item)
+            self._write(batch)
+
+            if item is _FLUSH and self._stop.is_set():
+                # close(): write out anything queued behind the marker too
+                self._drain()
+                return
+
+    def _drain(self) -> None:
+        batch: Batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _FLUSH:
+                batch.append(item)
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: Batch) -> None:
+        try:
+            self.sink(batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.errors += len(batch)
+            print(f"[WARN] Could not write {len(batch)} log entries: {e}")
+        finally:
+            with self._cond:
+                self._pending -= len(batch)
+                self._cond.notify_all()
+
+
+_writer = BackgroundLogWriter()
+atexit.register(_writer.close)
+
+
+def get_writer() -> BackgroundLogWriter:
+    return _writer
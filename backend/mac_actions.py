@@ -3,56 +3,68 @@ from __future__ import annotations
 
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
+from .app_index import matcher_for
+from .app_matcher import AppMatch, AppMatcher, normalize, score_name
 from .discover_apps import load_app_index, APP_INDEX_PATH
+from .metrics import counter
+from .tracing import span
 
-# Simple in-memory cache so we don’t hit the disk every time
+# Pinned index (tests, benchmarks). None: the shared index from
+# load_app_index, which is cached and follows changes to the file.
 _APP_INDEX_CACHE: Dict[str, str] | None = None
 
 
+APP_LOOKUPS = counter("sunny_app_lookups_total", "open_app lookups by outcome", ["result"])
+
+# Weakest match (app_matcher scores) that counts as "an installed app" for
+# is_installed_app: the query is at least a whole word of the name
+INSTALLED_APP_MIN_SCORE = 80.0
+
+
 def _get_app_index() -> Dict[str, str]:
     """
-    Return a cached app index (name -> full path).
-    If the cache is empty, load from disk (which will auto-rebuild if needed).
+    Return the app index (name -> full path): the pinned one if set, else
+    the shared in-memory copy (re-read when the file changes, rebuilt if
+    missing).
     """
-    global _APP_INDEX_CACHE
-    if _APP_INDEX_CACHE is None:
-        _APP_INDEX_CACHE = load_app_index()
-    return _APP_INDEX_CACHE
+    if _APP_INDEX_CACHE is not None:
+        return _APP_INDEX_CACHE
+    return load_app_index()
+
+
+def _get_matcher() -> AppMatcher:
+    """The ranked matcher for the current app index (rebuilt when the index changes)."""
+    return matcher_for(_get_app_index())
 
 
-def _normalize(s: str) -> str:
-    return s.strip().lower()
+def _score_match(query: str, name: str) -> float:
+    """How well `name` matches `query`, 0-100 (see app_matcher.score_name)."""
+    return score_name(normalize(query), normalize(name))
+
+
+def _find_app_candidates(query: str, index: Optional[Dict[str, str]] = None) -> List[AppMatch]:
+    """Ranked (score, name, path) candidates, best first (default: the app index)."""
+    matcher = AppMatcher(index) if index is not None else _get_matcher()
+    return matcher.search(query)
 
 
 def _find_app_matches(query: str) -> List[Tuple[str, str]]:
     """
-    Find all apps whose normalized name matches the query in a flexible way:
-      - exact match
-      - startswith
-      - substring
+    The apps `query` most likely means, best first (app_matcher.resolve):
+      - an exact name alone
+      - else every name it starts, names a word of, or is a substring of
+      - else, for typos, the closest name(s)
     No hardcoding of specific app names — purely index-driven.
     """
-    index = _get_app_index()
-    q = _normalize(query)
-
-    # Exact key match
-    if q in index:
-        return [(q, index[q])]
+    return _get_matcher().resolve(query)
 
-    matches: List[Tuple[str, str]] = []
 
-    for name, path in index.items():
-        n = _normalize(name)
-        if n == q:
-            matches.append((name, path))
-        elif n.startswith(q):
-            matches.append((name, path))
-        elif q in n:
-            matches.append((name, path))
-
-    return matches
+def is_installed_app(name: str) -> bool:
+    """True if `name` names an app in the index (no substrings or typos)."""
+    matches = _get_matcher().search(name, limit=1, fuzzy=False)
+    return bool(matches) and matches[0][0] >= INSTALLED_APP_MIN_SCORE
 
 
 def _filter_primary_apps(matches: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
@@ -107,9 +119,11 @@ def open_app(name: str) -> str:
     if not query:
         return "Please tell me which app to open."
 
-    matches = _find_app_matches(query)
-    matches = _filter_primary_apps(matches)
+    with span("app_lookup"):
+        matches = _find_app_matches(query)
+        matches = _filter_primary_apps(matches)
 
+    APP_LOOKUPS.labels(result="none" if not matches else "one" if len(matches) == 1 else "ambiguous").inc()
     if not matches:
         return f"Sorry, I couldn't find an app called '{query.lower()}'."
 
@@ -117,7 +131,8 @@ def open_app(name: str) -> str:
     if len(matches) == 1:
         app_name, app_path = matches[0]
         try:
-            subprocess.run(["open", app_path], check=False)
+            with span("subprocess"):
+                subprocess.run(["open", app_path], check=False)
             # Use the "pretty" name from the .app
             pretty = app_name.strip()
             return f"Opening {pretty}."
@@ -149,14 +164,15 @@ def set_volume(level: int) -> str:
 
     # macOS volume: 0–100
     try:
-        subprocess.run(
-            [
-                "osascript",
-                "-e",
-                f"set volume output volume {lvl}"
-            ],
-            check=False,
-        )
+        with span("subprocess"):
+            subprocess.run(
+                [
+                    "osascript",
+                    "-e",
+                    f"set volume output volume {lvl}"
+                ],
+                check=False,
+            )
         return f"Setting volume to {lvl}."
     except Exception as e:
         return f"Something went wrong setting the volume: {e}"
@@ -173,7 +189,8 @@ def open_folder(path: str) -> str:
 
     expanded = str(Path(path).expanduser())
     try:
-        subprocess.run(["open", expanded], check=False)
+        with span("subprocess"):
+            subprocess.run(["open", expanded], check=False)
         return f"Opening your folder: {expanded}"
     except Exception as e:
         return f"Something went wrong opening the folder: {e}"
\ No newline at end of file
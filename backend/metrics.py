@@ -0,0 +1,289 @@
+# backend/metrics.py
+"""
+In-process metrics registry (Prometheus text exposition format).
+
+Counters, gauges and fixed-bucket histograms, optionally with labels:
+
+    REQUESTS = counter("sunny_requests_total", "Messages routed", ["path"])
+    REQUESTS.labels(path="fast").inc()
+
+    LATENCY = histogram("sunny_route_seconds", "route_message latency", ["path"])
+    LATENCY.labels(path="llm").observe(0.42)
+
+render() returns the registry in text format: backend/server.py serves it
+at GET /metrics. CLI sessions print it (dump()) or write it to a file for
+node_exporter's textfile collector (write_textfile()).
+
+Updates take one lock per metric and no I/O, so they are cheap enough for
+the request path.
+
+Usage:
+    python -m backend.metrics terminal.prom    # print a CLI session's saved dump
+"""
+
+from __future__ import annotations
+
+import abc
+import bisect
+import math
+import os
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# CLI sessions write their registry here on exit (<client>.prom)
+TEXTFILE_DIR = os.path.expanduser("~/nunnarivu/metrics")
+
+# Seconds: 1 ms .. 60 s, good for routing, actions and LLM calls alike
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _label_str(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[LabelValues, "_Metric"] = {}
+
+    def labels(self, **values: str) -> "_Metric":
+        """The child for these label values (created on first use)."""
+        key = tuple(str(values[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self) -> "_Metric":
+        return type(self)(self.name, self.help)
+
+    def _series(self) -> Iterable[Tuple[LabelValues, "_Metric"]]:
+        if self.labelnames:
+            with self._lock:
+                return sorted(self._children.items())
+        return [((), self)]
+
+    def render(self, const: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._series():
+            lines.extend(child._samples(self.labelnames, values, const))
+        return lines
+
+    @abc.abstractmethod
+    def _samples(self, names: Sequence[str], values: LabelValues, const: str = "") -> List[str]:
+        """Exposition lines for one series (this metric or a labelled child)."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def _samples(self, names: Sequence[str], values: LabelValues, const: str = "") -> List[str]:
+        return [f"{self.name}{_label_str(names, values, const)} {_fmt(self.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def _samples(self, names: Sequence[str], values: LabelValues, const: str = "") -> List[str]:
+        return [f"{self.name}{_label_str(names, values, const)} {_fmt(self.value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def _samples(self, names: Sequence[str], values: LabelValues, const: str = "") -> List[str]:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (math.inf,), counts):
+            cumulative += n
+            le = ",".join(filter(None, (const, f'le="{_fmt(bound)}"')))
+            lines.append(f"{self.name}_bucket{_label_str(names, values, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_label_str(names, values, const)} {_fmt(total)}")
+        lines.append(f"{self.name}_count{_label_str(names, values, const)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add `metric`, or return the one already registered under its name."""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"metric {metric.name!r} already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self, const_labels: Optional[Dict[str, str]] = None) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        const = ",".join(f'{n}="{_escape(str(v))}"' for n, v in sorted((const_labels or {}).items()))
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render(const))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames))  # type: ignore[return-value]
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, labelnames))  # type: ignore[return-value]
+
+
+def histogram(
+    name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+
+def render(const_labels: Optional[Dict[str, str]] = None) -> str:
+    """
+    Every registered metric in Prometheus text exposition format, with
+    `const_labels` (e.g. {"worker": "1234"}) added to every sample.
+    """
+    return REGISTRY.render(const_labels)
+
+
+def merge(texts: Iterable[str]) -> str:
+    """
+    Combine several render() outputs (one per process, told apart by a
+    const label) into one exposition with each metric family listed once.
+    """
+    families: Dict[str, List[str]] = {}
+    for text in texts:
+        family: Optional[List[str]] = None
+        for line in text.splitlines():
+            if line.startswith("# HELP "):
+                name = line.split(" ", 3)[2]
+                family = families.get(name)
+                if family is None:
+                    family = families[name] = [line]
+            elif line.startswith("# TYPE "):
+                if family is not None and len(family) == 1:
+                    family.append(line)
+            elif line and family is not None:
+                family.append(line)
+    return "".join("\n".join(lines) + "\n" for _, lines in sorted(families.items()))
+
+
+def dump(skip_empty: bool = True) -> str:
+    """render() for reading in a terminal: only series that have data."""
+    lines = []
+    for line in render().splitlines():
+        if line.startswith("#") or "_bucket{" in line:
+            continue
+        if skip_empty and line.endswith(" 0"):
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def write_textfile(path: str) -> str:
+    """Write render() atomically to `path` (node_exporter textfile collector)."""
+    path = os.path.expanduser(path if os.sep in path else os.path.join(TEXTFILE_DIR, path))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp, path)
+    return path
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        path = sys.argv[1] if os.sep in sys.argv[1] else os.path.join(TEXTFILE_DIR, sys.argv[1])
+        with open(os.path.expanduser(path), "r", encoding="utf-8") as f:
+            print(f.read(), end="")
+    else:
+        print(render(), end="")
+
+
+if __name__ == "__main__":
+    main()
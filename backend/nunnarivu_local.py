@@ -12,9 +12,9 @@ from typing import List, Dict, Optional
 
 # Support both "python -m backend.nunnarivu_local" and "python backend/nunnarivu_local.py"
 try:
-    from .llm_client import ask_llm
+    from .llm_client import ChatSession, ask_llm
 except ImportError:  # direct script run fallback
-    from llm_client import ask_llm
+    from llm_client import ChatSession, ask_llm
 
 
 SYSTEM_PROMPT_LOCAL = (
@@ -28,9 +28,20 @@ SYSTEM_PROMPT_LOCAL = (
 )
 
 
+def new_local_session() -> ChatSession:
+    """
+    Start a multi-turn Nunnarivu Local conversation.
+
+    Pass it to nunnarivu_local_chat(session=...) so each turn only sends the
+    new message; SYSTEM_PROMPT_LOCAL stays cached on the Ollama side.
+    """
+    return ChatSession(SYSTEM_PROMPT_LOCAL)
+
+
 def nunnarivu_local_chat(
     user_text: str,
     history: Optional[List[Dict[str, str]]] = None,
+    session: Optional[ChatSession] = None,
 ) -> str:
     """
     High-level chat entry point for Nunnarivu Local.
@@ -42,6 +53,9 @@ def nunnarivu_local_chat(
     history : Optional[List[Dict[str, str]]]
         Optional previous messages in the ChatML-like format:
         [{"role": "user"|"assistant"|"system", "content": "..."}]
+    session : Optional[ChatSession]
+        Ongoing conversation from new_local_session(). When given, history
+        is ignored and only user_text is sent to the model.
 
     Returns
     -------
@@ -49,6 +63,9 @@ def nunnarivu_local_chat(
         Sunny's reply as plain text.
     """
 
+    if session is not None:
+        return session.ask(user_text)
+
     messages: List[Dict[str, str]] = [
         {"role": "system", "content": SYSTEM_PROMPT_LOCAL}
     ]
@@ -97,7 +114,7 @@ if __name__ == "__main__":
         print("🧠 Nunnarivu Local – Sunny chat mode")
         print("Type 'exit' to quit.\n")
 
-        history: List[Dict[str, str]] = []
+        session = new_local_session()
 
         while True:
             try:
@@ -110,13 +127,6 @@ if __name__ == "__main__":
                 print("Goodbye from Nunnarivu Local.")
                 break
 
-            reply = nunnarivu_local_chat(user_msg, history=history)
-            print(f"Sunny: {reply}\n")
-
-            # Extend history so the model keeps short context
-            history.extend(
-                [
-                    {"role": "user", "content": user_msg},
-                    {"role": "assistant", "content": reply},
-                ]
-            )
\ No newline at end of file
+            # The session keeps the context, so only the new turn is sent
+            reply = nunnarivu_local_chat(user_msg, session=session)
+            print(f"Sunny: {reply}\n")
\ No newline at end of file
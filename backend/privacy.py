@@ -0,0 +1,33 @@
+# backend/privacy.py
+"""
+Privacy rules shared by the router (logging) and llm_client (caching).
+"""
+
+from __future__ import annotations
+
+import re
+
+# Keywords that mean we should NOT log the raw text at all
+VERY_SENSITIVE_KEYWORDS = [
+    "bank",
+    "banking",
+    "keychain",
+    "password manager",
+]
+
+
+def mask_sensitive_text(text: str) -> str:
+    """
+    Mask obviously sensitive patterns (e.g. long digit sequences like OTPs).
+    We DO log these, but in masked form.
+    """
+    # Replace any 4+ digit sequence by ******.
+    return re.sub(r"\d{4,}", "******", text)
+
+
+def is_very_sensitive(text: str) -> bool:
+    """
+    For some commands (banking, keychain, etc.), we skip logging entirely.
+    """
+    lower = text.lower()
+    return any(kw in lower for kw in VERY_SENSITIVE_KEYWORDS)
@@ -4,41 +4,244 @@ from __future__ import annotations
 
 import json
 import os
-import re
+import threading
 import time
-from typing import Any, Dict
-
-from .llm_client import ask_llm
-from .mac_actions import open_app, set_volume, open_folder
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .llm_client import cache_partial, stream_llm
+# Privacy rules live in .privacy (llm_client needs them too); re-exported here.
+from .privacy import VERY_SENSITIVE_KEYWORDS, is_very_sensitive, mask_sensitive_text  # noqa: F401
+from .intents import match_intent
+from .intent_model import predict_intent
+from .mac_actions import is_installed_app, open_app, set_volume, open_folder
 from .shell_actions import run_shell_command
 from .cover_letter import generate_cover_letter
+from .interaction_store import write_batch
+from .log_writer import get_writer as get_log_writer
+from .tracing import add_stage, annotate, current_trace, span, trace
+from . import metrics
 
-LOG_PATH = os.path.expanduser("~/nunnarivu/logs/nunnarivu_interactions.jsonl")
+# Interaction store (.interaction_store picks SQLite or JSONL from the extension)
+LOG_PATH = os.path.expanduser("~/nunnarivu/logs/nunnarivu_interactions.sqlite3")
+# Write the log from a background thread (off the request path)
+LOG_IN_BACKGROUND = True
 
-# Keywords that mean we should NOT log the raw text at all
-VERY_SENSITIVE_KEYWORDS = [
-    "bank",
-    "banking",
-    "keychain",
-    "password manager",
-]
+# ---------- Action protocol: single source of truth ----------
+#
+# Every action the LLM may pick is defined once here. The router prompt, the
+# JSON schema sent as Ollama's "format", validation and dispatch are all
+# generated from this table.
 
 
-def mask_sensitive_text(text: str) -> str:
-    """
-    Mask obviously sensitive patterns (e.g. long digit sequences like OTPs).
-    We DO log these, but in masked form.
-    """
-    # Replace any 4+ digit sequence by ******.
-    return re.sub(r"\d{4,}", "******", text)
+def _run_open_app(args: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    name = args.get("name", "")
+    return {"name": name}, open_app(name)
+
+
+def _run_set_volume(args: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    level = args.get("level")
+    return {"level": level}, set_volume(level)
+
+
+def _run_open_folder(args: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    path = args.get("path", "~/")
+    return {"path": path}, open_folder(path)
+
+
+def _run_shell(args: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    command = args.get("command", "")
+    code, out, err = run_shell_command(command)
+    reply = f"Command exit code: {code}\n\nstdout:\n{out}\n\nstderr:\n{err}"
+    return {"command": command}, reply
+
+
+def _run_create_cover_letter(args: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    job_url = args.get("url")
+    name = args.get("name", "Applicant")
+    if not job_url:
+        return args, "I need a job URL to create a cover letter."
+
+    try:
+        path = generate_cover_letter(job_url, applicant_name=name)
+        return args, f"Your cover letter is ready at:\n{path}"
+    except Exception as e:
+        return args, f"Something went wrong creating the cover letter: {e}"
+
+
+# name -> {"args": JSON schema properties, "hint": prompt example, "run": handler,
+#          "slow_ms": latency above which the logged interaction is "slow"}
+# "run" returns (args as logged, reply). Actions without "run" just answer.
+# Actions without "slow_ms" use SLOW_MS_DEFAULT.
+ACTIONS: Dict[str, Dict[str, Any]] = {
+    "open_app": {
+        "args": {"name": {"type": "string"}},
+        "hint": '{"name": "Safari"}',
+        "run": _run_open_app,
+    },
+    "set_volume": {
+        "args": {"level": {"type": "integer", "minimum": 0, "maximum": 100}},
+        "hint": '{"level": 0-100}',
+        "run": _run_set_volume,
+        "slow_ms": 500.0,
+    },
+    "open_folder": {
+        "args": {"path": {"type": "string"}},
+        "hint": '{"path": "~/Downloads"}',
+        "run": _run_open_folder,
+        "slow_ms": 500.0,
+    },
+    "run_shell": {
+        "args": {"command": {"type": "string"}},
+        "hint": '{"command": "ls -la"}',
+        "run": _run_shell,
+        "slow_ms": 10000.0,  # the command itself may take up to its timeout
+    },
+    "create_cover_letter": {
+        "args": {"url": {"type": "string"}, "name": {"type": "string"}},
+        "hint": '{"url": "https://...", "name": "Applicant"}',
+        "run": _run_create_cover_letter,
+        "slow_ms": 15000.0,  # fetches the job page
+    },
+    "none": {
+        "args": {},
+        "hint": "{} (just answer in natural language)",
+    },
+}
+
+SLOW_MS_DEFAULT = 1000.0
+
+
+def slow_threshold_ms(action: str) -> float:
+    return ACTIONS.get(action, {}).get("slow_ms", SLOW_MS_DEFAULT)
+
+
+# Actions whose reply comes from the action helper itself, so they can run
+# as soon as "action" and "args" are known (no need for "assistant_reply").
+EARLY_DISPATCH_ACTIONS = {name for name, spec in ACTIONS.items() if "run" in spec}
+
+
+def _build_router_prompt() -> str:
+    valid = "".join(
+        f"  {name + ':':<15} {spec['hint']}\n" for name, spec in ACTIONS.items()
+    )
+    choices = " | ".join(f'"{name}"' for name in ACTIONS)
+    return (
+        "You are Sunny, an AI OS assistant for macOS. "
+        "Your job is to map user requests to JSON actions.\n\n"
+        "Valid actions:\n"
+        f"{valid}\n"
+        "You MUST respond ONLY with a single JSON object, no extra text.\n"
+        "The JSON must always have at least these keys:\n"
+        f"  \"action\": {choices}\n"
+        "  \"args\":   an object with arguments for that action (or {})\n"
+        "  \"assistant_reply\": a short natural-language reply to the user.\n"
+        "If the user only greets you (e.g. 'hey', 'hi'), use action 'none'."
+    )
 
 
-def is_very_sensitive(text: str) -> bool:
+def build_action_schema() -> Dict[str, Any]:
+    """
+    JSON schema for the action protocol, passed as Ollama's "format" so the
+    model can only produce a valid action object. Key order is
+    action -> args -> assistant_reply, which lets early dispatch fire
+    before the reply text is generated.
     """
-    For some commands (banking, keychain, etc.), we skip logging entirely.
+    variants = []
+    for name, spec in ACTIONS.items():
+        variants.append({
+            "type": "object",
+            "properties": {
+                "action": {"type": "string", "enum": [name]},
+                "args": {
+                    "type": "object",
+                    "properties": spec["args"],
+                    "required": list(spec["args"]),
+                },
+                "assistant_reply": {"type": "string"},
+            },
+            "required": ["action", "args", "assistant_reply"],
+        })
+    return {"anyOf": variants}
+
+
+_JSON_TYPES = {"string": str, "integer": int, "number": (int, float), "boolean": bool}
+
+
+def validate_action(obj: Any) -> Optional[str]:
     """
-    lower = text.lower()
-    return any(kw in lower for kw in VERY_SENSITIVE_KEYWORDS)
+    Check an action object against ACTIONS. Returns a short problem
+    description, or None if it is valid. "assistant_reply" may be missing
+    (early dispatch doesn't wait for it).
+    """
+    if not isinstance(obj, dict):
+        return "not a JSON object"
+    action = obj.get("action")
+    if action not in ACTIONS:
+        return f"unknown action {action!r}"
+    args = obj.get("args")
+    if not isinstance(args, dict):
+        return "args is not an object"
+    for arg, schema in ACTIONS[action]["args"].items():
+        if arg not in args:
+            return f"{action}: missing arg {arg!r}"
+        value = args[arg]
+        expected = _JSON_TYPES.get(schema.get("type"), object)
+        if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+            return f"{action}: {arg!r} should be {schema['type']}"
+        if "minimum" in schema and value < schema["minimum"]:
+            return f"{action}: {arg!r} below {schema['minimum']}"
+        if "maximum" in schema and value > schema["maximum"]:
+            return f"{action}: {arg!r} above {schema['maximum']}"
+    if not isinstance(obj.get("assistant_reply", ""), str):
+        return "assistant_reply is not a string"
+    return None
+
+
+# Fixed router prompt. Built once and sent as the same leading text on every
+# call, so Ollama can reuse its cached prefix instead of re-evaluating it.
+ROUTER_SYSTEM_PROMPT = _build_router_prompt()
+ACTION_SCHEMA = build_action_schema()
+
+# Progress callback for streaming clients (backend/server.py):
+#   on_event("token", {"text": ...})            each LLM token as it arrives
+#   on_event("action", {"action": ..., "args": ...})  as soon as it is known
+#   on_event("done", {"assistant_reply": ..., "stages": {...}})
+# Raising from the callback (RouteCancelled) aborts the request; on the LLM
+# path that closes the Ollama stream, which stops the generation.
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class RouteCancelled(Exception):
+    """Raised by an on_event callback when the client went away."""
+
+
+# LLM-path counters: actions produced vs. outputs that broke the protocol
+ACTION_STATS = {"llm_actions": 0, "validation_failures": 0}
+
+# Reply when the LLM picked an action it got wrong (that action is not run)
+INVALID_ACTION_REPLY = "Sorry, I couldn't work out how to do that. Could you rephrase it?"
+
+# How many messages the local rules / the intent model resolved vs. sent to the LLM
+FAST_PATH_STATS = {"local": 0, "model": 0, "llm": 0}
+
+# route_message runs on many threads (server workers, early dispatch)
+_stats_lock = threading.Lock()
+
+
+def _count(stats: Dict[str, int], key: str) -> None:
+    with _stats_lock:
+        stats[key] += 1
+
+# Same signals in the metrics registry (GET /metrics on backend/server.py)
+ROUTE_SECONDS = metrics.histogram(
+    "sunny_route_seconds", "route_message latency by resolving path (local/model/llm)", ["path"]
+)
+ACTIONS_TOTAL = metrics.counter("sunny_actions_total", "Routed messages by action", ["action"])
+SLOW_TOTAL = metrics.counter("sunny_slow_total", "Routed messages over the action's slow_ms", ["action"])
+ACTION_SECONDS = metrics.histogram("sunny_action_seconds", "Action handler run time", ["action"])
+VALIDATION_FAILURES = metrics.counter(
+    "sunny_validation_failures_total", "LLM outputs that broke the action protocol"
+)
 
 
 def log_interaction(
@@ -47,9 +250,16 @@ def log_interaction(
     assistant_reply: str,
     latency_ms: float,
     slow: bool,
+    stages: Optional[Dict[str, float]] = None,
+    llm: Optional[Dict[str, Any]] = None,
 ) -> None:
     """
-    Append each interaction to a JSONL file for future training.
+    Queue each interaction for the interaction store (future training).
+
+    The background writer in .log_writer does the disk I/O; with
+    LOG_IN_BACKGROUND = False the entry is written before returning.
+    `stages` is the per-stage latency breakdown (ms) from .tracing and
+    `llm` the Ollama generation metrics (.llm_metrics), if the LLM ran.
     """
     entry = {
         "timestamp": time.time(),
@@ -59,10 +269,15 @@ def log_interaction(
         "latency_ms": latency_ms,
         "slow": slow,
     }
+    if stages:
+        entry["stages"] = stages
+    if llm:
+        entry["llm"] = llm
 
-    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
-    with open(LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps(entry) + "\n")
+    if LOG_IN_BACKGROUND:
+        get_log_writer().write(LOG_PATH, entry)
+    else:
+        write_batch([(LOG_PATH, entry)])
 
 
 def maybe_log_interaction(
@@ -75,15 +290,24 @@ def maybe_log_interaction(
     Apply privacy rules + latency calculation before logging.
     """
     latency_ms = (time.time() - started_at) * 1000.0
-    slow = latency_ms > 1000.0  # > 1 second considered slow
+    action = assistant_action.get("action", "none")
+    slow = latency_ms > slow_threshold_ms(action)
+    ACTIONS_TOTAL.labels(action=action).inc()
+    if slow:
+        SLOW_TOTAL.labels(action=action).inc()
+
+    with span("log"):
+        if is_very_sensitive(raw_user_text):
+            # For very sensitive commands we skip logging completely.
+            print("[INFO] Skipping log for potentially sensitive command.")
+            return
 
-    if is_very_sensitive(raw_user_text):
-        # For very sensitive commands we skip logging completely.
-        print("[INFO] Skipping log for potentially sensitive command.")
-        return
+        safe_text = mask_sensitive_text(raw_user_text)
 
-    safe_text = mask_sensitive_text(raw_user_text)
-    log_interaction(safe_text, assistant_action, assistant_reply, latency_ms, slow)
+    t = current_trace()
+    stages = t.breakdown() if t is not None else None
+    llm = t.annotations.get("llm") if t is not None else None
+    log_interaction(safe_text, assistant_action, assistant_reply, latency_ms, slow, stages, llm)
 
 
 def _parse_action_json(raw: str) -> Dict[str, Any]:
@@ -119,65 +343,260 @@ def _parse_action_json(raw: str) -> Dict[str, Any]:
     return {"assistant_reply": raw}
 
 
-def route_message(user_text: str) -> Dict[str, Any]:
+class _ActionStreamParser:
+    """
+    Incrementally scan streamed LLM output for the action JSON object.
+
+    Tokens are fed in as they arrive. The parser tracks string/escape state
+    and brace depth of the FIRST top-level {...} object, so it knows:
+      - when "action" and "args" are complete (early dispatch), and
+      - when the object balances (nothing after it is worth waiting for).
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.obj: Optional[Dict[str, Any]] = None  # complete top-level object
+        self.partial: Optional[Dict[str, Any]] = None  # object so far
+        self.done = False
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> None:
+        if self.done:
+            return
+        self.text += chunk
+        text = self.text
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+
+            if self._start == -1:
+                if ch == "{":
+                    self._start = i
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish(text[self._start : i + 1])
+                    self._pos = i + 1
+                    return
+            elif ch == "," and self._depth == 1:
+                # A top-level value just ended: see what we have so far.
+                self._try_partial(text[self._start : i] + "}")
+
+        self._pos = len(text)
+
+    def _finish(self, fragment: str) -> None:
+        self.done = True
+        try:
+            obj = json.loads(fragment)
+        except json.JSONDecodeError:
+            return
+        if isinstance(obj, dict):
+            self.obj = obj
+
+    def _try_partial(self, fragment: str) -> None:
+        try:
+            obj = json.loads(fragment)
+        except json.JSONDecodeError:
+            return
+        if isinstance(obj, dict):
+            self.partial = obj
+
+    def ready_action(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the partial object if it already names an action that can be
+        dispatched without waiting for the rest of the output.
+        """
+        obj = self.partial
+        if not obj or "action" not in obj or "args" not in obj:
+            return None
+        if obj["action"] not in EARLY_DISPATCH_ACTIONS:
+            return None
+        if not isinstance(obj["args"], dict):
+            return None
+        return obj
+
+    def result(self) -> Dict[str, Any]:
+        """Best action object for everything fed so far."""
+        if self.obj is not None:
+            return self.obj
+        ready = self.ready_action()
+        if ready is not None:
+            return ready
+        return _parse_action_json(self.text)
+
+
+def _stream_action(
+    messages: List[Dict[str, str]],
+    on_event: Optional[EventCallback] = None,
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Stream the LLM output and stop reading as soon as we know what to do:
+      - an executable action with complete args, or
+      - the top-level JSON object balanced.
+    Each token is passed to `on_event` (if given) as it arrives.
+    Returns (action_obj, raw_text_seen).
+    """
+    parser = _ActionStreamParser()
+    # Constrain decoding to the action schema: no malformed generations.
+    # A prefix we stopped at before (cache_partial below) is enough for us.
+    stream = stream_llm(messages, format=ACTION_SCHEMA, allow_partial=True)
+    # Timed by hand: a span per token would cost more than the parse itself
+    llm_s = parse_s = 0.0
+    mark = time.perf_counter()
+    stopped = False
+    try:
+        for token in stream:
+            now = time.perf_counter()
+            llm_s += now - mark
+            if on_event is not None:
+                on_event("token", {"text": token})
+            parser.feed(token)
+            stopped = parser.done or parser.ready_action() is not None
+            mark = time.perf_counter()
+            parse_s += mark - now
+            if stopped:
+                break
+    finally:
+        # Closing the generator closes the HTTP stream -> Ollama stops.
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+        llm_s += time.perf_counter() - mark
+        add_stage("llm", llm_s * 1000.0)
+        add_stage("parse", parse_s * 1000.0)
+
+    if stopped:
+        # Everything the next identical request needs (not if we were cancelled)
+        cache_partial(messages, parser.text, format=ACTION_SCHEMA)
+    return parser.result(), parser.text
+
+
+def route_message(user_text: str, on_event: Optional[EventCallback] = None) -> Dict[str, Any]:
     """
     High-level router: given raw user text, decide what to do.
 
     For speed:
-    - Simple 'open ...' commands go through a FAST PATH (no LLM).
+    - Common commands ("open safari", "volume thirty", "hey") are resolved
+      by the local intent rules in .intents (FAST PATH, no LLM).
+    - Other phrasings go to the learned classifier in .intent_model; if it
+      is confident and the args can be filled, the LLM is skipped too.
     - Everything else goes through the LLM action JSON protocol.
+
+    Each call runs under a .tracing trace; the per-stage timings end up in
+    the log entry's "stages".
+
+    `on_event` receives tokens, the action and the final reply as they
+    become known (see EventCallback).
     """
+    with trace() as t:
+        result = _route_message(user_text, on_event)
+        ROUTE_SECONDS.labels(path=t.annotations.get("path", "llm")).observe(t.elapsed_ms() / 1000.0)
+        if on_event is not None:
+            on_event("done", {"assistant_reply": result["assistant_reply"], "stages": t.breakdown()})
+        return result
+
+
+def _emit_action(on_event: Optional[EventCallback], action: str, args: Dict[str, Any]) -> None:
+    if on_event is not None:
+        on_event("action", {"action": action, "args": args})
+
+
+def _run_action(action: str, run: Callable, args: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    started = time.perf_counter()
+    try:
+        with span("action"):
+            return run(args)
+    finally:
+        ACTION_SECONDS.labels(action=action).observe(time.perf_counter() - started)
+
+
+def _route_message(user_text: str, on_event: Optional[EventCallback] = None) -> Dict[str, Any]:
     started_at = time.time()
     normalized = user_text.strip().lower()
 
-    # ---------- FAST PATH: "open <something>" ----------
+    # ---------- FAST PATH: local intent rules ----------
+
+    # Respect privacy rules: very sensitive "open my banking app" still
+    # goes to the LLM path (and can skip logging).
+    intent = None
+    if not is_very_sensitive(normalized):
+        # Fast-path intents are checked against ACTIONS like the LLM's
+        # output; one that fails goes to the LLM instead
+        with span("intent_rules"):
+            intent = match_intent(normalized, known_app=is_installed_app)
+            if intent is not None and validate_action(intent) is not None:
+                intent = None
+        if intent is not None:
+            _count(FAST_PATH_STATS, "local")
+            annotate("path", "local")
+        else:
+            with span("intent_model"):
+                intent = predict_intent(normalized)
+                if intent is not None and validate_action(intent) is not None:
+                    intent = None
+            if intent is not None:
+                _count(FAST_PATH_STATS, "model")
+                annotate("path", "model")
+
+    if intent is not None:
+        action = intent["action"]
+        _emit_action(on_event, action, intent["args"])
+        run = ACTIONS[action].get("run")
+        if run is not None:
+            logged_args, reply = _run_action(action, run, intent["args"])
+        else:
+            logged_args, reply = intent["args"], intent["assistant_reply"]
 
-    if normalized.startswith("open "):
-        # Respect privacy rules: very sensitive "open my banking app" still
-        # goes to the LLM path (and can skip logging).
-        if not is_very_sensitive(normalized):
-            app_query = normalized[len("open ") :].strip()
-            reply = open_app(app_query)
+        maybe_log_interaction(
+            raw_user_text=user_text,
+            assistant_action={"action": action, "args": logged_args},
+            assistant_reply=reply,
+            started_at=started_at,
+        )
+        return {"assistant_reply": reply}
 
-            maybe_log_interaction(
-                raw_user_text=user_text,
-                assistant_action={"action": "open_app", "args": {"name": app_query}},
-                assistant_reply=reply,
-                started_at=started_at,
-            )
-            return {"assistant_reply": reply}
+    _count(FAST_PATH_STATS, "llm")
+    annotate("path", "llm")
 
     # ---------- LLM PATH ----------
 
-    system_prompt = (
-        "You are Sunny, an AI OS assistant for macOS. "
-        "Your job is to map user requests to JSON actions.\n\n"
-        "Valid actions:\n"
-        "  open_app:       {\"name\": \"Safari\"}\n"
-        "  set_volume:     {\"level\": 0-100}\n"
-        "  open_folder:    {\"path\": \"~/Downloads\"}\n"
-        "  run_shell:      {\"command\": \"ls -la\"}\n"
-        "  create_cover_letter: {\"url\": \"https://...\", \"name\": \"Applicant\"}\n"
-        "  none:           {} (just answer in natural language)\n\n"
-        "You MUST respond ONLY with a single JSON object, no extra text.\n"
-        "The JSON must always have at least these keys:\n"
-        "  \"action\": \"open_app\" | \"set_volume\" | \"open_folder\" | \"run_shell\" | "
-        "\"create_cover_letter\" | \"none\"\n"
-        "  \"args\":   an object with arguments for that action (or {})\n"
-        "  \"assistant_reply\": a short natural-language reply to the user.\n"
-        "If the user only greets you (e.g. 'hey', 'hi'), use action 'none'."
-    )
-
     messages = [
-        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": ROUTER_SYSTEM_PROMPT},
         {"role": "user", "content": user_text},
     ]
 
-    raw = ask_llm(messages)
-    action_obj = _parse_action_json(raw)
+    action_obj, raw = _stream_action(messages, on_event)
+
+    _count(ACTION_STATS, "llm_actions")
+    problem = validate_action(action_obj)
+    if problem is not None:
+        _count(ACTION_STATS, "validation_failures")
+        VALIDATION_FAILURES.inc()
+        print(f"[WARN] LLM output does not match the action schema: {problem}")
 
     # Special case: model returned just {"none": {}} or similar
     if set(action_obj.keys()) == {"none"}:
+        _emit_action(on_event, "none", {})
         assistant_reply = "Hi, I'm Sunny. How can I help you?"
         maybe_log_interaction(
             raw_user_text=user_text,
@@ -189,6 +608,7 @@ def route_message(user_text: str) -> Dict[str, Any]:
 
     # Plain-text reply only
     if "action" not in action_obj and "assistant_reply" in action_obj:
+        _emit_action(on_event, "none", {})
         assistant_reply = action_obj["assistant_reply"]
         maybe_log_interaction(
             raw_user_text=user_text,
@@ -198,84 +618,31 @@ def route_message(user_text: str) -> Dict[str, Any]:
         )
         return {"assistant_reply": assistant_reply}
 
+    # Never run an action that fails the schema (unknown name, missing or
+    # out-of-range args): answer in words instead
+    if problem is not None:
+        action_obj = {"action": "none", "args": {}, "assistant_reply": INVALID_ACTION_REPLY}
+
     action = action_obj.get("action", "none")
     args = action_obj.get("args", {}) or {}
+    if not isinstance(args, dict):
+        args = {}
     assistant_reply = action_obj.get("assistant_reply", "")
+    _emit_action(on_event, action, args)
 
     # ---------- Execute mapped action ----------
 
-    if action == "open_app":
-        name = args.get("name", "")
-        reply = open_app(name)
-        maybe_log_interaction(
-            raw_user_text=user_text,
-            assistant_action={"action": "open_app", "args": {"name": name}},
-            assistant_reply=reply,
-            started_at=started_at,
-        )
-        return {"assistant_reply": reply}
-
-    if action == "set_volume":
-        level = args.get("level")
-        reply = set_volume(level)
+    run = ACTIONS.get(action, {}).get("run")
+    if run is not None:
+        logged_args, reply = _run_action(action, run, args)
         maybe_log_interaction(
             raw_user_text=user_text,
-            assistant_action={"action": "set_volume", "args": {"level": level}},
+            assistant_action={"action": action, "args": logged_args},
             assistant_reply=reply,
             started_at=started_at,
         )
         return {"assistant_reply": reply}
 
-    if action == "open_folder":
-        path = args.get("path", "~/")
-        reply = open_folder(path)
-        maybe_log_interaction(
-            raw_user_text=user_text,
-            assistant_action={"action": "open_folder", "args": {"path": path}},
-            assistant_reply=reply,
-            started_at=started_at,
-        )
-        return {"assistant_reply": reply}
-
-    if action == "run_shell":
-        command = args.get("command", "")
-        code, out, err = run_shell_command(command)
-        reply = f"Command exit code: {code}\n\nstdout:\n{out}\n\nstderr:\n{err}"
-        maybe_log_interaction(
-            raw_user_text=user_text,
-            assistant_action={"action": "run_shell", "args": {"command": command}},
-            assistant_reply=reply,
-            started_at=started_at,
-        )
-        return {"assistant_reply": reply}
-
-    if action == "create_cover_letter":
-        job_url = args.get("url")
-        name = args.get("name", "Applicant")
-        if not job_url:
-            assistant_reply = "I need a job URL to create a cover letter."
-            maybe_log_interaction(
-                raw_user_text=user_text,
-                assistant_action={"action": "create_cover_letter", "args": args},
-                assistant_reply=assistant_reply,
-                started_at=started_at,
-            )
-            return {"assistant_reply": assistant_reply}
-
-        try:
-            path = generate_cover_letter(job_url, applicant_name=name)
-            assistant_reply = f"Your cover letter is ready at:\n{path}"
-        except Exception as e:
-            assistant_reply = f"Something went wrong creating the cover letter: {e}"
-
-        maybe_log_interaction(
-            raw_user_text=user_text,
-            assistant_action={"action": "create_cover_letter", "args": args},
-            assistant_reply=assistant_reply,
-            started_at=started_at,
-        )
-        return {"assistant_reply": assistant_reply}
-
     # default / none: just treat as normal reply
     if assistant_reply:
         maybe_log_interaction(
@@ -0,0 +1,969 @@
+# backend/server.py
+"""
+Sunny as a local HTTP service.
+
+One process keeps everything warm (app index, intent model, Ollama
+connection pool, log writer) and serves every client:
+
+    POST /route   {"text": "open safari", "priority": "voice"}
+      -> {"assistant_reply": "...", "latency_ms": 12.3}
+    POST /route/stream  {"text": "..."}
+      -> Server-Sent Events, see below
+    GET  /health  -> {"status": "ok", "in_flight": 0, ...}
+    GET  /metrics -> every .metrics series, Prometheus text format
+
+route_message blocks (LLM call, subprocess actions), so it runs on a
+bounded thread pool. At most `workers` requests run at once and
+`max_queue` more may wait; beyond that the server answers 429 right away
+instead of queueing without limit. A request that takes longer than
+`request_timeout_s` gets a 504 (the worker finishes in the background and
+keeps its slot until then). "priority" (voice / interactive / batch,
+default interactive) is the request's class in the LLM scheduler
+(.llm_scheduler), so voice clients go ahead of batch work. The server
+hosts the LLM broker (.llm_broker), so sunny_voice.py and sunny_dev.py,
+which run in their own processes, queue in the same scheduler. SIGINT / SIGTERM stop accepting connections,
+let in-flight requests finish (up to `shutdown_grace_s`), then flush the
+log writer and close the LLM session.
+
+/route/stream answers at once and then sends, as they happen:
+    event: token   data: {"text": "..."}          each LLM token
+    event: action  data: {"action": ..., "args": ...}
+    event: done    data: {"assistant_reply", "latency_ms", "first_token_ms", "stages"}
+    event: error   data: {"error": "..."}
+If the client disconnects, the router is cancelled at its next token, which
+closes the Ollama stream and stops the generation; a request still queued
+for an LLM slot leaves the queue without starting one.
+
+Plain asyncio + HTTP/1.1 keep-alive, no extra dependencies.
+
+A routed message can run shell commands, so the server only answers the
+local user's own programs, not web pages they visit:
+  - POST bodies must be sent as Content-Type: application/json (415
+    otherwise); a page can only send that cross-origin after a CORS
+    preflight, which the server never approves;
+  - the Host header must name a loopback address and an Origin header, if
+    any, a loopback origin (403 otherwise), which also defeats DNS
+    rebinding;
+  - bound to a non-loopback --host, every request must carry
+    "Authorization: Bearer <token>" (401 otherwise); the server refuses to
+    start there without --token.
+
+One process runs JSON parsing, intent matching, app lookup and prompt
+building under one GIL. With --processes N (PreforkServer) the parent
+loads the read-only tables (app index, intent model and rules, router
+prompt and schema) once, freezes them out of the garbage collector and
+forks N workers that share them copy-on-write and accept from one listening
+socket. Each worker has its own thread pool, LLM session, log writer and
+metrics; GET /metrics merges every worker's series, labelled
+worker="<pid>". The LLM broker runs in a process of its own, so all
+workers take their LLM slots from one scheduler: the Ollama host sees
+LLM_SLOTS_PER_HOST however many workers there are, and voice requests
+go first whichever worker has them. POSIX only (os.fork).
+
+With --watch-apps an AppWatcher thread (.app_watcher) keeps the app index
+in step with installed apps. In pre-fork mode it runs in a process of its
+own (the parent never starts threads) and the workers re-read the
+rewritten app_index.json in the background, answering from the previous
+index until the new one is ready.
+
+Usage:
+    python -m backend.server --port 8765 --workers 8 --max-queue 64
+    python -m backend.server --processes 4 --watch-apps
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import hmac
+import ipaddress
+import json
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from . import app_index, llm_broker, llm_client, mac_actions, metrics
+from .app_watcher import AppWatcher
+from .intent_model import get_model as get_intent_model
+from .intents import match_intent
+from .llm_broker import LLMBroker, broker_alive
+from .llm_scheduler import DEFAULT_PRIORITY, PRIORITIES, llm_cancel_on, llm_priority
+from .log_writer import get_writer as get_log_writer
+from .router import RouteCancelled, route_message
+
+HOST = "127.0.0.1"
+PORT = 8765
+# Bearer token required from every client; mandatory when HOST is not loopback
+TOKEN: Optional[str] = None
+WORKERS = 8
+MAX_QUEUE = 64
+REQUEST_TIMEOUT_S = 60.0
+SHUTDOWN_GRACE_S = 10.0
+MAX_BODY_BYTES = 1 << 20
+# Request line + headers; more of either gets 431
+MAX_HEADER_BYTES = 16 << 10
+MAX_HEADERS = 64
+# How often a streaming response checks whether its client is still there
+DISCONNECT_POLL_S = 0.1
+# Pending TCP connections; many clients connecting at once shouldn't hit SYN retries
+BACKLOG = 1024
+# Worker processes for PreforkServer (1 = plain SunnyServer)
+PROCESSES = 1
+# How often a pre-fork worker refreshes its metrics snapshot for GET /metrics
+METRICS_SNAPSHOT_S = 5.0
+# Run an AppWatcher next to the server
+WATCH_APPS = False
+
+HTTP_REQUESTS = metrics.counter("sunny_http_requests_total", "HTTP requests by route and status", ["path", "status"])
+HTTP_SECONDS = metrics.histogram("sunny_http_request_seconds", "HTTP request handling time", ["path"])
+IN_FLIGHT = metrics.gauge("sunny_http_in_flight", "Admitted requests: running or waiting for a worker")
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    415: "Unsupported Media Type",
+    429: "Too Many Requests",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+class Request:
+    def __init__(
+        self, method: str, path: str, headers: Dict[str, str], body: bytes, query: str = ""
+    ) -> None:
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+        self.query = parse_qs(query)
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+    def json(self) -> Any:
+        return json.loads(self.body or b"{}")
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+Handler = Callable[
+    [Request, asyncio.StreamReader, asyncio.StreamWriter], Awaitable[Optional[Tuple[int, Any]]]
+]
+
+
+class SunnyServer:
+    """
+    asyncio HTTP front end for route_message.
+
+    Routes live in `self.routes` ((method, path) -> handler). A handler
+    returns (status, JSON body), or None if it already wrote the response
+    itself.
+    """
+
+    def __init__(
+        self,
+        host: str = HOST,
+        port: int = PORT,
+        workers: int = WORKERS,
+        max_queue: int = MAX_QUEUE,
+        request_timeout_s: float = REQUEST_TIMEOUT_S,
+        shutdown_grace_s: float = SHUTDOWN_GRACE_S,
+        route: Callable[..., Dict[str, Any]] = route_message,
+        sock: Optional[socket.socket] = None,
+        token: Optional[str] = TOKEN,
+        llm_broker: bool = True,
+        metrics_dir: Optional[str] = None,
+    ) -> None:
+        if token is None and not is_loopback(host):
+            raise ValueError(f"refusing to serve on {host} without a token (--token)")
+        self.host = host
+        self.token = token
+        self.port = port
+        self.sock = sock  # already listening (PreforkServer workers)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.request_timeout_s = request_timeout_s
+        self.shutdown_grace_s = shutdown_grace_s
+        self.route = route
+        self.llm_broker = llm_broker  # serve the LLM broker if nobody else does
+        # Pre-fork: where every worker leaves its metrics for the others' /metrics
+        self.metrics_dir = metrics_dir
+
+        self.in_flight = 0  # admitted: running or waiting for a worker
+        self.running = 0
+        self.served = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+        self.routes: Dict[Tuple[str, str], Handler] = {
+            ("POST", "/route"): self._handle_route,
+            ("POST", "/route/stream"): self._handle_stream,
+            ("GET", "/health"): self._handle_health,
+            ("GET", "/metrics"): self._handle_metrics,
+        }
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._broker: Optional[LLMBroker] = None
+        self._snapshots: Optional["asyncio.Task[None]"] = None
+        self._idle = asyncio.Event()
+        self._closing = False
+
+    # ---------- lifecycle ----------
+
+    @staticmethod
+    def warm_up() -> None:
+        """Load everything a first request would otherwise pay for."""
+        load_shared_tables()
+        llm_client.get_session()
+        get_log_writer()._ensure_started()
+
+    async def start(self) -> "SunnyServer":
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sunny-worker")
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.warm_up)
+        await self._start_broker()
+        if self.metrics_dir is not None:
+            self._snapshots = asyncio.ensure_future(self._snapshot_metrics_forever())
+        self._idle.set()
+        if self.sock is not None:
+            self._server = await asyncio.start_server(self._serve_connection, sock=self.sock)
+        else:
+            self._server = await asyncio.start_server(
+                self._serve_connection, self.host, self.port, backlog=BACKLOG
+            )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        """Stop accepting, wait for in-flight requests, then release resources."""
+        self._closing = True
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=self.shutdown_grace_s)
+        except asyncio.TimeoutError:
+            print(f"[WARN] Shutting down with {self.in_flight} request(s) still running.")
+        if server is not None:
+            # Idle keep-alive connections would otherwise hold wait_closed() open
+            if hasattr(server, "close_clients"):
+                server.close_clients()
+            try:
+                await asyncio.wait_for(server.wait_closed(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._snapshots is not None:
+            self._snapshots.cancel()
+            self._snapshots = None
+        if self._broker is not None:
+            await self._broker.stop()
+            self._broker = None
+            llm_client.set_scheduler(None)
+        get_log_writer().flush(timeout=self.shutdown_grace_s)
+        llm_client.close_session()
+
+    async def _start_broker(self) -> None:
+        """
+        Own the LLM priority queue of every Sunny process (.llm_broker)
+        unless a broker already runs: voice, dev chat and CLI clients then
+        queue against this server's requests.
+        """
+        path = llm_client.LLM_BROKER_PATH
+        if not self.llm_broker or not path or broker_alive(path):
+            return
+        scheduler = llm_client.new_scheduler()
+        try:
+            self._broker = await LLMBroker(scheduler, path).start()
+        except OSError as e:
+            print(f"[WARN] Could not start the LLM broker at {path}: {e}")
+            return
+        llm_client.set_scheduler(scheduler)
+
+    async def serve_forever(self) -> None:
+        """Run until SIGINT / SIGTERM, then shut down gracefully."""
+        await self.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        print(f"[OK] Sunny server listening on http://{self.host}:{self.port} (pid {os.getpid()})")
+        await stop.wait()
+        print("[INFO] Shutting down...")
+        await self.stop()
+
+    async def __aenter__(self) -> "SunnyServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    # ---------- admission + worker pool ----------
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "running": self.running,
+            "queued": self.in_flight - self.running,
+            "served": self.served,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+        }
+
+    def _admit(self) -> None:
+        if self._closing:
+            raise HTTPError(503, "server is shutting down")
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPError(429, "too many requests")
+        self.in_flight += 1
+        self._idle.clear()
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    async def run_blocking(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run `fn` on the worker pool under admission control (429 when the
+        queue is full, 504 after request_timeout_s).
+        """
+        self._admit()
+        future = self._submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.request_timeout_s)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPError(504, f"no reply within {self.request_timeout_s:.0f} s")
+
+    def _submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> "asyncio.Future[Any]":
+        """Start an admitted request on the worker pool."""
+        loop = asyncio.get_running_loop()
+
+        def work() -> Any:
+            loop.call_soon_threadsafe(self._started)
+            return fn(*args, **kwargs)
+
+        future = loop.run_in_executor(self._executor, work)
+        # The slot is held until the worker really finishes, even after a
+        # timeout, so backpressure reflects the actual load.
+        future.add_done_callback(lambda _: self._finished())
+        return future
+
+    def _started(self) -> None:
+        self.running += 1
+
+    def _finished(self) -> None:
+        self.running -= 1
+        self._release()
+
+    # ---------- handlers ----------
+
+    async def _handle_route(
+        self, request: Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> Tuple[int, Any]:
+        text = _request_text(request)
+        priority = _request_priority(request)
+        started = time.perf_counter()
+        result = await self.run_blocking(_with_priority, priority, self.route, text)
+        self.served += 1
+        return 200, {
+            "assistant_reply": result.get("assistant_reply", ""),
+            "latency_ms": round((time.perf_counter() - started) * 1000.0, 2),
+        }
+
+    async def _handle_health(
+        self, request: Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> Tuple[int, Any]:
+        return 200, {
+            "status": "closing" if self._closing else "ok",
+            **self.stats(),
+            "llm_scheduler": llm_client.scheduler_stats(),
+        }
+
+    async def _handle_metrics(
+        self, request: Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        IN_FLIGHT.set(self.in_flight)
+        if self.metrics_dir is None:
+            text = metrics.render()
+        else:
+            # Every worker's series, so scrapes don't depend on who answers
+            self._snapshot_metrics()
+            text = metrics.merge(_read_snapshots(self.metrics_dir))
+        await _send_text(writer, 200, text, keep_alive=request.keep_alive)
+
+    def _snapshot_metrics(self) -> None:
+        IN_FLIGHT.set(self.in_flight)
+        path = os.path.join(self.metrics_dir, f"worker-{os.getpid()}.prom")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(metrics.render({"worker": str(os.getpid())}))
+        os.replace(tmp, path)
+
+    async def _snapshot_metrics_forever(self) -> None:
+        while True:
+            try:
+                self._snapshot_metrics()
+            except OSError as e:
+                print(f"[WARN] Could not write the metrics snapshot: {e}")
+            await asyncio.sleep(METRICS_SNAPSHOT_S)
+
+    async def _handle_stream(
+        self, request: Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Relay route_message's events to the client as Server-Sent Events."""
+        text = _request_text(request)
+        priority = _request_priority(request)
+        self._admit()  # 429 / 503 still go out as plain JSON responses
+
+        loop = asyncio.get_running_loop()
+        events: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue()
+        cancel = threading.Event()
+
+        def on_event(kind: str, data: Dict[str, Any]) -> None:
+            if cancel.is_set():
+                raise RouteCancelled()
+            loop.call_soon_threadsafe(events.put_nowait, (kind, data))
+
+        started = time.perf_counter()
+        future = self._submit(_with_priority, priority, self.route, text, on_event, cancel=cancel)
+        await _start_event_stream(writer)
+
+        first_token_ms: Optional[float] = None
+        deadline = started + self.request_timeout_s
+        try:
+            while True:
+                # Checked on every event: a steady token stream must not outrun either
+                if reader.at_eof() or writer.is_closing():
+                    cancel.set()
+                    return
+                if time.perf_counter() > deadline:
+                    cancel.set()
+                    self.timed_out += 1
+                    await _send_event(writer, "error", {"error": "timed out"})
+                    break
+                try:
+                    kind, data = await asyncio.wait_for(events.get(), timeout=DISCONNECT_POLL_S)
+                except asyncio.TimeoutError:
+                    if future.done() and events.empty():
+                        break
+                    continue
+
+                if kind == "token" and first_token_ms is None:
+                    first_token_ms = round((time.perf_counter() - started) * 1000.0, 2)
+                elif kind == "done":
+                    data = {
+                        "assistant_reply": data.get("assistant_reply", ""),
+                        "latency_ms": round((time.perf_counter() - started) * 1000.0, 2),
+                        "first_token_ms": first_token_ms,
+                        "stages": data.get("stages", {}),
+                    }
+                    self.served += 1
+                await _send_event(writer, kind, data)
+
+            if future.done() and future.exception() is not None and not cancel.is_set():
+                print(f"[WARN] Streaming request failed: {future.exception()!r}")
+                await _send_event(writer, "error", {"error": "internal error"})
+            await _end_chunks(writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            cancel.set()
+            raise
+
+    # ---------- HTTP ----------
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while not self._closing:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as e:
+                    await _send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    return
+                if request is None:
+                    return
+
+                handler = self.routes.get((request.method, request.path))
+                started = time.perf_counter()
+                try:
+                    self._check_access(request)
+                    if handler is None:
+                        known = any(path == request.path for _, path in self.routes)
+                        raise HTTPError(405 if known else 404, f"no route for {request.method} {request.path}")
+                    response = await handler(request, reader, writer)
+                except HTTPError as e:
+                    response = (e.status, {"error": str(e)})
+                except Exception as e:
+                    print(f"[WARN] Request failed: {e!r}")
+                    response = (500, {"error": "internal error"})
+
+                path = request.path if handler is not None else "other"
+                HTTP_REQUESTS.labels(path=path, status=str(200 if response is None else response[0])).inc()
+                HTTP_SECONDS.labels(path=path).observe(time.perf_counter() - started)
+                if response is None:  # handler streamed its own response
+                    if not request.keep_alive or reader.at_eof() or writer.is_closing():
+                        return
+                    continue
+                await _send_json(writer, *response, keep_alive=request.keep_alive and not self._closing)
+                if not request.keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _check_access(self, request: Request) -> None:
+        """403 for requests a web page could have made, 401 without the token."""
+        host = request.headers.get("host", "")
+        origin = request.headers.get("origin")
+        if origin is not None and not is_loopback(urlsplit(origin).hostname or ""):
+            raise HTTPError(403, "cross-origin requests are not allowed")
+        if self.token is not None:
+            auth = request.headers.get("authorization", "")
+            if not hmac.compare_digest(auth.encode("latin-1"), f"Bearer {self.token}".encode("latin-1")):
+                raise HTTPError(401, "missing or wrong token")
+        elif not is_loopback(urlsplit(f"//{host}").hostname or ""):
+            raise HTTPError(403, f"unexpected Host header {host!r}")
+
+
+def is_loopback(host: str) -> bool:
+    """True for localhost and loopback addresses (127.0.0.0/8, ::1)."""
+    host = host.strip("[]").lower()
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def load_shared_tables() -> None:
+    """
+    Load the read-only tables every request uses. PreforkServer calls this
+    before forking so the workers share one copy; the router prompt and
+    schema are built at import time.
+    """
+    mac_actions._get_matcher()
+    get_intent_model()
+    match_intent("open safari")  # compiles the rule patterns
+
+
+class PreforkServer:
+    """
+    N SunnyServer worker processes sharing one listening socket and the
+    tables from load_shared_tables() (copy-on-write after fork), plus an
+    LLM broker process whose scheduler they all share and, if
+    `app_watcher` (an AppWatcher factory) is given, an app watcher process.
+
+    The parent only supervises: a worker (or the broker, or the watcher) that dies is
+    replaced, SIGINT / SIGTERM are passed on and every worker shuts down
+    gracefully. It never starts threads, so forking a replacement later is
+    as safe as the first fork.
+    """
+
+    def __init__(
+        self,
+        processes: int = PROCESSES,
+        host: str = HOST,
+        port: int = PORT,
+        app_watcher: Optional[Callable[[], AppWatcher]] = None,
+        **options: Any,
+    ) -> None:
+        if options.get("token", TOKEN) is None and not is_loopback(host):
+            raise ValueError(f"refusing to serve on {host} without a token (--token)")
+        self.processes = processes
+        self.host = host
+        self.port = port
+        self.options = options  # passed to each worker's SunnyServer
+        self.pids: List[int] = []
+        self.broker_pid: Optional[int] = None
+        self.app_watcher = app_watcher
+        self.watcher_pid: Optional[int] = None
+        self.broker_path: Optional[str] = None
+        self.run_dir: Optional[str] = None  # broker socket (if none configured), metrics snapshots
+        self._sock: Optional[socket.socket] = None
+        self._stopping = False
+
+    def start(self) -> "PreforkServer":
+        load_shared_tables()
+        # Objects loaded so far are never collected: keep the collector from
+        # writing to their headers, which would copy the shared pages.
+        gc.collect()
+        gc.freeze()
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(BACKLOG)
+        sock.setblocking(False)
+        self._sock = sock
+        self.port = sock.getsockname()[1]
+
+        self.run_dir = tempfile.mkdtemp(prefix="sunny-prefork-")
+        self.broker_path = llm_client.LLM_BROKER_PATH or os.path.join(self.run_dir, "llm_broker.sock")
+        if not llm_broker.broker_alive(self.broker_path):
+            self.broker_pid = self._spawn_broker()
+        if self.app_watcher is not None:
+            self.watcher_pid = self._spawn_watcher()
+
+        for _ in range(self.processes):
+            self.pids.append(self._spawn())
+        return self
+
+    def _spawn_broker(self) -> int:
+        pid = os.fork()
+        if pid:
+            deadline = time.monotonic() + 5.0
+            while not llm_broker.broker_alive(self.broker_path) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return pid
+        # ---- broker process ----
+        code = 0
+        try:
+            self._sock.close()
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            asyncio.run(llm_broker.serve(self.broker_path, llm_client.new_scheduler()))
+        except BaseException as e:
+            print(f"[WARN] LLM broker {os.getpid()} failed: {e!r}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _spawn_watcher(self) -> int:
+        pid = os.fork()
+        if pid:
+            return pid
+        # ---- app watcher process ----
+        code = 0
+        try:
+            self._sock.close()
+            stop = threading.Event()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_: stop.set())
+            with self.app_watcher():
+                stop.wait()
+        except BaseException as e:
+            print(f"[WARN] App watcher {os.getpid()} failed: {e!r}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _spawn(self) -> int:
+        pid = os.fork()
+        if pid:
+            return pid
+        # ---- worker process ----
+        code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            # Slots come from the broker: the same total for any number of workers
+            llm_client.LLM_BROKER_PATH = self.broker_path
+            llm_client.set_scheduler(None)
+            # The watcher (or a rebuild) rewrites app_index.json: never parse it in a request
+            app_index.BACKGROUND_RELOAD = True
+            options = dict(self.options, llm_broker=False, metrics_dir=self.run_dir)
+            server = SunnyServer(host=self.host, port=self.port, sock=self._sock, **options)
+            asyncio.run(server.serve_forever())
+        except BaseException as e:
+            print(f"[WARN] Worker {os.getpid()} failed: {e!r}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def reap(self) -> List[int]:
+        """Collect exited workers and replace them (unless stopping). Returns the dead pids."""
+        dead = []
+        for pid in list(self.pids):
+            if not _exited(pid):
+                continue
+            self.pids.remove(pid)
+            dead.append(pid)
+            if self.run_dir is not None:
+                _unlink(os.path.join(self.run_dir, f"worker-{pid}.prom"))
+            if not self._stopping:
+                print(f"[WARN] Worker {pid} exited, starting a new one.")
+                self.pids.append(self._spawn())
+        if self.broker_pid is not None and not self._stopping and _exited(self.broker_pid):
+            print(f"[WARN] LLM broker {self.broker_pid} exited, starting a new one.")
+            self.broker_pid = self._spawn_broker()
+        if self.watcher_pid is not None and not self._stopping and _exited(self.watcher_pid):
+            print(f"[WARN] App watcher {self.watcher_pid} exited, starting a new one.")
+            self.watcher_pid = self._spawn_watcher()
+        return dead
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """SIGTERM every worker, wait for them to drain, SIGKILL stragglers."""
+        self._stopping = True
+        grace = self.options.get("shutdown_grace_s", SHUTDOWN_GRACE_S) if timeout is None else timeout
+        for pid in self.pids:
+            _signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + grace + 2.0
+        while self.pids and time.monotonic() < deadline:
+            if not self.reap():
+                time.sleep(0.05)
+        for pid in self.pids:
+            _signal(pid, signal.SIGKILL)
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.pids = []
+        # After the workers: they hold broker slots until they finish
+        for pid in (self.broker_pid, self.watcher_pid):
+            if pid is not None:
+                _signal(pid, signal.SIGTERM)
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+        self.broker_pid = self.watcher_pid = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        if self.run_dir is not None:
+            shutil.rmtree(self.run_dir, ignore_errors=True)
+            self.run_dir = None
+        gc.unfreeze()
+
+    def serve_forever(self) -> None:
+        """Run until SIGINT / SIGTERM, replacing workers that die."""
+        self.start()
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+        print(f"[OK] {self.processes} worker processes on http://{self.host}:{self.port}")
+        while not stop.is_set():
+            self.reap()
+            stop.wait(0.5)
+        print("[INFO] Shutting down workers...")
+        self.stop()
+
+    def __enter__(self) -> "PreforkServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def _exited(pid: int) -> bool:
+    try:
+        done, _ = os.waitpid(pid, os.WNOHANG)
+    except ChildProcessError:
+        return True
+    return done != 0
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _read_snapshots(directory: str) -> List[str]:
+    texts = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".prom"):
+            try:
+                with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                    texts.append(f.read())
+            except OSError:
+                pass  # its worker just exited
+    return texts
+
+
+def _signal(pid: int, sig: int) -> None:
+    try:
+        os.kill(pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def _request_text(request: Request) -> str:
+    content_type = request.headers.get("content-type", "").partition(";")[0].strip().lower()
+    if content_type != "application/json":
+        raise HTTPError(415, "expected Content-Type: application/json")
+    try:
+        payload = request.json()
+    except ValueError:
+        raise HTTPError(400, "body is not valid JSON")
+    text = payload.get("text") if isinstance(payload, dict) else None
+    if not isinstance(text, str) or not text.strip():
+        raise HTTPError(400, 'expected {"text": "..."}')
+    return text
+
+
+def _request_priority(request: Request) -> str:
+    """Scheduler class of the request (call after _request_text validated the body)."""
+    priority = request.json().get("priority") or DEFAULT_PRIORITY
+    if priority not in PRIORITIES:
+        raise HTTPError(400, f"priority must be one of {sorted(PRIORITIES)}")
+    return priority
+
+
+def _with_priority(
+    priority: str, fn: Callable[..., Any], *args: Any, cancel: Optional[threading.Event] = None
+) -> Any:
+    # Worker threads don't inherit the request's context: set the class (and
+    # the event that abandons a queued LLM call) here.
+    with llm_priority(priority):
+        if cancel is None:
+            return fn(*args)
+        with llm_cancel_on(cancel):
+            return fn(*args)
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    """Next request on the connection, or None when the client closed it."""
+    line = await _read_line(reader, MAX_HEADER_BYTES)
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+
+    headers: Dict[str, str] = {}
+    budget = MAX_HEADER_BYTES - len(line)
+    while True:
+        line = await _read_line(reader, budget)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        budget -= len(line)
+        if len(headers) >= MAX_HEADERS:
+            raise HTTPError(431, "too many headers")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    raw_length = headers.get("content-length", "0") or "0"
+    if not (raw_length.isascii() and raw_length.isdigit()):
+        raise HTTPError(400, "invalid Content-Length")
+    length = int(raw_length)
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    path, _, query = target.partition("?")
+    return Request(method.upper(), path, headers, body, query)
+
+
+async def _read_line(reader: asyncio.StreamReader, budget: int) -> bytes:
+    """One header line; 431 if it doesn't end within `budget` bytes."""
+    try:
+        line = await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        line = e.partial  # EOF: readline() semantics
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, "request header too large")
+    if len(line) > budget:
+        raise HTTPError(431, "request headers too large")
+    return line
+
+
+async def _send_json(writer: asyncio.StreamWriter, status: int, obj: Any, keep_alive: bool = True) -> None:
+    body = json.dumps(obj).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+    )
+    if status == 429:
+        head += "Retry-After: 1\r\n"
+    writer.write((head + "\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+async def _send_text(writer: asyncio.StreamWriter, status: int, text: str, keep_alive: bool = True) -> None:
+    body = text.encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+async def _start_event_stream(writer: asyncio.StreamWriter) -> None:
+    """Headers for a chunked text/event-stream response (keeps the connection reusable)."""
+    writer.write(
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: text/event-stream\r\n"
+        b"Cache-Control: no-cache\r\n"
+        b"Transfer-Encoding: chunked\r\n\r\n"
+    )
+    await writer.drain()
+
+
+async def _send_event(writer: asyncio.StreamWriter, kind: str, data: Dict[str, Any]) -> None:
+    event = f"event: {kind}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+    writer.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+    await writer.drain()
+
+
+async def _end_chunks(writer: asyncio.StreamWriter) -> None:
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve route_message over HTTP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--token", default=TOKEN, help="bearer token clients must send (required off loopback)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="route_message calls run at once")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE, help="requests waiting before 429")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT_S, help="per-request timeout (s)")
+    parser.add_argument("--processes", type=int, default=PROCESSES, help="worker processes (pre-fork)")
+    parser.add_argument("--watch-apps", action="store_true", default=WATCH_APPS,
+                        help="keep the app index in step with installed apps")
+    args = parser.parse_args()
+
+    if args.token is None and not is_loopback(args.host):
+        parser.error(f"--host {args.host} is reachable from other machines: pass --token too")
+
+    options = dict(workers=args.workers, max_queue=args.max_queue, request_timeout_s=args.timeout, token=args.token)
+    if args.processes > 1:
+        watcher = AppWatcher if args.watch_apps else None
+        PreforkServer(args.processes, host=args.host, port=args.port, app_watcher=watcher, **options).serve_forever()
+        return
+    watcher = AppWatcher().start() if args.watch_apps else None
+    try:
+        asyncio.run(SunnyServer(host=args.host, port=args.port, **options).serve_forever())
+    finally:
+        if watcher is not None:
+            watcher.stop()
+
+
+if __name__ == "__main__":
+    main()
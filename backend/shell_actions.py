@@ -1,6 +1,15 @@
 import subprocess
 from typing import Tuple
 
+try:
+    from .metrics import counter
+    from .tracing import span
+except ImportError:  # direct script run fallback
+    from metrics import counter
+    from tracing import span
+
+SHELL_COMMANDS = counter("sunny_shell_commands_total", "Shell commands by outcome", ["result"])
+
 
 def run_shell_command(command: str, timeout: int = 10) -> Tuple[str, str, int]:
     """
@@ -15,19 +24,23 @@ def run_shell_command(command: str, timeout: int = 10) -> Tuple[str, str, int]:
     - Be careful with destructive commands like 'rm -rf'.
     """
     try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-        )
+        with span("subprocess"):
+            result = subprocess.run(
+                command,
+                shell=True,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+            )
         stdout = result.stdout.strip()
         stderr = result.stderr.strip()
+        SHELL_COMMANDS.labels(result="ok" if result.returncode == 0 else "failed").inc()
         return stdout, stderr, result.returncode
     except subprocess.TimeoutExpired:
+        SHELL_COMMANDS.labels(result="timeout").inc()
         return "", f"Command timed out after {timeout} seconds.", -1
     except Exception as e:
+        SHELL_COMMANDS.labels(result="error").inc()
         return "", f"Error running command: {e}", -1
 
 
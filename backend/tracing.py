@@ -0,0 +1,95 @@
+# backend/tracing.py
+"""
+Lightweight per-request latency spans.
+
+route_message() opens a Trace; code below it wraps its stages in span():
+
+    with span("llm"):
+        ...
+
+Spans nest by name ("action" > "subprocess" is recorded as
+"action.subprocess"), repeated spans add up, and the result is a flat
+{stage: ms} dict that goes into the log entry as "stages". annotate()
+attaches other per-request details (e.g. Ollama metrics under "llm").
+
+Outside a trace, span() only does one ContextVar lookup, so helpers like
+mac_actions.open_app can be instrumented unconditionally.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("nunnarivu_trace", default=None)
+
+
+class Trace:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.annotations: Dict[str, Any] = {}
+        self._stack: List[str] = []
+
+    def add(self, name: str, ms: float) -> None:
+        """Add `ms` to stage `name` (nested under the open span, if any)."""
+        if self._stack:
+            name = f"{self._stack[-1]}.{name}"
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def breakdown(self) -> Dict[str, float]:
+        """Stages rounded to 0.01 ms, in the order they first ran."""
+        return {k: round(v, 2) for k, v in self.stages.items()}
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """Start a new trace for the duration of the block."""
+    t = Trace()
+    token = _current.set(t)
+    try:
+        yield t
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the block as stage `name` of the current trace (no-op without one)."""
+    t = _current.get()
+    if t is None:
+        yield
+        return
+
+    full = f"{t._stack[-1]}.{name}" if t._stack else name
+    t._stack.append(full)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        t._stack.pop()
+        ms = (time.perf_counter() - started) * 1000.0
+        t.stages[full] = t.stages.get(full, 0.0) + ms
+
+
+def add_stage(name: str, ms: float) -> None:
+    """Record time measured by hand (e.g. per-token loops) on the current trace."""
+    t = _current.get()
+    if t is not None:
+        t.add(name, ms)
+
+
+def annotate(key: str, value: Any) -> None:
+    """Attach `value` under `key` to the current trace (no-op without one)."""
+    t = _current.get()
+    if t is not None:
+        t.annotations[key] = value
@@ -4,9 +4,15 @@ import time
 import sounddevice as sd
 from vosk import Model, KaldiRecognizer
 
+from .metrics import counter, histogram
+
 
 WAKE_PHRASE = "hey sunny"
 
+COMMANDS = counter("sunny_voice_commands_total", "Final phrases handled (sent) or dropped as echo", ["result"])
+WAKES = counter("sunny_voice_wake_total", "Wake phrase detections")
+COMMAND_SECONDS = histogram("sunny_voice_command_seconds", "on_command() time per voice command")
+
 
 def start_voice_listener(on_command):
     """
@@ -64,12 +70,16 @@ def start_voice_listener(on_command):
         # global echo suppression
         if (now - last_time) < 1.5:
             print(f"🔁 Ignoring command too soon after previous one (likely echo): {command_text}")
+            COMMANDS.labels(result="echo").inc()
             return
 
         state["last_command_time"] = now
 
         print(f"🎤 Command -> {command_text}")
+        COMMANDS.labels(result="sent").inc()
+        started = time.perf_counter()
         on_command(command_text)
+        COMMAND_SECONDS.observe(time.perf_counter() - started)
 
         # If this is a volume command, treat as one-shot:
         # go back to idle so Sunny's own TTS doesn't trigger more volume commands.
@@ -133,6 +143,7 @@ def start_voice_listener(on_command):
             if state["mode"] == "conversation":
                 if text.startswith(WAKE_PHRASE):
                     command = text[len(WAKE_PHRASE):].strip() or None
+                    WAKES.inc()
                     if command:
                         print(f"🔥 Wake phrase inside conversation. Command: {command}")
                         maybe_send_command(command)
@@ -146,6 +157,7 @@ def start_voice_listener(on_command):
             # IDLE MODE: look for wake phrase
             if state["mode"] == "idle":
                 if text.startswith(WAKE_PHRASE):
+                    WAKES.inc()
                     command = text[len(WAKE_PHRASE):].strip()
                     if command == "":
                         print("👉 Wake phrase detected. Waiting for first command...")
@@ -0,0 +1,146 @@
+# benchmarks/bench_discover.py
+"""
+App discovery: the old rglob walk vs. backend/discover_apps.scan_apps.
+
+Builds a synthetic tree of --apps .app bundles spread over four roots
+(some in vendor subfolders), each bundle holding --bundle-dirs
+directories of Contents/ with a nested helper app and a framework, like
+real Chrome/Electron bundles. Then times:
+
+  rglob            Path.rglob("*.app") over every root (the previous scanner)
+  scandir.serial   scan_apps one root at a time
+  scandir          scan_apps, roots in parallel
+  rescan.same      incremental rescan, nothing changed
+  rescan.add       incremental rescan after adding one app
+
+The parallel scan overlaps the roots' stat/scandir calls, so it only beats
+the serial one with several cores and a cold or slow filesystem.
+
+Usage:
+    python -m benchmarks.bench_discover --apps 2000
+    python -m benchmarks.bench_discover --apps 500 --bundle-dirs 100 --rounds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from backend.discover_apps import scan_apps
+
+ROOT_NAMES = ["Applications", "System/Applications", "System/Library/CoreServices", "home/Applications"]
+
+
+def make_tree(base: str, apps: int, bundle_dirs: int = 20, seed: int = 0) -> List[str]:
+    """Create the synthetic roots under `base`; returns them in search order."""
+    rng = random.Random(seed)
+    roots = [os.path.join(base, name) for name in ROOT_NAMES]
+    for root in roots:
+        os.makedirs(root, exist_ok=True)
+    for i in range(apps):
+        root = roots[0] if rng.random() < 0.6 else rng.choice(roots[1:])
+        if rng.random() < 0.2:
+            root = os.path.join(root, f"Vendor {i % 7}")
+        make_bundle(os.path.join(root, f"App {i}.app"), bundle_dirs)
+    return roots
+
+
+def make_bundle(path: str, bundle_dirs: int = 20) -> None:
+    contents = os.path.join(path, "Contents")
+    helper = os.path.join(contents, "Frameworks", f"{Path(path).stem} Helper.app", "Contents", "MacOS")
+    os.makedirs(helper, exist_ok=True)
+    os.makedirs(os.path.join(contents, "Frameworks", "Core.framework", "Versions", "A"), exist_ok=True)
+    os.makedirs(os.path.join(contents, "MacOS"), exist_ok=True)
+    for j in range(max(0, bundle_dirs - 6)):
+        os.makedirs(os.path.join(contents, "Resources", f"r{j}.lproj"), exist_ok=True)
+
+
+def rglob_scan(roots: List[str]) -> Dict[str, str]:
+    """The scanner discover_apps used before: every .app anywhere under the roots."""
+    seen: Dict[str, str] = {}
+    for root in roots:
+        root_path = Path(root)
+        if not root_path.exists():
+            continue
+        for entry in root_path.rglob("*.app"):
+            if entry.is_dir():
+                seen.setdefault(entry.stem.strip().lower(), str(entry))
+    return seen
+
+
+def time_ms(fn: Callable[[], Any], rounds: int) -> Tuple[float, Any]:
+    samples = []
+    result = None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(samples), result
+
+
+def run(base: str, apps: int, bundle_dirs: int, rounds: int) -> List[Tuple[str, float, int, str]]:
+    """(case, median ms, apps found, note) for each case."""
+    roots = make_tree(base, apps, bundle_dirs)
+    rows = []
+
+    ms, found = time_ms(lambda: rglob_scan(roots), rounds)
+    rows.append(("rglob", ms, len(found), "includes nested helpers"))
+
+    def serial() -> Dict[str, str]:
+        merged: Dict[str, str] = {}
+        for root in roots:
+            for name, path in scan_apps([root])[0].items():
+                merged.setdefault(name, path)
+        return merged
+
+    ms, found = time_ms(serial, rounds)
+    rows.append(("scandir.serial", ms, len(found), ""))
+    ms, (found, state) = time_ms(lambda: scan_apps(roots), rounds)
+    rows.append(("scandir", ms, len(found), f"{len(state)} dirs"))
+
+    stats: Dict[str, int] = {}
+    ms, (found, _) = time_ms(lambda: scan_apps(roots, state, stats), rounds)
+    rows.append(("rescan.same", ms, len(found), f"{stats.get('listed', 0) // rounds} dirs listed"))
+
+    stats.clear()
+    samples = []
+    for i in range(rounds):
+        make_bundle(os.path.join(roots[0], f"New {i}.app"), bundle_dirs)
+        t0 = time.perf_counter()
+        found, state = scan_apps(roots, state, stats)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    rows.append(("rescan.add", statistics.median(samples), len(found),
+                 f"{stats.get('listed', 0) // rounds} dirs listed"))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--apps", type=int, default=2000, help="synthetic bundles")
+    parser.add_argument("--bundle-dirs", type=int, default=20, help="directories inside each bundle")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--dir", default=None, help="where to build the tree (default: a temp dir)")
+    args = parser.parse_args()
+
+    base = args.dir or tempfile.mkdtemp(prefix="sunny-apps-")
+    try:
+        rows = run(base, args.apps, args.bundle_dirs, args.rounds)
+    finally:
+        if args.dir is None:
+            shutil.rmtree(base, ignore_errors=True)
+
+    print(f"{args.apps} apps x {args.bundle_dirs} dirs per bundle   {os.cpu_count()} CPUs")
+    print(f"{'case':<16} {'median ms':>10} {'apps':>7}  note")
+    for name, ms, found, note in rows:
+        print(f"{name:<16} {ms:>10.2f} {found:>7}  {note}")
+
+
+if __name__ == "__main__":
+    main()
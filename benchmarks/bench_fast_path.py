@@ -0,0 +1,107 @@
+# benchmarks/bench_fast_path.py
+"""
+Measure how much traffic the local intent rules resolve without the LLM.
+
+Replays the utterances from the interaction log and the fine-tune data and
+compares:
+  1. the old fast path  -> only messages starting with "open "
+  2. intents.match_intent -> every router action, spoken numbers, wake phrase
+
+For log entries the logged action is used as ground truth, so the report also
+shows how often the local rules agree with what the LLM picked.
+
+Usage:
+    python -m benchmarks.bench_fast_path --repeat 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+from backend.intents import match_intent
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_FILE = os.path.join(ROOT, "logs", "nunnarivu_interactions.jsonl")
+DATA_FILES = [
+    os.path.join(ROOT, "nunnarivu_finetune", "data", "train.jsonl"),
+    os.path.join(ROOT, "nunnarivu_finetune", "data", "from_logs.jsonl"),
+]
+
+
+def load_utterances() -> List[Tuple[str, Optional[str]]]:
+    """(text, logged action or None) from the log and the fine-tune data."""
+    out: List[Tuple[str, Optional[str]]] = []
+    if os.path.exists(LOG_FILE):
+        with open(LOG_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                action = (entry.get("assistant_action") or {}).get("action")
+                out.append((entry["user_text"], action))
+    for path in DATA_FILES:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    out.append((json.loads(line)["instruction"], None))
+    return out
+
+
+def _old_fast_path(text: str) -> bool:
+    return text.strip().lower().startswith("open ")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=2000, help="timing loops per utterance set")
+    parser.add_argument("--show-misses", action="store_true", help="print utterances left to the LLM")
+    args = parser.parse_args()
+
+    utterances = load_utterances()
+    if not utterances:
+        print("[WARN] No utterances found.")
+        return
+    texts = [t for t, _ in utterances]
+
+    old_hits = sum(_old_fast_path(t) for t in texts)
+    results = [match_intent(t) for t in texts]
+    new_hits = sum(r is not None for r in results)
+
+    labelled = [(r, a) for r, (_, a) in zip(results, utterances) if r is not None and a]
+    agree = sum(r["action"] == a for r, a in labelled)
+
+    n = len(texts)
+    print(f"utterances                   {n}")
+    print(f"old 'open ' fast path        {old_hits:4d}  ({100.0 * old_hits / n:5.1f}%)")
+    print(f"local intent rules           {new_hits:4d}  ({100.0 * new_hits / n:5.1f}%)")
+    if labelled:
+        print(f"agrees with logged action    {agree:4d} / {len(labelled)}")
+
+    samples = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        for t in texts:
+            match_intent(t)
+        samples.append((time.perf_counter() - t0) * 1e6 / n)
+    samples.sort()
+    p95 = samples[int(0.95 * (len(samples) - 1))]
+    print(
+        f"match_intent latency         mean {statistics.mean(samples):6.2f} us   "
+        f"p50 {statistics.median(samples):6.2f} us   p95 {p95:6.2f} us"
+    )
+
+    if args.show_misses:
+        for t, r in zip(texts, results):
+            if r is None:
+                print(f"  -> LLM: {t}")
+
+
+if __name__ == "__main__":
+    main()
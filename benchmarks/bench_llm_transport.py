@@ -0,0 +1,127 @@
+# benchmarks/bench_llm_transport.py
+"""
+Measure the per-request connection overhead removed by the pooled transport.
+
+Runs against a local Ollama stand-in (benchmarks/ollama_stub.py) and compares:
+  1. bare requests.post       -> new TCP connection per call (old behaviour)
+  2. llm_client.ask_llm       -> shared keep-alive session
+  3. llm_client.ask_llm_async -> asyncio pool, N requests in flight at once,
+                                 against a stub with model-like latency
+
+Usage:
+    python -m benchmarks.bench_llm_transport --requests 200 --connect-delay-ms 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Callable, List
+
+import requests
+
+from backend import llm_client
+from benchmarks.ollama_stub import OllamaStub
+
+MESSAGES = [
+    {"role": "system", "content": "You are Sunny."},
+    {"role": "user", "content": "hey"},
+]
+
+
+def _time_calls(fn: Callable[[], object], n: int) -> List[float]:
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def _report(label: str, samples: List[float], connections: int) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(0.95 * (len(samples) - 1))]
+    print(
+        f"{label:<28} mean {statistics.mean(samples):7.3f} ms   "
+        f"p50 {statistics.median(samples):7.3f} ms   p95 {p95:7.3f} ms   "
+        f"connections {connections}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=50.0,
+        help="stub generation latency for the concurrency run",
+    )
+    parser.add_argument(
+        "--connect-delay-ms",
+        type=float,
+        default=0.0,
+        help="simulated handshake RTT per new connection (remote Ollama box)",
+    )
+    args = parser.parse_args()
+    n = args.requests
+
+    with OllamaStub(connect_delay_ms=args.connect_delay_ms) as stub:
+        llm_client.OLLAMA_URL = stub.generate_url
+        llm_client.close_session()
+
+        payload = {"model": llm_client.MODEL_NAME, "prompt": "hey", "stream": False}
+
+        def bare_post() -> None:
+            r = requests.post(stub.generate_url, json=payload, timeout=10)
+            r.raise_for_status()
+            r.json()
+
+        before = stub.connections
+        bare = _time_calls(bare_post, n)
+        _report("bare requests.post", bare, stub.connections - before)
+
+        before = stub.connections
+        pooled = _time_calls(lambda: llm_client.ask_llm(MESSAGES), n)
+        _report("pooled ask_llm", pooled, stub.connections - before)
+
+        saved = statistics.mean(bare) - statistics.mean(pooled)
+        print(f"{'-> overhead removed':<28} {saved:7.3f} ms per request")
+
+    # Concurrency: a model-like latency makes in-flight overlap visible.
+    with OllamaStub(latency_ms=args.latency_ms) as stub:
+        llm_client.OLLAMA_URL = stub.generate_url
+        llm_client.close_session()
+
+        seq_n = max(1, n // 10)
+        t0 = time.perf_counter()
+        for _ in range(seq_n):
+            llm_client.ask_llm(MESSAGES)
+        seq_rate = seq_n / (time.perf_counter() - t0)
+        print(f"{'sequential ask_llm':<28} {seq_rate:7.1f} req/s")
+
+        async def run_async() -> float:
+            sem = asyncio.Semaphore(args.concurrency)
+
+            async def one(i: int) -> None:
+                # Distinct prompts so identical requests aren't coalesced
+                async with sem:
+                    await llm_client.ask_llm_async([{"role": "user", "content": f"hey {i}"}])
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(n)))
+            return time.perf_counter() - t0
+
+        before = stub.connections
+        elapsed = asyncio.run(run_async())
+        print(
+            f"{'ask_llm_async x' + str(args.concurrency):<28} "
+            f"{n / elapsed:7.1f} req/s   connections {stub.connections - before}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# benchmarks/bench_micro.py
+"""
+Microbenchmarks for the router and app-matching hot paths.
+
+Cases:
+  - router._parse_action_json on long and messy LLM outputs
+  - privacy.mask_sensitive_text / is_very_sensitive on long inputs
+  - llm_client._messages_to_prompt with long chat histories
+  - mac_actions._find_app_matches / app_aliases.resolve_app_candidates
+    against a synthetic index of --apps apps
+
+Each case is calibrated to run for about --min-time per round and timed
+over --rounds rounds. Results can be saved as a baseline and later runs
+compared against it on the fastest round (the least noisy figure): any
+case slower than the baseline by more than --threshold is a regression
+(exit code 2).
+Baselines are machine-specific, so they live under ~/nunnarivu by default.
+
+Usage:
+    python -m benchmarks.bench_micro --save
+    python -m benchmarks.bench_micro --threshold 0.2
+    python -m benchmarks.bench_micro -k app --apps 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from backend import app_aliases, llm_client, mac_actions, router
+from backend.privacy import is_very_sensitive, mask_sensitive_text
+
+BASELINE_PATH = os.path.expanduser("~/nunnarivu/benchmarks/micro_baseline.json")
+
+Case = Tuple[str, Callable[[], Any]]
+
+
+# ---------- synthetic inputs ----------
+
+_WORDS = ["google", "microsoft", "visual", "studio", "code", "chrome", "helper", "word",
+          "excel", "music", "photo", "editor", "pro", "lite", "studio", "terminal", "notes"]
+
+
+def synthetic_app_index(n: int, seed: int = 0) -> Dict[str, str]:
+    """n fake apps (name -> path), a few percent of them nested helpers."""
+    rng = random.Random(seed)
+    index: Dict[str, str] = {}
+    while len(index) < n:
+        name = " ".join(rng.sample(_WORDS, rng.randint(1, 3))) + f" {len(index)}"
+        if rng.random() < 0.05:
+            path = f"/Applications/{name.title()}.app/Contents/Frameworks/{name.title()} Helper.app"
+        else:
+            path = f"/Applications/{name.title()}.app"
+        index[name] = path
+    return index
+
+
+def messy_llm_output(size: int) -> str:
+    """Chatty preamble, a nested action object, trailing text — about `size` chars."""
+    action = json.dumps({
+        "action": "run_shell",
+        "args": {"command": "ls -la {weird} \"quoted\"", "env": {"A": [1, 2, {"b": "}"}]}},
+        "assistant_reply": "Listing files. " * 20,
+    })
+    filler = "Sure! Here is what I think you want: " * (size // 74 + 1)
+    return filler[: size // 2] + action + " Hope that helps {not json}. " * (size // 56 + 1)
+
+
+def long_text(size: int) -> str:
+    chunk = "my otp is 123456 and card 4111111111111111, call me at 5550100 about the meeting "
+    return (chunk * (size // len(chunk) + 1))[:size]
+
+
+def long_history(turns: int) -> List[Dict[str, str]]:
+    messages = [{"role": "system", "content": router.ROUTER_SYSTEM_PROMPT}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i}: " + "why is the build slow " * 10})
+        messages.append({"role": "assistant", "content": f"answer {i}: " + "check the cache " * 20})
+    return messages
+
+
+@contextmanager
+def synthetic_apps(n: int) -> Iterator[None]:
+    """Point mac_actions and app_aliases at a synthetic index of n apps."""
+    index = synthetic_app_index(n)
+    saved = (mac_actions._APP_INDEX_CACHE, app_aliases.APP_INDEX_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "app_index.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        mac_actions._APP_INDEX_CACHE = index
+        app_aliases.APP_INDEX_PATH = path
+        try:
+            yield
+        finally:
+            mac_actions._APP_INDEX_CACHE, app_aliases.APP_INDEX_PATH = saved
+
+
+def build_cases(apps: int = 10000) -> List[Case]:
+    clean = json.dumps({"action": "open_app", "args": {"name": "Safari"}, "assistant_reply": "Opening."})
+    messy_small = messy_llm_output(2_000)
+    messy_large = messy_llm_output(50_000)
+    no_json = "I am not sure what you mean, could you rephrase? " * 500
+    text_small = long_text(1_000)
+    text_large = long_text(100_000)
+    history_short = long_history(5)
+    history_long = long_history(200)
+
+    return [
+        ("parse_action_json.clean", lambda: router._parse_action_json(clean)),
+        ("parse_action_json.messy_2k", lambda: router._parse_action_json(messy_small)),
+        ("parse_action_json.messy_50k", lambda: router._parse_action_json(messy_large)),
+        ("parse_action_json.no_json_25k", lambda: router._parse_action_json(no_json)),
+        ("mask_sensitive_text.1k", lambda: mask_sensitive_text(text_small)),
+        ("mask_sensitive_text.100k", lambda: mask_sensitive_text(text_large)),
+        ("is_very_sensitive.1k", lambda: is_very_sensitive(text_small)),
+        ("is_very_sensitive.100k", lambda: is_very_sensitive(text_large)),
+        ("messages_to_prompt.5_turns", lambda: llm_client._messages_to_prompt(history_short)),
+        ("messages_to_prompt.200_turns", lambda: llm_client._messages_to_prompt(history_long)),
+        (f"find_app_matches.exact_{apps}", lambda: mac_actions._find_app_matches("google chrome 7")),
+        (f"find_app_matches.substring_{apps}", lambda: mac_actions._find_app_matches("studio")),
+        (f"find_app_matches.miss_{apps}", lambda: mac_actions._find_app_matches("zzz")),
+        (f"find_app_matches.typo_{apps}", lambda: mac_actions._find_app_matches("gogle chrme")),
+        (f"resolve_app_candidates.word_{apps}", lambda: app_aliases.resolve_app_candidates("chrome")),
+        (f"resolve_app_candidates.miss_{apps}", lambda: app_aliases.resolve_app_candidates("zzz")),
+    ]
+
+
+# ---------- runner ----------
+
+def time_case(fn: Callable[[], Any], rounds: int = 5, min_time: float = 0.05) -> Dict[str, float]:
+    """Per-call µs over `rounds` rounds, each long enough to be timed reliably."""
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - t0) * 1e6 / loops)
+    return {
+        "median_us": statistics.median(samples),
+        "min_us": min(samples),
+        "stdev_us": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "loops": loops,
+    }
+
+
+def run_cases(cases: List[Case], rounds: int = 5, min_time: float = 0.05) -> Dict[str, Dict[str, float]]:
+    return {name: time_case(fn, rounds, min_time) for name, fn in cases}
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+) -> Dict[str, Optional[float]]:
+    """Relative change of each case's fastest round vs the baseline (None if new)."""
+    out: Dict[str, Optional[float]] = {}
+    for name, r in results.items():
+        base = baseline.get(name)
+        out[name] = (r["min_us"] - base["min_us"]) / base["min_us"] if base else None
+    return out
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]]) -> None:
+    """Merge `results` into the baseline file (cases not run keep their old value)."""
+    merged = load_baseline(path)
+    merged.update(results)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"python": sys.version.split()[0], "saved_at": time.time(), "results": merged}, f, indent=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-k", dest="select", help="only cases whose name contains this")
+    parser.add_argument("--apps", type=int, default=10000, help="size of the synthetic app index")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per round")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown counted as a regression")
+    args = parser.parse_args()
+
+    with synthetic_apps(args.apps):
+        cases = [c for c in build_cases(args.apps) if not args.select or args.select in c[0]]
+        results = run_cases(cases, args.rounds, args.min_time)
+
+    baseline = load_baseline(args.baseline)
+    changes = compare(results, baseline)
+    regressions = [n for n, c in changes.items() if c is not None and c > args.threshold]
+
+    print(f"{'case':<40} {'median':>12} {'min':>12} {'vs baseline':>12}")
+    for name, r in results.items():
+        change = changes[name]
+        mark = "  [WARN]" if name in regressions else ""
+        delta = f"{100 * change:+.1f}%" if change is not None else "-"
+        print(f"{name:<40} {r['median_us']:>9.2f} us {r['min_us']:>9.2f} us {delta:>12}{mark}")
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"[OK] Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"[WARN] {len(regressions)} case(s) slower than baseline by more than {100 * args.threshold:.0f}%")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
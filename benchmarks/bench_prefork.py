@@ -0,0 +1,184 @@
+# benchmarks/bench_prefork.py
+"""
+Throughput of backend/server.py's pre-fork mode vs. the number of workers.
+
+For each --processes count this starts a PreforkServer. The router is
+pointed at the Ollama stub, the log goes to a scratch store, and open_app
+does the real lookup against a synthetic index of --apps apps (no
+subprocess). --client-procs load processes then hold --clients keep-alive
+connections in total and send the logged utterances to POST /route for
+--seconds. Prints req/s and latency per count, plus the speedup over the
+first count.
+
+The stub and the load generators run in their own processes so they don't
+share a GIL with each other. Throughput can only scale up to the number of
+CPU cores, which the server workers, the clients and the stub share.
+
+Usage:
+    python -m benchmarks.bench_prefork --processes 1,2,4 --clients 64 --seconds 10
+    python -m benchmarks.bench_prefork --processes 1,4 --latency-ms 0 --apps 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import statistics
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+from backend import mac_actions, router
+from backend.async_http import AsyncHTTPPool
+from backend.server import PreforkServer
+from benchmarks.bench_micro import synthetic_apps
+from benchmarks.bench_replay import load_texts, replay_environment
+from benchmarks.ollama_stub import OllamaStub, make_responder
+
+
+def _fork(fn: Any, *args: Any) -> int:
+    """Run fn(*args) in a child process; the child never returns."""
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            fn(*args)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+@contextmanager
+def stub_process(stub: OllamaStub) -> Iterator[OllamaStub]:
+    """Serve the (already bound) stub from a child process."""
+
+    def serve() -> None:
+        stub.start()
+        signal.sigwait({signal.SIGTERM})
+
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+    try:
+        pid = _fork(serve)
+    finally:
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+    try:
+        yield stub
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+        stub.stop()
+
+
+def _lookup_only(args: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """open_app without the subprocess: the index lookup is the work."""
+    name = str(args.get("name", ""))
+    matches = mac_actions._filter_primary_apps(mac_actions._find_app_matches(name))
+    return {"name": name}, f"{len(matches)} match(es)"
+
+
+async def _client_load(url: str, texts: List[str], connections: int, seconds: float) -> Dict[str, Any]:
+    pool = AsyncHTTPPool(max_per_host=connections, timeout=30.0)
+    source = itertools.cycle(texts)
+    deadline = time.perf_counter() + seconds
+    latencies: List[float] = []
+    errors = 0
+
+    async def client() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                await pool.request("POST", url, json_body={"text": next(source)})
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+            except Exception:
+                errors += 1
+
+    await asyncio.gather(*(client() for _ in range(connections)))
+    await pool.aclose()
+    return {"latencies": latencies, "errors": errors}
+
+
+def run_clients(url: str, texts: List[str], procs: int, connections: int, seconds: float) -> Dict[str, Any]:
+    """Load from `procs` processes; merged latencies (ms), errors and wall time."""
+    per_proc = max(1, connections // procs)
+    readers = []
+    pids = []
+
+    def child(write_fd: int, offset: int) -> None:
+        shifted = texts[offset:] + texts[:offset]
+        result = asyncio.run(_client_load(url, shifted, per_proc, seconds))
+        with os.fdopen(write_fd, "w") as out:
+            json.dump(result, out)
+
+    started = time.perf_counter()
+    for i in range(procs):
+        r, w = os.pipe()
+        pids.append(_fork(child, w, i * len(texts) // procs))
+        os.close(w)
+        readers.append(os.fdopen(r))
+
+    latencies: List[float] = []
+    errors = 0
+    for reader, pid in zip(readers, pids):
+        data = reader.read()
+        reader.close()
+        os.waitpid(pid, 0)
+        if data:
+            result = json.loads(data)
+            latencies.extend(result["latencies"])
+            errors += result["errors"]
+    wall_s = time.perf_counter() - started
+    return {"latencies": sorted(latencies), "errors": errors, "wall_s": wall_s}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processes", default="1,2,4", help="comma-separated worker process counts")
+    parser.add_argument("--clients", type=int, default=64, help="keep-alive connections in total")
+    parser.add_argument("--client-procs", type=int, default=2, help="load generator processes")
+    parser.add_argument("--seconds", type=float, default=10.0, help="load duration per count")
+    parser.add_argument("--workers", type=int, default=8, help="threads per worker process")
+    parser.add_argument("--apps", type=int, default=5000, help="synthetic app index size")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stub delay before the first token")
+    parser.add_argument("--reply", choices=("fixed", "schema"), default="schema")
+    args = parser.parse_args()
+
+    texts = load_texts()
+    if not texts:
+        print("[WARN] No utterances found.")
+        return
+    counts = [int(n) for n in args.processes.split(",") if n.strip()]
+
+    stub = OllamaStub(latency_ms=args.latency_ms, responder=make_responder(args.reply))
+    print(f"{len(texts)} utterances   {args.apps} apps   {args.clients} connections from "
+          f"{args.client_procs} processes   {args.seconds:.0f} s per run   {os.cpu_count()} CPUs")
+    print(f"{'processes':>9}  {'req/s':>9}  {'speedup':>7}  {'p50 ms':>8}  {'p99 ms':>8}  {'errors':>6}")
+
+    base_rps = None
+    with stub_process(stub), synthetic_apps(args.apps), replay_environment(stub):
+        router.ACTIONS["open_app"]["run"] = _lookup_only
+        for n in counts:
+            with PreforkServer(n, port=0, workers=args.workers, max_queue=4 * args.clients) as server:
+                url = f"http://{server.host}:{server.port}/route"
+                result = run_clients(url, texts, args.client_procs, args.clients, args.seconds)
+
+            ok = result["latencies"]
+            rps = len(ok) / result["wall_s"]
+            base_rps = base_rps or rps
+            p = lambda q: ok[int(q * (len(ok) - 1))] if ok else float("nan")
+            print(f"{n:>9}  {rps:>9.1f}  {rps / base_rps:>6.2f}x  {p(0.5):>8.2f}  {p(0.99):>8.2f}  "
+                  f"{result['errors']:>6}")
+            if ok and n == counts[-1]:
+                print(f"[INFO] mean latency at {n} processes: {statistics.mean(ok):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# benchmarks/bench_replay.py
+"""
+Replay logged utterances through route_message against the Ollama stub.
+
+Every `user_text` from the interaction log(s) and the fine-tune data goes
+through the real router (intent rules, intent model, streaming LLM client,
+action-JSON parsing, logging), with the LLM served by
+benchmarks/ollama_stub.py. Action handlers are replaced by no-ops that take
+--action-ms, so nothing is opened or run on the machine and the benchmark
+works on Linux without a Mac or a model.
+
+Reports throughput and the latency distribution overall and split into
+fast path (no LLM call) and LLM path.
+
+Usage:
+    python -m benchmarks.bench_replay
+    python -m benchmarks.bench_replay --latency-ms 200 --tokens-per-s 40 --reply schema
+    python -m benchmarks.bench_replay --log ~/nunnarivu/logs/nunnarivu_interactions.sqlite3 --concurrency 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from backend import llm_client, router
+from backend.interaction_store import open_store
+from benchmarks.bench_fast_path import load_utterances
+from benchmarks.ollama_stub import OllamaStub, make_responder
+
+Sample = Tuple[str, float]  # (path, ms)
+
+
+def load_texts(extra_logs: Sequence[str] = ()) -> List[str]:
+    """Utterances from the repo log and fine-tune data, plus any given stores."""
+    texts = [t for t, _ in load_utterances()]
+    for path in extra_logs:
+        store = open_store(os.path.expanduser(path))
+        try:
+            texts.extend(e["user_text"] for e in store.iter_entries() if e.get("user_text"))
+        finally:
+            store.close()
+    return texts
+
+
+def _noop_action(action_ms: float):
+    def run(args: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        if action_ms:
+            time.sleep(action_ms / 1000.0)
+        return args, "ok"
+
+    return run
+
+
+@contextmanager
+def replay_environment(stub: OllamaStub, action_ms: float = 0.0, cache: bool = False) -> Iterator[threading.local]:
+    """
+    Point the router at the stub, stub out action side effects and send the
+    log to a scratch store. Yields a thread-local whose `llm` flag says
+    whether the last route_message on this thread called the LLM.
+    """
+    saved_llm = (llm_client.OLLAMA_URL, llm_client.CACHE_ENABLED, llm_client._cache)
+    saved_router = (router.LOG_PATH, router.stream_llm)
+    saved_runs = {name: spec["run"] for name, spec in router.ACTIONS.items() if "run" in spec}
+    local = threading.local()
+
+    def stream_llm(*args: Any, **kwargs: Any) -> Iterator[str]:
+        local.llm = True
+        return saved_router[1](*args, **kwargs)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        llm_client.close_session()
+        llm_client.OLLAMA_URL = stub.generate_url
+        llm_client.CACHE_ENABLED = cache
+        llm_client._cache = None
+        router.LOG_PATH = os.path.join(tmp, "replay.sqlite3")
+        router.stream_llm = stream_llm
+        for name in saved_runs:
+            router.ACTIONS[name]["run"] = _noop_action(action_ms)
+        try:
+            yield local
+        finally:
+            router.get_log_writer().flush()
+            llm_client.OLLAMA_URL, llm_client.CACHE_ENABLED, llm_client._cache = saved_llm
+            router.LOG_PATH, router.stream_llm = saved_router
+            for name, run in saved_runs.items():
+                router.ACTIONS[name]["run"] = run
+            llm_client.close_session()
+
+
+def replay(texts: Sequence[str], local: threading.local, concurrency: int = 1) -> Tuple[List[Sample], float]:
+    """Route every text; returns ((path, ms) per message, wall seconds)."""
+
+    def one(text: str) -> Sample:
+        local.llm = False
+        t0 = time.perf_counter()
+        router.route_message(text)
+        ms = (time.perf_counter() - t0) * 1000.0
+        return ("llm" if local.llm else "fast"), ms
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        samples = [one(t) for t in texts]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(one, texts))
+    return samples, time.perf_counter() - started
+
+
+def _percentile(sorted_ms: List[float], q: float) -> float:
+    return sorted_ms[int(q * (len(sorted_ms) - 1))]
+
+
+def summarize(samples: Sequence[Sample], wall_s: float) -> Dict[str, Dict[str, Optional[float]]]:
+    """{"all" / "fast" / "llm": {count, share, mean_ms, p50_ms, p90_ms, p99_ms}} plus throughput."""
+    out: Dict[str, Dict[str, Optional[float]]] = {}
+    for path in ("all", "fast", "llm"):
+        ms = sorted(m for p, m in samples if path == "all" or p == path)
+        row: Dict[str, Optional[float]] = {
+            "count": len(ms),
+            "share": len(ms) / len(samples) if samples else 0.0,
+        }
+        for key, q in (("p50_ms", 0.5), ("p90_ms", 0.9), ("p99_ms", 0.99)):
+            row[key] = _percentile(ms, q) if ms else None
+        row["mean_ms"] = statistics.mean(ms) if ms else None
+        out[path] = row
+    out["all"]["throughput_rps"] = len(samples) / wall_s if wall_s > 0 else None
+    return out
+
+
+def _fmt(v: Optional[float]) -> str:
+    return f"{v:8.2f}" if v is not None else "       -"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--log", action="append", default=[], help="extra interaction store/JSONL to replay")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the utterance set this many times")
+    parser.add_argument("--concurrency", type=int, default=1, help="route_message calls in flight")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub delay before the first token")
+    parser.add_argument("--tokens-per-s", type=float, default=50.0, help="stub decode speed (0 = instant)")
+    parser.add_argument("--reply", choices=("fixed", "schema"), default="schema",
+                        help="stub replies: fixed action or an instance of the router's schema")
+    parser.add_argument("--canned", help="file with one stub reply per line, answered in turn")
+    parser.add_argument("--action-ms", type=float, default=0.0, help="simulated cost of each action")
+    parser.add_argument("--cache", action="store_true", help="keep the LLM response cache on")
+    args = parser.parse_args()
+
+    texts = load_texts(args.log) * args.repeat
+    if not texts:
+        print("[WARN] No utterances found.")
+        return
+
+    stub = OllamaStub(
+        latency_ms=args.latency_ms,
+        tokens_per_s=args.tokens_per_s,
+        responder=make_responder(args.reply, args.canned),
+    )
+    with stub, replay_environment(stub, args.action_ms, args.cache) as local:
+        samples, wall_s = replay(texts, local, args.concurrency)
+
+    stats = summarize(samples, wall_s)
+    print(f"messages {len(samples)}   wall {wall_s:.2f} s   "
+          f"throughput {stats['all']['throughput_rps']:.1f} msg/s   stub requests {stub.requests}")
+    print(f"{'path':<6} {'count':>6} {'share':>6} {'mean ms':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for path in ("all", "fast", "llm"):
+        s = stats[path]
+        print(
+            f"{path:<6} {s['count']:>6} {100 * s['share']:>5.1f}% {_fmt(s['mean_ms'])} "
+            f"{_fmt(s['p50_ms'])} {_fmt(s['p90_ms'])} {_fmt(s['p99_ms'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/bench_server.py
+"""
+Load test for backend/server.py.
+
+Starts the Ollama stub and a SunnyServer in this process (actions are
+no-ops, as in bench_replay), then has --clients concurrent keep-alive
+clients send the logged utterances to POST /route until --requests have
+been sent. Reports throughput, latency percentiles, and how many requests
+were turned away with 429 / timed out with 504.
+
+Usage:
+    python -m benchmarks.bench_server --clients 200 --requests 5000
+    python -m benchmarks.bench_server --clients 500 --workers 8 --max-queue 32 --latency-ms 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+from typing import Dict, List
+
+import requests
+
+from backend.async_http import AsyncHTTPPool
+from backend.server import SunnyServer
+from benchmarks.bench_replay import load_texts, replay_environment
+from benchmarks.ollama_stub import OllamaStub, make_responder
+
+
+async def run_load(server: SunnyServer, texts: List[str], clients: int, total: int) -> Dict[str, object]:
+    url = f"http://{server.host}:{server.port}/route"
+    pool = AsyncHTTPPool(max_per_host=clients, timeout=server.request_timeout_s + 5)
+    source = itertools.cycle(texts)
+    remaining = itertools.count()
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def client() -> None:
+        while next(remaining) < total:
+            text = next(source)
+            t0 = time.perf_counter()
+            try:
+                await pool.request("POST", url, json_body={"text": text})
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+            except requests.HTTPError as e:
+                code = str(e).split()[0]
+                errors[code] = errors.get(code, 0) + 1
+            except Exception as e:  # connection refused / reset under overload
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    wall_s = time.perf_counter() - started
+    await pool.aclose()
+    return {"latencies": sorted(latencies), "errors": errors, "wall_s": wall_s}
+
+
+async def _main(args: argparse.Namespace) -> None:
+    texts = load_texts()
+    if not texts:
+        print("[WARN] No utterances found.")
+        return
+
+    stub = OllamaStub(
+        latency_ms=args.latency_ms,
+        tokens_per_s=args.tokens_per_s,
+        responder=make_responder(args.reply),
+    )
+    with stub, replay_environment(stub):
+        server = SunnyServer(port=0, workers=args.workers, max_queue=args.max_queue)
+        async with server:
+            result = await run_load(server, texts, args.clients, args.requests)
+            stats = server.stats()
+
+    ok = result["latencies"]
+    wall_s = result["wall_s"]
+    print(f"clients {args.clients}   workers {args.workers}   max queue {args.max_queue}")
+    print(f"requests {args.requests}   ok {len(ok)}   wall {wall_s:.2f} s   "
+          f"throughput {len(ok) / wall_s:.1f} req/s")
+    if ok:
+        p = lambda q: ok[int(q * (len(ok) - 1))]
+        print(f"latency  mean {statistics.mean(ok):.2f} ms   p50 {p(0.5):.2f} ms   "
+              f"p90 {p(0.9):.2f} ms   p99 {p(0.99):.2f} ms")
+    print(f"errors   {result['errors'] or 'none'}   server rejected {stats['rejected']}   "
+          f"timed out {stats['timed_out']}   stub requests {stub.requests}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=200, help="concurrent keep-alive clients")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=256)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub delay before the first token")
+    parser.add_argument("--tokens-per-s", type=float, default=0.0, help="stub decode speed (0 = instant)")
+    parser.add_argument("--reply", choices=("fixed", "schema"), default="schema")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
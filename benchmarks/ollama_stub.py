@@ -0,0 +1,321 @@
+# benchmarks/ollama_stub.py
+"""
+Local stand-in for an Ollama server, for tests and benchmarks on any OS.
+
+Serves:
+  POST /api/generate   (stream and non-stream, Ollama-style JSON)
+  GET  /api/tags       (health probe)
+  GET  /api/version
+
+Latency, token rate and the reply text are configurable, and it speaks
+HTTP/1.1 keep-alive, so connection reuse is measurable. Replies are a fixed
+action, canned texts taken in turn (canned_responder), or an instance of
+the request's "format" JSON schema (schema_responder), like Ollama's
+constrained decoding.
+
+Usage:
+    python -m benchmarks.ollama_stub --port 11434 --latency-ms 50
+    python -m benchmarks.ollama_stub --reply schema --tokens-per-s 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import re
+import socket
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+DEFAULT_REPLY = json.dumps({
+    "action": "none",
+    "args": {},
+    "assistant_reply": "Hello from the Ollama stub.",
+})
+
+Responder = Callable[[Dict[str, Any]], str]
+
+
+def split_tokens(text: str) -> List[str]:
+    """Rough word-level tokenization, good enough to simulate streaming."""
+    return re.findall(r"\S+\s*|\s+", text) or [text]
+
+
+def canned_responder(replies: Sequence[str]) -> Responder:
+    """Answer with `replies` in turn, wrapping around."""
+    cycle = itertools.cycle(list(replies) or [DEFAULT_REPLY])
+    lock = threading.Lock()
+
+    def respond(payload: Dict[str, Any]) -> str:
+        with lock:
+            return next(cycle)
+
+    return respond
+
+
+def schema_instance(schema: Dict[str, Any], seed: int = 0) -> Any:
+    """
+    A value that satisfies `schema` (the subset the router's action schema
+    uses: anyOf/oneOf, object, enum, string, integer/number with bounds,
+    boolean, array). `seed` picks the anyOf/oneOf branch.
+    """
+    for key in ("anyOf", "oneOf"):
+        if schema.get(key):
+            variants = schema[key]
+            return schema_instance(variants[seed % len(variants)], seed)
+    if schema.get("enum"):
+        return schema["enum"][0]
+
+    kind = schema.get("type")
+    if kind == "object":
+        props = schema.get("properties", {})
+        return {name: schema_instance(sub, seed) for name, sub in props.items()}
+    if kind == "array":
+        return [schema_instance(schema.get("items", {}), seed)]
+    if kind in ("integer", "number"):
+        lo = schema.get("minimum", 0)
+        hi = schema.get("maximum", lo + 100)
+        value = lo + seed % (hi - lo + 1)
+        return int(value) if kind == "integer" else float(value)
+    if kind == "boolean":
+        return bool(seed % 2)
+    if kind == "string":
+        return "stub"
+    return None
+
+
+def schema_responder(payload: Dict[str, Any]) -> str:
+    """
+    Reply with an instance of the request's "format" schema; the branch is
+    picked from a hash of the prompt, so one prompt always gets the same
+    action. Requests without a schema get DEFAULT_REPLY.
+    """
+    schema = payload.get("format")
+    if not isinstance(schema, dict):
+        return DEFAULT_REPLY
+    seed = zlib.crc32(str(payload.get("prompt", "")).encode("utf-8"))
+    return json.dumps(schema_instance(schema, seed))
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients closing a stream early (the router does) reset the
+        # connection; that's expected, not worth a traceback.
+        pass
+
+
+class OllamaStub:
+    """
+    Threaded HTTP server that imitates the parts of Ollama we use.
+
+    - latency_ms:       delay before the first token (prompt eval + queueing)
+    - tokens_per_s:     decode speed for streamed/non-streamed replies (0 = instant)
+    - connect_delay_ms: extra delay on every NEW connection (simulated TCP/TLS
+                        handshake RTT to a remote box)
+    - responder:        payload -> reply text (defaults to a fixed JSON action)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        tokens_per_s: float = 0.0,
+        connect_delay_ms: float = 0.0,
+        responder: Optional[Responder] = None,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.tokens_per_s = tokens_per_s
+        self.connect_delay_ms = connect_delay_ms
+        self.responder = responder or (lambda payload: DEFAULT_REPLY)
+
+        self.requests = 0
+        self.connections = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+        self._server = _QuietHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def generate_url(self) -> str:
+        return self.base_url + "/api/generate"
+
+    def start(self) -> "OllamaStub":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "OllamaStub":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def _count(self, attr: str) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+
+def _make_handler(stub: OllamaStub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def setup(self) -> None:
+            super().setup()
+            # Like Ollama (Go's net/http), disable Nagle so small writes go out at once.
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            stub._count("connections")
+            if stub.connect_delay_ms:
+                time.sleep(stub.connect_delay_ms / 1000.0)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass  # keep benchmark output clean
+
+        def _send_json(self, obj: Any, status: int = 200) -> None:
+            body = json.dumps(obj).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            if self.path == "/api/tags":
+                self._send_json({"models": [{"name": "phi3:latest"}]})
+            elif self.path == "/api/version":
+                self._send_json({"version": "stub"})
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if self.path != "/api/generate":
+                self._send_json({"error": "not found"}, status=404)
+                return
+
+            stub._count("requests")
+            started = time.perf_counter()
+            text = stub.responder(payload)
+            tokens = split_tokens(text)
+            if stub.latency_ms:
+                time.sleep(stub.latency_ms / 1000.0)
+            delay = 1.0 / stub.tokens_per_s if stub.tokens_per_s else 0.0
+
+            if not payload.get("stream", True):
+                time.sleep(delay * len(tokens))
+                self._send_json(_final(payload, text, tokens, started))
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for tok in tokens:
+                    if delay:
+                        time.sleep(delay)
+                    self._write_chunk({"model": payload.get("model"), "response": tok, "done": False})
+                self._write_chunk(_final(payload, "", tokens, started))
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                stub._count("cancelled")
+                self.close_connection = True
+
+        def _write_chunk(self, obj: Dict[str, Any]) -> None:
+            line = (json.dumps(obj) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def _final(payload: Dict[str, Any], text: str, tokens: List[str], started: float) -> Dict[str, Any]:
+    """
+    Final Ollama message with timing/count fields and a "context" array.
+
+    Tokens already present in an incoming "context" count as cached, so only
+    the new prompt (plus the system prompt on a fresh conversation) is
+    reported as prompt eval — the same behaviour as Ollama's KV cache.
+    """
+    prompt_tokens = split_tokens(str(payload.get("prompt", "")))
+    context = list(payload.get("context") or [])
+    if not context and payload.get("system"):
+        prompt_tokens = split_tokens(str(payload["system"])) + prompt_tokens
+    new_tokens = prompt_tokens + tokens
+    context.extend(range(len(context), len(context) + len(new_tokens)))
+
+    total_ns = int((time.perf_counter() - started) * 1e9)
+    return {
+        "model": payload.get("model"),
+        "response": text,
+        "done": True,
+        "context": context,
+        "total_duration": total_ns,
+        "load_duration": 0,
+        "prompt_eval_count": len(prompt_tokens),
+        "prompt_eval_duration": 0,
+        "eval_count": len(tokens),
+        "eval_duration": total_ns,
+    }
+
+
+def make_responder(reply: str = "fixed", canned_path: Optional[str] = None) -> Optional[Responder]:
+    """Responder for the CLI options shared by the stub and the benchmarks."""
+    if canned_path:
+        with open(canned_path, "r", encoding="utf-8") as f:
+            return canned_responder([line.rstrip("\n") for line in f if line.strip()])
+    if reply == "schema":
+        return schema_responder
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local Ollama stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-s", type=float, default=0.0)
+    parser.add_argument("--connect-delay-ms", type=float, default=0.0)
+    parser.add_argument("--reply", choices=("fixed", "schema"), default="fixed",
+                        help="fixed action, or an instance of the request's format schema")
+    parser.add_argument("--canned", help="file with one reply per line, answered in turn")
+    args = parser.parse_args()
+
+    stub = OllamaStub(
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        tokens_per_s=args.tokens_per_s,
+        connect_delay_ms=args.connect_delay_ms,
+        responder=make_responder(args.reply, args.canned),
+    )
+    print(f"[OK] Ollama stub listening on {stub.base_url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,26 @@
 import sys
 import time
+from backend import metrics
 from backend.router import route_message
 # from backend.router import execute_action   # ❌ old import (commented, not deleted)
 
+REACTION_SECONDS = metrics.histogram("sunny_reaction_seconds", "End-to-end reaction time", ["client"])
+
+
 def main():
     print("🟢 Nunnarivu Terminal — Sunny Ready")
-    print("Type your message. Type 'exit' to quit.\n")
+    print("Type your message. Type 'metrics' for session stats, 'exit' to quit.\n")
 
     while True:
         user_input = input("You: ").strip()
         if user_input.lower() == "exit":
+            path = metrics.write_textfile("terminal.prom")
+            print(f"[INFO] Session metrics saved to {path}")
             print("Goodbye!")
             sys.exit(0)
+        if user_input.lower() == "metrics":
+            print(metrics.dump() or "[INFO] No metrics yet.")
+            continue
 
         # Route the text to the router (LLM + action detection)
             # Measure reaction time
@@ -19,6 +28,7 @@ def main():
         sunny_reply = route_message(user_input)
         end_time = time.time()
         reaction = end_time - start_time
+        REACTION_SECONDS.labels(client="terminal").observe(reaction)
 
 
         # If router was returning an action dict earlier, we used:
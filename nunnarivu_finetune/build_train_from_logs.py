@@ -1,30 +1,33 @@
 import json
 import os
+import sys
 from pathlib import Path
 
-# Where router.py is logging interactions
-LOG_PATH = os.path.expanduser("~/nunnarivu/logs/nunnarivu_interactions.jsonl")
+# Add project root to import backend modules
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.interaction_store import open_store
+
+# Where router.py is logging interactions (SQLite store; a .jsonl path works too)
+LOG_PATH = os.path.expanduser("~/nunnarivu/logs/nunnarivu_interactions.sqlite3")
 
 # Where we will write a training file
 OUT_PATH = Path("nunnarivu_finetune/data/from_logs.jsonl")
 
 
 def iter_logs(path: str):
-    """Yield parsed JSON entries from the log file."""
+    """Yield logged entries from the interaction store."""
     if not os.path.exists(path):
         print(f"[WARN] No log file found at {path}")
         return
 
-    with open(path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                yield json.loads(line)
-            except json.JSONDecodeError:
-                print(f"[WARN] Skipping bad line: {line[:80]}...")
-                continue
+    store = open_store(path)
+    try:
+        yield from store.iter_entries()
+    finally:
+        store.close()
 
 
 def build_dataset():
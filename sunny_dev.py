@@ -6,7 +6,7 @@ PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from backend.llm_client import ask_llm
+from backend.llm_client import ChatSession
 from backend.shell_actions import run_shell_command
 
 
@@ -23,10 +23,10 @@ You are Sunny, an expert software engineer and coding assistant running locally
 def main():
     print("☀️ Sunny (coding assistant) – type 'exit' to quit.\n")
 
-    # Conversation memory for better context
-    history = [
-        {"role": "system", "content": SYSTEM_PROMPT}
-    ]
+    # Conversation memory lives on the Ollama side: each turn only sends the
+    # new message, and SYSTEM_PROMPT is evaluated once per session.
+    # Long code generations must not hold up voice commands.
+    session = ChatSession(SYSTEM_PROMPT, priority="batch")
 
     while True:
         try:
@@ -62,16 +62,12 @@ def main():
         # -------------------------------------------------------
 
         # Normal LLM chat mode
-        history.append({"role": "user", "content": user})
-
-        reply = ask_llm(history)
+        reply = session.ask(user)
 
         print("\nSunny:\n")
         print(reply)
         print()
 
-        history.append({"role": "assistant", "content": reply})
-
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -7,10 +7,14 @@ PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
+from backend import metrics
 from backend.voice_listener import start_voice_listener
 from backend.router import route_message, execute_action
+from backend.llm_scheduler import llm_priority
 from backend.tts import speak
 
+REACTION_SECONDS = metrics.histogram("sunny_reaction_seconds", "End-to-end reaction time", ["client"])
+
 
 def handle_voice_command(text):
     """
@@ -22,8 +26,9 @@ def handle_voice_command(text):
     # start timer
     start_time = time.time()
 
-    # Send to router
-    result = route_message(text)
+    # Send to router (voice goes ahead of batch LLM work)
+    with llm_priority("voice"):
+        result = route_message(text)
 
     action = result.get("action", "none")
     args = result.get("args", {})
@@ -35,6 +40,7 @@ def handle_voice_command(text):
 
     # stop timer
     reaction_time = time.time() - start_time
+    REACTION_SECONDS.labels(client="voice").observe(reaction_time)
 
     # speak and print Sunny's reply
     print(f"Sunny: {reply}")
@@ -46,4 +52,7 @@ if __name__ == "__main__":
     print("🌞 Sunny Voice Assistant is running...")
     print("Say: 'Hey Sunny ...' to activate me.\n")
 
-    start_voice_listener(handle_voice_command)
\ No newline at end of file
+    try:
+        start_voice_listener(handle_voice_command)
+    finally:
+        metrics.write_textfile("voice.prom")
\ No newline at end of file
@@ -8,3 +8,42 @@ root_str = str(ROOT)
 if root_str not in sys.path:
     sys.path.insert(0, root_str)
 
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolated_llm_cache(monkeypatch):
+    """Tests never read or write the user's shared ~/nunnarivu LLM cache."""
+    from backend import llm_client
+
+    monkeypatch.setattr(llm_client, "CACHE_ENABLED", False)
+    monkeypatch.setattr(llm_client, "_cache", None)
+
+
+@pytest.fixture(autouse=True)
+def _no_llm_broker(monkeypatch):
+    """Tests schedule LLM calls in-process, never through a running Sunny's broker."""
+    from backend import llm_client
+
+    monkeypatch.setattr(llm_client, "LLM_BROKER_PATH", None)
+    llm_client.set_scheduler(None)
+    yield
+    llm_client.set_scheduler(None)
+
+
+@pytest.fixture(autouse=True)
+def _no_trained_intent_model(monkeypatch):
+    """Tests don't depend on whatever intent model the user has trained."""
+    from backend import intent_model
+
+    monkeypatch.setattr(intent_model, "_model", None)
+    monkeypatch.setattr(intent_model, "_model_loaded", True)
+
+
+@pytest.fixture(autouse=True)
+def _synchronous_interaction_log(monkeypatch):
+    """Log entries are on disk when route_message returns, so tests can read them."""
+    from backend import router
+
+    monkeypatch.setattr(router, "LOG_IN_BACKGROUND", False)
@@ -0,0 +1,134 @@
+# tests/test_app_index.py
+
+import json
+import os
+import threading
+import time
+
+from backend import app_aliases, discover_apps, mac_actions
+from backend.app_index import AppIndex, get_app_index, matcher_for
+
+APPS = {"Safari": "/Applications/Safari.app", "google  chrome": "/Applications/Google Chrome.app"}
+
+
+def _write(path, apps):
+    path.write_text(json.dumps(apps), encoding="utf-8")
+
+
+def test_get_parses_once_until_the_file_changes(tmp_path):
+    path = tmp_path / "app_index.json"
+    _write(path, APPS)
+    index = AppIndex(str(path))
+
+    first = index.get()
+    assert first == {"safari": APPS["Safari"], "google chrome": APPS["google  chrome"]}
+    assert index.get() is first
+    assert index.loads == 1
+
+    _write(path, {"notes": "/System/Applications/Notes.app"})
+    assert index.get() == {"notes": "/System/Applications/Notes.app"}
+    assert index.loads == 2
+    assert index.lookup("Notes") == "/System/Applications/Notes.app"
+
+
+def test_missing_or_corrupt_file_is_rebuilt(tmp_path):
+    path = tmp_path / "sub" / "app_index.json"
+    index = AppIndex(str(path), scan=lambda: {"notes": "/System/Applications/Notes.app"})
+
+    assert index.get() == {"notes": "/System/Applications/Notes.app"}
+    assert json.loads(path.read_text(encoding="utf-8")) == index.get()
+
+    path.write_text("{not json", encoding="utf-8")
+    assert index.get() == {"notes": "/System/Applications/Notes.app"}
+    assert json.loads(path.read_text(encoding="utf-8")) == index.get()
+
+
+def test_save_is_atomic_and_does_not_reparse(tmp_path):
+    path = tmp_path / "app_index.json"
+    _write(path, APPS)
+    index = AppIndex(str(path))
+    index.get()
+
+    saved = index.save({"Notes": "/System/Applications/Notes.app"})
+
+    assert index.get() is saved
+    assert index.loads == 1
+    assert os.listdir(tmp_path) == ["app_index.json"]
+
+
+def test_readers_see_whole_snapshots_while_saving(tmp_path):
+    path = tmp_path / "app_index.json"
+    old = {f"app {i}": f"/Applications/App {i}.app" for i in range(500)}
+    new = {f"tool {i}": f"/Applications/Tool {i}.app" for i in range(700)}
+    _write(path, old)
+    index = AppIndex(str(path))
+    seen = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            seen.append(len(index.get()))
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for i in range(20):
+        index.save(new if i % 2 == 0 else old)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    assert set(seen) <= {500, 700}
+
+
+def test_modules_share_one_index_and_matcher(tmp_path, monkeypatch):
+    path = tmp_path / "app_index.json"
+    _write(path, APPS)
+    monkeypatch.setattr(discover_apps, "APP_INDEX_PATH", path)
+    monkeypatch.setattr(app_aliases, "APP_INDEX_PATH", str(path))
+    monkeypatch.setattr(mac_actions, "load_app_index", discover_apps.load_app_index)
+    monkeypatch.setattr(mac_actions, "_APP_INDEX_CACHE", None)
+
+    shared = discover_apps.load_app_index()
+    assert app_aliases.load_app_index() is shared
+    assert mac_actions._get_app_index() is shared
+    assert mac_actions._get_matcher() is get_app_index(path).matcher() is matcher_for(shared)
+
+    get_app_index(path).save({"safari": APPS["Safari"], "notes": "/System/Applications/Notes.app"})
+    assert mac_actions._find_app_matches("notes") == [("notes", "/System/Applications/Notes.app")]
+    assert app_aliases.get_app_path("Notes") == "/System/Applications/Notes.app"
+
+
+def test_background_reload_keeps_the_old_snapshot_until_the_new_one_is_ready(tmp_path, monkeypatch):
+    from backend import app_index
+
+    path = tmp_path / "app_index.json"
+    _write(path, APPS)
+    index = AppIndex(str(path))
+    old = index.get()
+
+    building = threading.Event()
+    release = threading.Event()
+    built = []
+
+    def slow_matcher(data):
+        building.set()
+        release.wait(5.0)
+        built.append(data)
+        return matcher_for(data)
+
+    monkeypatch.setattr(app_index, "BACKGROUND_RELOAD", True)
+    monkeypatch.setattr(app_index, "matcher_for", slow_matcher)
+    _write(path, {"notes": "/System/Applications/Notes.app"})
+
+    assert index.get() is old  # returns at once, the reload runs in the background
+    assert building.wait(5.0)
+    assert index.get() is old
+    release.set()
+
+    deadline = time.monotonic() + 5.0
+    while "notes" not in index.get() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.get() == {"notes": "/System/Applications/Notes.app"}
+    assert built == [index.get()]
+    assert index.loads == 2
@@ -0,0 +1,85 @@
+# tests/test_app_matcher.py
+
+from backend import app_aliases, mac_actions
+from backend.app_matcher import SUBSTRING_SCORE, AppMatcher, score_name
+from benchmarks.bench_micro import synthetic_app_index
+
+INDEX = {
+    "safari": "/Applications/Safari.app",
+    "safari technology preview": "/Applications/Safari Technology Preview.app",
+    "google chrome": "/Applications/Google Chrome.app",
+    "google chrome helper": "/Applications/Google Chrome.app/Contents/Frameworks/Google Chrome Helper.app",
+    "chrome remote desktop": "/Applications/Chrome Remote Desktop.app",
+    "visual studio code": "/Applications/Visual Studio Code.app",
+    "notes": "/System/Applications/Notes.app",
+    "microsoft word": "/Applications/Microsoft Word.app",
+    "microsoft excel": "/Applications/Microsoft Excel.app",
+}
+
+
+def test_search_ranks_by_score_then_shorter_name():
+    m = AppMatcher(INDEX)
+
+    assert m.search("safari")[0][:2] == (100.0, "safari")
+    assert [n for _, n, _ in m.search("saf")] == ["safari", "safari technology preview"]
+
+    chrome = m.search("chrome")
+    assert [n for _, n, _ in chrome] == ["chrome remote desktop", "google chrome", "google chrome helper"]
+    assert [s for s, _, _ in chrome] == sorted((s for s, _, _ in chrome), reverse=True)
+
+    assert m.search("vis code")[0][1] == "visual studio code"
+    assert m.search("hrome")[0][0] == SUBSTRING_SCORE
+
+
+def test_search_tolerates_typos():
+    m = AppMatcher(INDEX)
+
+    assert m.search("safri")[0][1] == "safari"
+    assert m.search("chrme")[0][1] in {"google chrome", "chrome remote desktop"}
+    assert m.search("micrsoft word")[0][1] == "microsoft word"
+    assert m.search("xylophone") == []
+
+    assert m.resolve("safri") == [("safari", INDEX["safari"])]
+    assert m.resolve("notse") == [("notes", INDEX["notes"])]
+
+
+def test_resolve_prefers_exact_then_all_strong_matches():
+    m = AppMatcher(INDEX)
+
+    assert m.resolve("safari") == [("safari", INDEX["safari"])]
+    assert {n for n, _ in m.resolve("microsoft")} == {"microsoft word", "microsoft excel"}
+    assert m.resolve("") == []
+
+
+def test_index_lookup_agrees_with_score_name():
+    index = synthetic_app_index(2000)
+    m = AppMatcher(index)
+    for q in ["chrome", "google chrome", "stu", "vis stu", "hrome", "s", "code 1"]:
+        found = m.search(q, limit=None, fuzzy=False)
+        expected = sorted(
+            (score_name(q, n), n) for n in m.names if score_name(q, n) >= SUBSTRING_SCORE
+        )
+        assert sorted((s, n) for s, n, _ in found) == expected, q
+        assert m.search(q, limit=5, fuzzy=False) == found[:5]
+
+
+def test_mac_actions_and_app_aliases_share_the_ranking(tmp_path, monkeypatch):
+    import json
+
+    path = tmp_path / "app_index.json"
+    path.write_text(json.dumps(INDEX), encoding="utf-8")
+    monkeypatch.setattr(app_aliases, "APP_INDEX_PATH", str(path))
+    monkeypatch.setattr(mac_actions, "_APP_INDEX_CACHE", dict(INDEX))
+
+    assert mac_actions._find_app_matches("safri") == [("safari", INDEX["safari"])]
+    assert app_aliases.resolve_app_candidates("safri") == ["safari"]
+    assert [n for n, _ in mac_actions._find_app_matches("chrome")] == app_aliases.resolve_app_candidates("chrome")
+
+
+def test_is_installed_app_needs_a_whole_word(monkeypatch):
+    monkeypatch.setattr(mac_actions, "_APP_INDEX_CACHE", dict(INDEX))
+
+    assert mac_actions.is_installed_app("chrome")
+    assert mac_actions.is_installed_app("visual studio")
+    assert not mac_actions.is_installed_app("over")  # no typo or substring matches
+    assert not mac_actions.is_installed_app("a timer for five minutes")
@@ -0,0 +1,95 @@
+# tests/test_app_watcher.py
+
+import json
+import os
+import shutil
+import time
+
+import pytest
+
+from backend import app_index
+from backend.app_watcher import AppWatcher
+
+
+def _bundle(path):
+    os.makedirs(os.path.join(path, "Contents", "MacOS"))
+    return str(path)
+
+
+def _wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def tree(tmp_path):
+    apps = tmp_path / "Applications"
+    _bundle(apps / "Safari.app")
+    _bundle(apps / "Utilities" / "Terminal.app")
+    _bundle(apps / "Safari.app" / "Contents" / "Helper.app")
+    return tmp_path, [str(apps)]
+
+
+def test_sync_applies_deltas_in_memory_and_on_disk(tree):
+    base, roots = tree
+    index_path = base / "index" / "app_index.json"
+    changes = []
+    watcher = AppWatcher(index_path, roots, backend="poll", on_change=lambda a, r: changes.append((a, r)))
+    try:
+        added, removed = watcher.sync()
+        assert set(added) == {"safari", "terminal"} and removed == []
+
+        zed = _bundle(base / "Applications" / "Zed.app")
+        shutil.rmtree(base / "Applications" / "Utilities" / "Terminal.app")
+        assert watcher.sync() == ({"zed": zed}, ["terminal"])
+        assert watcher.sync() == ({}, [])
+
+        current = watcher.index.get()
+        assert set(current) == {"safari", "zed"}
+        assert json.loads(index_path.read_text(encoding="utf-8")) == current
+        # Published with its matcher already built
+        assert app_index._matchers[id(current)][0] is current
+        assert [r for _, r in changes] == [[], ["terminal"]]
+    finally:
+        watcher.stop()
+
+
+def test_sync_keeps_apps_of_a_missing_root_and_an_empty_scan(tree, capsys):
+    base, roots = tree
+    other = base / "OtherApps"
+    _bundle(other / "Zed.app")
+    watcher = AppWatcher(base / "app_index.json", roots + [str(other)], backend="poll")
+    try:
+        watcher.sync()
+        shutil.rmtree(other)
+        shutil.rmtree(base / "Applications" / "Utilities")
+        # Terminal's root was listed, Zed's is gone (unmounted, not uninstalled)
+        assert watcher.sync() == ({}, ["terminal"])
+        assert set(watcher.index.get()) == {"safari", "zed"}
+
+        shutil.rmtree(base / "Applications" / "Safari.app")
+        assert watcher.sync() == ({}, [])
+        assert set(watcher.index.get()) == {"safari", "zed"}
+        assert "keeping the 2 indexed apps" in capsys.readouterr().out
+    finally:
+        watcher.stop()
+
+
+@pytest.mark.parametrize("backend, interval", [("auto", 60.0), ("poll", 0.1)])
+def test_background_thread_picks_up_new_apps(tree, backend, interval):
+    base, roots = tree
+    index_path = base / "app_index.json"
+
+    # With an event backend the long interval means only events can trigger the rescan
+    with AppWatcher(index_path, roots, backend=backend, interval=interval) as watcher:
+        assert watcher.wait_synced(5.0)
+        _bundle(base / "Applications" / "Utilities" / "Notes.app")
+        assert _wait_for(lambda: "notes" in watcher.index.get())
+        shutil.rmtree(base / "Applications" / "Safari.app")
+        assert _wait_for(lambda: "safari" not in watcher.index.get())
+
+    assert set(app_index.get_app_index(index_path).get()) == {"terminal", "notes"}
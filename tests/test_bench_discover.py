@@ -0,0 +1,21 @@
+# tests/test_bench_discover.py
+
+from backend.discover_apps import scan_apps
+from benchmarks.bench_discover import make_tree, rglob_scan, run
+
+
+def test_scandir_finds_the_top_level_bundles_rglob_finds(tmp_path):
+    roots = make_tree(str(tmp_path), apps=30, bundle_dirs=8)
+
+    apps, _ = scan_apps(roots)
+    old = rglob_scan(roots)
+
+    assert len(apps) == 30
+    assert {n: p for n, p in old.items() if "helper" not in n} == apps
+
+
+def test_run_reports_every_case(tmp_path):
+    rows = run(str(tmp_path), apps=10, bundle_dirs=6, rounds=1)
+
+    assert [r[0] for r in rows] == ["rglob", "scandir.serial", "scandir", "rescan.same", "rescan.add"]
+    assert rows[-1][2] == 11
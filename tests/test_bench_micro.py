@@ -0,0 +1,44 @@
+# tests/test_bench_micro.py
+
+from backend import app_aliases, mac_actions
+from benchmarks.bench_micro import (
+    compare,
+    load_baseline,
+    save_baseline,
+    synthetic_app_index,
+    synthetic_apps,
+    time_case,
+)
+
+
+def test_synthetic_index_feeds_both_matchers():
+    assert len(synthetic_app_index(500)) == 500
+    saved = (mac_actions._APP_INDEX_CACHE, app_aliases.APP_INDEX_PATH)
+
+    with synthetic_apps(500):
+        assert mac_actions._find_app_matches("chrome")
+        assert app_aliases.resolve_app_candidates("chrome")
+
+    assert (mac_actions._APP_INDEX_CACHE, app_aliases.APP_INDEX_PATH) == saved
+
+
+def test_time_case_reports_per_call_time():
+    result = time_case(lambda: sum(range(100)), rounds=3, min_time=0.001)
+    assert result["loops"] >= 1
+    assert 0 < result["min_us"] <= result["median_us"]
+
+
+def test_baseline_roundtrip_and_compare(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    save_baseline(path, {"a": {"median_us": 10.0, "min_us": 10.0}})
+    save_baseline(path, {"b": {"median_us": 5.0, "min_us": 5.0}})
+
+    baseline = load_baseline(path)
+    assert set(baseline) == {"a", "b"}
+
+    changes = compare(
+        {"a": {"median_us": 13.0, "min_us": 13.0}, "c": {"median_us": 1.0, "min_us": 1.0}},
+        baseline,
+    )
+    assert round(changes["a"], 2) == 0.3
+    assert changes["c"] is None
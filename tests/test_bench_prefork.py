@@ -0,0 +1,26 @@
+# tests/test_bench_prefork.py
+
+from backend import server as server_module
+from backend.server import PreforkServer, SunnyServer
+from benchmarks.bench_micro import synthetic_apps
+from benchmarks.bench_prefork import _lookup_only, run_clients
+
+
+def test_lookup_only_uses_the_index_without_opening():
+    with synthetic_apps(200):
+        logged, reply = _lookup_only({"name": "safari"})
+    assert logged == {"name": "safari"}
+    assert reply.endswith("match(es)")
+
+
+def test_run_clients_merges_load_processes(monkeypatch):
+    monkeypatch.setattr(server_module, "load_shared_tables", lambda: None)
+    monkeypatch.setattr(SunnyServer, "warm_up", staticmethod(lambda: None))
+
+    with PreforkServer(2, port=0, route=lambda text: {"assistant_reply": text}) as server:
+        url = f"http://{server.host}:{server.port}/route"
+        result = run_clients(url, ["hey", "open safari"], procs=2, connections=4, seconds=0.5)
+
+    assert result["errors"] == 0
+    assert len(result["latencies"]) > 0
+    assert result["latencies"] == sorted(result["latencies"])
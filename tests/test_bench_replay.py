@@ -0,0 +1,38 @@
+# tests/test_bench_replay.py
+
+import json
+
+from backend import router
+from benchmarks.bench_replay import replay, replay_environment, summarize
+from benchmarks.ollama_stub import OllamaStub, canned_responder, schema_responder
+
+
+def test_schema_responder_produces_valid_actions():
+    for i in range(30):
+        payload = {"format": router.ACTION_SCHEMA, "prompt": f"do thing {i}"}
+        reply = json.loads(schema_responder(payload))
+        assert router.validate_action(reply) is None
+
+    same = {"format": router.ACTION_SCHEMA, "prompt": "same"}
+    assert schema_responder(same) == schema_responder(same)
+
+
+def test_canned_responder_cycles():
+    respond = canned_responder(["a", "b"])
+    assert [respond({}) for _ in range(3)] == ["a", "b", "a"]
+
+
+def test_replay_splits_fast_and_llm_paths():
+    real_runs = {name: spec.get("run") for name, spec in router.ACTIONS.items()}
+
+    with OllamaStub(responder=schema_responder) as stub:
+        with replay_environment(stub) as local:
+            samples, wall_s = replay(["open safari", "tell me a joke about compilers"], local)
+
+    assert [path for path, _ in samples] == ["fast", "llm"]
+    assert stub.requests == 1
+    assert {name: spec.get("run") for name, spec in router.ACTIONS.items()} == real_runs
+
+    stats = summarize(samples, wall_s)
+    assert stats["fast"]["count"] == 1 and stats["llm"]["count"] == 1
+    assert stats["all"]["throughput_rps"] > 0
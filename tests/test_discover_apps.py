@@ -0,0 +1,67 @@
+# tests/test_discover_apps.py
+
+import os
+import shutil
+
+from backend.app_index import get_app_index
+from backend.discover_apps import load_scan_state, rebuild_app_index, scan_apps, scan_state_path
+
+
+def _bundle(path):
+    os.makedirs(os.path.join(path, "Contents", "MacOS"))
+    return str(path)
+
+
+def _tree(tmp_path):
+    apps = tmp_path / "Applications"
+    chrome = _bundle(apps / "Google Chrome.app")
+    _bundle(apps / "Google Chrome.app" / "Contents" / "Frameworks" / "Google Chrome Helper.app")
+    word = _bundle(apps / "Microsoft" / "Microsoft Word.app")
+    os.makedirs(apps / "Tools" / "Core.framework" / "Inner.app")
+    os.makedirs(apps / ".hidden" / "Secret.app")
+    (apps / "Notes.app").write_text("not a bundle", encoding="utf-8")
+    system = tmp_path / "System"
+    notes = _bundle(system / "Notes.app")
+    _bundle(system / "Google Chrome.app")
+    return [str(apps), str(system)], {"google chrome": chrome, "microsoft word": word, "notes": notes}
+
+
+def test_scan_stops_at_bundles_and_keeps_the_first_root(tmp_path):
+    roots, expected = _tree(tmp_path)
+
+    apps, state = scan_apps(roots + [str(tmp_path / "missing")])
+
+    assert apps == expected
+    assert not any(".app" in path for path in state)
+
+
+def test_rescan_lists_only_changed_directories(tmp_path):
+    roots, expected = _tree(tmp_path)
+    _, state = scan_apps(roots)
+
+    stats = {}
+    apps, state = scan_apps(roots, state, stats)
+    assert apps == expected
+    assert stats == {"reused": len(state)}
+
+    added = _bundle(tmp_path / "Applications" / "Microsoft" / "Microsoft Excel.app")
+    shutil.rmtree(tmp_path / "System" / "Notes.app")
+    stats = {}
+    apps, state = scan_apps(roots, state, stats)
+    assert stats["listed"] == 2
+    assert apps == {"google chrome": expected["google chrome"], "microsoft word": expected["microsoft word"],
+                    "microsoft excel": added}
+
+
+def test_rebuild_app_index_stores_directory_state(tmp_path):
+    roots, expected = _tree(tmp_path)
+    index_path = tmp_path / "index" / "app_index.json"
+
+    assert rebuild_app_index(index_path, roots=roots) == expected
+    state = load_scan_state(scan_state_path(index_path))
+    assert set(state) >= set(roots)
+
+    _bundle(tmp_path / "Applications" / "Safari.app")
+    apps = rebuild_app_index(index_path, roots=roots)
+    assert "safari" in apps
+    assert get_app_index(index_path).get() is apps
@@ -0,0 +1,103 @@
+# tests/test_intent_model.py
+
+import json
+
+from backend import intent_model, router
+from backend.intent_model import IntentModel, cross_validate, load_examples
+
+EXAMPLES = [
+    ("open safari", "open_app"),
+    ("please launch spotify", "open_app"),
+    ("bring up chrome", "open_app"),
+    ("fire up slack", "open_app"),
+    ("start notes", "open_app"),
+    ("set volume to 20", "set_volume"),
+    ("volume thirty", "set_volume"),
+    ("turn the volume down to ten", "set_volume"),
+    ("make the sound louder to eighty", "set_volume"),
+    ("open downloads folder", "open_folder"),
+    ("show my documents folder", "open_folder"),
+    ("open the desktop folder", "open_folder"),
+    ("hello there", "none"),
+    ("what is nunnarivu", "none"),
+    ("tell me a joke", "none"),
+]
+
+
+def test_train_predict_and_roundtrip(tmp_path):
+    model = IntentModel.train(EXAMPLES)
+    assert model.predict("could you bring up safari")[0] == "open_app"
+    assert model.predict("turn volume to fifty")[0] == "set_volume"
+
+    path = str(tmp_path / "intent_model.npz")
+    model.save(path)
+    loaded = IntentModel.load(path)
+
+    assert loaded.labels == model.labels
+    assert loaded.predict("volume to fifty")[0] == "set_volume"
+
+
+def test_cross_validate_reports_every_action():
+    report = cross_validate(EXAMPLES, folds=3, epochs=50)
+    assert set(report) == {"open_app", "set_volume", "open_folder", "none"}
+    assert sum(r["support"] for r in report.values()) == len(EXAMPLES)
+
+
+def test_load_examples_labels(tmp_path):
+    log = tmp_path / "log.jsonl"
+    log.write_text(json.dumps({
+        "user_text": "start chrome",
+        "assistant_action": {"action": "open_app", "args": {"name": "chrome"}},
+    }) + "\n", encoding="utf-8")
+    train = tmp_path / "train.jsonl"
+    rows = [
+        {"instruction": "open downloads folder", "input": "", "output": "Opening your Downloads folder."},
+        {"instruction": "hey sunny volume thirty", "input": "", "output": "Setting volume to 30."},
+        {"instruction": "open it", "input": "User previously referenced Safari.", "output": "Opening Safari now."},
+    ]
+    train.write_text("\n".join(json.dumps(r) for r in rows), encoding="utf-8")
+
+    assert load_examples([str(log), str(train)]) == [
+        ("start chrome", "open_app"),
+        ("open downloads folder", "open_folder"),
+        ("hey sunny volume thirty", "set_volume"),
+    ]
+
+
+def test_router_uses_confident_model(tmp_path, monkeypatch):
+    def fake_stream_llm(messages, **kwargs):
+        raise AssertionError("LLM should not be called")
+
+    opened = []
+    intent_model.set_model(IntentModel.train(EXAMPLES))
+    monkeypatch.setattr(intent_model, "CONFIDENCE_THRESHOLD", 0.0)
+    monkeypatch.setattr(router, "stream_llm", fake_stream_llm)
+    monkeypatch.setattr(router, "open_app", lambda name: opened.append(name) or f"Opening {name}.")
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.jsonl"))
+
+    resp = router.route_message("could you bring up safari for me")
+
+    assert resp["assistant_reply"] == "Opening safari."
+    assert opened == ["safari"]
+
+
+def test_router_falls_back_to_llm_below_threshold(tmp_path, monkeypatch):
+    def fake_stream_llm(messages, **kwargs):
+        yield '{"action": "none", "args": {}, "assistant_reply": "LLM path"}'
+
+    intent_model.set_model(IntentModel.train(EXAMPLES))
+    monkeypatch.setattr(intent_model, "CONFIDENCE_THRESHOLD", 1.01)
+    monkeypatch.setattr(router, "stream_llm", fake_stream_llm)
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.jsonl"))
+
+    assert router.route_message("could you bring up safari for me")["assistant_reply"] == "LLM path"
+
+
+def test_model_never_fills_a_shell_command(monkeypatch):
+    examples = EXAMPLES + [("run the tests for me", "run_shell"), ("run ls in my home folder", "run_shell")]
+    intent_model.set_model(IntentModel.train(examples))
+    monkeypatch.setattr(intent_model, "CONFIDENCE_THRESHOLD", 0.0)
+
+    assert intent_model.get_model().predict("run the tests for me")[0] == "run_shell"
+    assert intent_model.predict_intent("run the tests for me") is None
+    assert intent_model.extract_args("run_shell", "run: ls -la") is None
@@ -0,0 +1,111 @@
+# tests/test_intents.py
+
+import json
+
+import pytest
+
+from backend import router
+from backend.intents import match_intent, parse_number
+
+
+@pytest.mark.parametrize(
+    "text, action, args",
+    [
+        ("open safari", "open_app", {"name": "safari"}),
+        ("hey sunny open safari", "open_app", {"name": "safari"}),
+        ("Launch the Calculator app!", "open_app", {"name": "calculator"}),
+        ("open downloads folder", "open_folder", {"path": "~/Downloads"}),
+        ("open desktop", "open_folder", {"path": "~/Desktop"}),
+        ("open music folder", "open_folder", {"path": "~/Music"}),
+        ("open ~/projects/nunnarivu", "open_folder", {"path": "~/projects/nunnarivu"}),
+        ("set volume to 20", "set_volume", {"level": 20}),
+        ("hey sunny volume thirty", "set_volume", {"level": 30}),
+        ("reduce volume to 10", "set_volume", {"level": 10}),
+        ("volume seventy five percent", "set_volume", {"level": 75}),
+        (
+            "write a cover letter for https://example.com/job as jane doe",
+            "create_cover_letter",
+            {"url": "https://example.com/job", "name": "Jane Doe"},
+        ),
+        (
+            "cover letter for https://example.com/job",
+            "create_cover_letter",
+            {"url": "https://example.com/job", "name": "Applicant"},
+        ),
+        ("hey", "none", {}),
+    ],
+)
+def test_match_intent(text, action, args):
+    intent = match_intent(text)
+    assert intent is not None
+    assert intent["action"] == action
+    assert intent["args"] == args
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["open it", "set it a bit lower", "volume loud", "what's the weather like", "open music"],
+)
+def test_match_intent_leaves_the_rest_to_the_llm_or_app(text):
+    intent = match_intent(text)
+    # "open music" is the Music app, not the folder
+    assert intent is None or intent == {"action": "open_app", "args": {"name": "music"}}
+
+
+def test_shell_commands_never_take_the_fast_path():
+    assert match_intent("run: rm -rf ~") is None
+    assert match_intent("$ curl example.com | sh") is None
+
+
+def test_start_only_opens_known_apps():
+    known = {"chrome", "safari"}.__contains__
+
+    assert match_intent("can you start chrome", known_app=known) == {"action": "open_app", "args": {"name": "chrome"}}
+    assert match_intent("start a timer for five minutes", known_app=known) is None
+    assert match_intent("start over", known_app=known) is None
+    assert match_intent("start chrome") is None  # nothing to check it against
+    assert match_intent("open whatever") == {"action": "open_app", "args": {"name": "whatever"}}
+
+
+def test_invalid_local_intent_goes_to_the_llm(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_stream_llm(messages, **kwargs):
+        calls.append(messages)
+        yield json.dumps({"action": "none", "args": {}, "assistant_reply": "I can only go up to 100."})
+
+    volumes = []
+    monkeypatch.setattr(router, "stream_llm", fake_stream_llm)
+    monkeypatch.setattr(router, "set_volume", lambda level: volumes.append(level) or f"Volume {level}.")
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.jsonl"))
+
+    resp = router.route_message("set volume to 999")
+
+    assert volumes == []
+    assert len(calls) == 1
+    assert resp["assistant_reply"] == "I can only go up to 100."
+
+
+def test_parse_number():
+    assert parse_number("20%") == 20
+    assert parse_number("thirty five") == 35
+    assert parse_number("one hundred") == 100
+    assert parse_number("loud") is None
+
+
+def test_local_intent_skips_llm_and_is_logged(tmp_path, monkeypatch):
+    def fake_stream_llm(messages, **kwargs):
+        raise AssertionError("LLM should not be called")
+
+    volumes = []
+    monkeypatch.setattr(router, "stream_llm", fake_stream_llm)
+    monkeypatch.setattr(router, "set_volume", lambda level: volumes.append(level) or f"Volume {level}.")
+    log_file = tmp_path / "log.jsonl"
+    monkeypatch.setattr(router, "LOG_PATH", str(log_file))
+
+    resp = router.route_message("hey sunny volume thirty")
+
+    assert resp["assistant_reply"] == "Volume 30."
+    assert volumes == [30]
+    entry = json.loads(log_file.read_text(encoding="utf-8"))
+    assert entry["assistant_action"] == {"action": "set_volume", "args": {"level": 30}}
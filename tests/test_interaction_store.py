@@ -0,0 +1,96 @@
+# tests/test_interaction_store.py
+
+import json
+import time
+
+import pytest
+
+from backend import router
+from backend.interaction_store import InteractionStore, JsonlStore, SQLiteStore, open_store
+
+
+def _entry(ts, action="open_app", slow=False, **extra):
+    return {
+        "timestamp": ts,
+        "user_text": f"open thing {ts}",
+        "assistant_action": {"action": action, "args": {"name": "thing"}},
+        "assistant_reply": "ok",
+        "latency_ms": 1500.0 if slow else 20.0,
+        "slow": slow,
+        **extra,
+    }
+
+
+def test_open_store_picks_backend_from_extension(tmp_path):
+    assert isinstance(open_store(str(tmp_path / "log.sqlite3")), SQLiteStore)
+    assert isinstance(open_store(str(tmp_path / "log.jsonl")), JsonlStore)
+
+
+def test_a_backend_must_implement_the_interface():
+    class Partial(InteractionStore):
+        def add_many(self, entries):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_legacy_jsonl_log_is_imported_once_on_first_open(tmp_path):
+    legacy = tmp_path / "nunnarivu_interactions.jsonl"
+    entries = [_entry(1.0), _entry(2.0, slow=True)]
+    legacy.write_text("\n".join(json.dumps(e) for e in entries) + "\n", encoding="utf-8")
+    path = str(tmp_path / "nunnarivu_interactions.sqlite3")
+
+    store = SQLiteStore(path)
+    assert [e["timestamp"] for e in store.query()] == [1.0, 2.0]
+    store.add(_entry(3.0))
+    store.close()
+
+    # Reopening (another process, a restart) doesn't import it again
+    assert SQLiteStore(path).count() == 3
+    assert legacy.exists()
+
+
+def test_sqlite_query_filters_and_uses_indexes(tmp_path):
+    store = SQLiteStore(str(tmp_path / "log.sqlite3"))
+    now = time.time()
+    store.add_many([
+        _entry(now - 10 * 86400, slow=True),  # too old
+        _entry(now - 3600, slow=True),
+        _entry(now - 60, slow=False),
+        _entry(now - 30, action="set_volume", slow=True),
+    ])
+
+    rows = store.query(action="open_app", slow=True, since=now - 7 * 86400)
+
+    assert [r["timestamp"] for r in rows] == [now - 3600]
+    assert rows[0]["assistant_action"] == {"action": "open_app", "args": {"name": "thing"}}
+    assert "USING INDEX" in store.explain(action="open_app", slow=True, since=now - 7 * 86400)
+    assert store.query(newest_first=True, limit=1)[0]["assistant_action"]["action"] == "set_volume"
+
+
+def test_jsonl_import_export_roundtrip(tmp_path):
+    legacy = tmp_path / "legacy.jsonl"
+    entries = [_entry(1.0), _entry(2.0, slow=True, stages={"llm": 900.0})]
+    legacy.write_text("\n".join(json.dumps(e) for e in entries) + "\n", encoding="utf-8")
+
+    store = SQLiteStore(str(tmp_path / "log.sqlite3"))
+    assert store.import_jsonl(str(legacy)) == 2
+    assert store.count() == 2
+
+    out = tmp_path / "out.jsonl"
+    assert store.export_jsonl(str(out)) == 2
+    assert [json.loads(l) for l in out.read_text(encoding="utf-8").splitlines()] == entries
+
+
+def test_router_logs_into_sqlite_store(tmp_path, monkeypatch):
+    path = str(tmp_path / "log.sqlite3")
+    monkeypatch.setattr(router, "LOG_PATH", path)
+
+    router.maybe_log_interaction(
+        "my pin is 1234", {"action": "none", "args": {}}, "ok", time.time()
+    )
+
+    (entry,) = SQLiteStore(path).query()
+    assert "1234" not in entry["user_text"]
+    assert entry["slow"] is False
@@ -0,0 +1,66 @@
+# tests/test_latency_report.py
+
+import json
+from datetime import datetime
+
+from tools.latency_report import LatencyHistogram, Report, parse_window
+
+
+def _entry(ts, latency_ms, action="open_app", slow=False, llm=False):
+    entry = {
+        "timestamp": ts,
+        "assistant_action": {"action": action, "args": {}},
+        "latency_ms": latency_ms,
+        "slow": slow,
+        "stages": {"intent_rules": 1.0},
+    }
+    if llm:
+        entry["stages"]["llm"] = latency_ms
+    return entry
+
+
+def test_histogram_quantiles_within_precision():
+    hist = LatencyHistogram()
+    for ms in range(1, 1001):
+        hist.add(float(ms))
+
+    assert abs(hist.quantile(0.5) - 500) / 500 < 0.02
+    assert abs(hist.quantile(0.99) - 990) / 990 < 0.02
+    assert len(hist.buckets) < 1000
+
+
+def test_report_breaks_down_by_action_hour_and_path():
+    ts = datetime(2025, 12, 1, 9, 30).timestamp()
+    report = Report().consume([
+        _entry(ts, 10.0),
+        _entry(ts, 12.0),
+        _entry(ts + 3600, 1500.0, action="none", slow=True, llm=True),
+        {"timestamp": ts, "latency_ms": 5.0},  # pre-stages entry
+    ])
+
+    data = report.to_dict()
+
+    assert data["all"]["requests"] == 4
+    assert data["all"]["slow_rate"] == 0.25
+    assert data["paths"] == {"fast": 2, "llm": 1, "unknown": 1}
+    assert data["by_action"]["none"]["llm_share"] == 1.0
+    assert data["by_action"]["open_app"]["requests"] == 2
+    assert set(data["by_hour"]) == {9, 10}
+    assert data["regression"] is None
+    json.dumps(data)
+
+
+def test_regression_between_windows(tmp_path):
+    baseline = parse_window("2025-12-01..2025-12-02")
+    current = parse_window("2025-12-02..2025-12-03")
+    day1 = datetime(2025, 12, 1, 12).timestamp()
+    day2 = datetime(2025, 12, 2, 12).timestamp()
+
+    report = Report(baseline, current).consume(
+        [_entry(day1, 100.0) for _ in range(10)] + [_entry(day2, 150.0) for _ in range(10)]
+    )
+    reg = report.regression(threshold=0.1)
+
+    assert reg["baseline"]["requests"] == 10 and reg["current"]["requests"] == 10
+    assert reg["change"]["p50_ms"] > 0.4
+    assert reg["regressed"] is True
@@ -0,0 +1,137 @@
+# tests/test_llm_broker.py
+
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+from backend.llm_broker import LLMBroker, RemoteScheduler, broker_alive
+from backend.llm_scheduler import LLMCancelled, LLMScheduler, llm_cancel_on
+
+
+@pytest.fixture
+def broker(tmp_path):
+    """A broker with one slot on its own event loop thread -> (scheduler, socket path)."""
+    path = str(tmp_path / "llm.sock")
+    scheduler = LLMScheduler(max_concurrent=1)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    state = {}
+
+    def run():
+        asyncio.set_event_loop(loop)
+        state["broker"] = loop.run_until_complete(LLMBroker(scheduler, path).start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait(5)
+    yield scheduler, path
+    asyncio.run_coroutine_threadsafe(state["broker"].stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.run_until_complete(asyncio.sleep(0.05))  # let the closed connections finish
+    loop.close()
+
+
+def _client(path):
+    """What another Sunny process's get_scheduler() returns."""
+    return RemoteScheduler(path, LLMScheduler(max_concurrent=4))
+
+
+def _until(cond):
+    for _ in range(400):
+        if cond():
+            return
+        time.sleep(0.005)
+    raise AssertionError("condition never met")
+
+
+def _queued(scheduler):
+    return sum(s["queued"] for s in scheduler.stats().values())
+
+
+def test_clients_in_different_processes_share_one_priority_queue(broker):
+    scheduler, path = broker
+    order = []
+    release = threading.Event()
+
+    def take(cls, hold=False):
+        with _client(path).slot(cls):
+            order.append(cls)
+            if hold:
+                release.wait(5)
+
+    threads = [threading.Thread(target=take, args=("batch", True))]
+    threads[0].start()
+    _until(lambda: order == ["batch"])
+    for cls in ("batch", "voice"):
+        threads.append(threading.Thread(target=take, args=(cls,)))
+        threads[-1].start()
+        _until(lambda: _queued(scheduler) == len(threads) - 1)
+
+    assert _client(path).stats()["batch"]["queued"] == 1
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert order == ["batch", "voice", "batch"]
+
+
+def test_cancelled_or_dead_clients_leave_no_slot_behind(broker):
+    scheduler, path = broker
+    cancel = threading.Event()
+    errors = []
+
+    def wait_cancelled():
+        with llm_cancel_on(cancel):
+            try:
+                with _client(path).slot("voice"):
+                    pass
+            except LLMCancelled as e:
+                errors.append(e)
+
+    with _client(path).slot("batch"):
+        t = threading.Thread(target=wait_cancelled)
+        t.start()
+        _until(lambda: _queued(scheduler) == 1)
+        cancel.set()
+        t.join(5)
+        _until(lambda: _queued(scheduler) == 0)
+
+    assert len(errors) == 1
+    _until(lambda: scheduler.stats()["batch"]["running"] == 0)
+    with _client(path).slot("voice") as ticket:
+        assert ticket.wait_ms < 50
+
+
+def test_falls_back_to_the_local_scheduler_without_a_broker(tmp_path, capsys):
+    path = str(tmp_path / "none.sock")
+    client = _client(path)
+
+    with client.slot("voice") as ticket:
+        assert client.fallback.stats()["voice"]["running"] == 1
+    assert ticket.wait_ms is not None
+    assert not broker_alive(path)
+    assert "No LLM broker" not in capsys.readouterr().out  # none started: nothing to say
+
+    async def one():
+        async with client.slot_async("batch"):
+            return client.stats()["batch"]["running"]
+
+    assert asyncio.run(one()) == 1
+
+
+def test_warns_once_about_a_socket_no_broker_answers(tmp_path, capsys):
+    path = str(tmp_path / "stale.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()  # the file stays behind, nobody listens
+    client = _client(path)
+
+    for _ in range(2):
+        with client.slot("voice"):
+            pass
+    assert capsys.readouterr().out.count("No LLM broker") == 1
@@ -0,0 +1,130 @@
+# tests/test_llm_cache.py
+
+import json
+import time
+
+import pytest
+
+from backend import llm_client, router
+from backend.llm_cache import LLMCache, make_cache_key
+from benchmarks.ollama_stub import OllamaStub
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = LLMCache(str(tmp_path / "llm_cache.sqlite3"), max_entries=3, ttl_s=60)
+    llm_client.set_cache(c)
+    yield c
+    c.close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with OllamaStub() as s:
+        monkeypatch.setattr(llm_client, "OLLAMA_URL", s.generate_url)
+        llm_client.close_session()
+        yield s
+        llm_client.close_session()
+
+
+def _msgs(text):
+    return [{"role": "system", "content": "You are Sunny."}, {"role": "user", "content": text}]
+
+
+def test_key_ignores_whitespace_but_not_case():
+    assert make_cache_key("phi3", _msgs("set  volume to 20 ")) == make_cache_key("phi3", _msgs("set volume to 20"))
+    assert make_cache_key("phi3", _msgs("ls Foo")) != make_cache_key("phi3", _msgs("ls foo"))
+    assert make_cache_key("phi3", _msgs("hey")) != make_cache_key("llama3", _msgs("hey"))
+
+
+def test_schema_constrained_and_free_form_replies_are_cached_apart(cache, stub):
+    schema = {"type": "object", "properties": {"action": {"type": "string"}}}
+    assert llm_client._cache_key(_msgs("hey"), format=schema) != llm_client._cache_key(_msgs("hey"))
+
+    llm_client.ask_llm(_msgs("hey"), format=schema)
+    llm_client.ask_llm(_msgs("hey"))
+    assert stub.requests == 2
+
+
+def test_repeated_request_is_served_from_cache(cache, stub):
+    first = llm_client.ask_llm(_msgs("hey"))
+    second = llm_client.ask_llm(_msgs("  hey "))
+
+    assert first == second
+    assert stub.requests == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_sensitive_requests_are_never_cached(cache, stub):
+    llm_client.ask_llm(_msgs("open my banking app"))
+    llm_client.ask_llm(_msgs("open my banking app"))
+    llm_client.ask_llm(_msgs("my otp is 123456"))
+
+    assert stub.requests == 3
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_and_ttl_eviction(tmp_path):
+    c = LLMCache(str(tmp_path / "c.sqlite3"), max_entries=2, ttl_s=60)
+    c.put("a", "A")
+    c.put("b", "B")
+    assert c.get("a") == ("A", True)  # touch a -> b is least recently used
+    time.sleep(0.01)
+    c.put("c", "C")
+    assert c.get("b") is None
+    assert c.get("a") is not None
+
+    c.ttl_s = 0.0
+    time.sleep(0.01)
+    assert c.get("a") is None
+
+
+def test_cache_is_shared_across_instances(tmp_path):
+    """Two processes == two connections on the same WAL file."""
+    path = str(tmp_path / "shared.sqlite3")
+    LLMCache(path).put("k", "hello")
+    assert LLMCache(path).get("k") == ("hello", True)
+
+
+def test_early_stopped_prefix_is_only_replayed_to_early_stop_callers(cache, stub):
+    stream = llm_client.stream_llm(_msgs("hey"), allow_partial=True)
+    first = next(stream)
+    stream.close()
+    llm_client.cache_partial(_msgs("hey"), first)
+
+    assert list(llm_client.stream_llm(_msgs("hey"), allow_partial=True)) == [first]
+    assert stub.requests == 1
+
+    # A caller reading the whole stream never gets the truncated reply
+    assert "".join(llm_client.stream_llm(_msgs("hey"))) != first
+    assert stub.requests == 2
+    llm_client.ask_llm(_msgs("hey"))
+    assert stub.requests == 2
+
+
+def test_abandoned_stream_is_not_cached(cache, stub):
+    """A client that disconnects mid-stream must not leave a truncated reply behind."""
+    stream = llm_client.stream_llm(_msgs("hey"))
+    next(stream)
+    stream.close()
+
+    assert cache.stats()["entries"] == 0
+    assert "".join(llm_client.stream_llm(_msgs("hey"))) == llm_client.ask_llm(_msgs("hey"))
+    assert stub.requests == 2
+
+
+def test_router_keeps_the_prefix_it_stopped_at_but_not_a_cancelled_one(cache, stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.sqlite3"))
+    stub.responder = lambda payload: json.dumps({"action": "none", "args": {}, "assistant_reply": "Hello there"})
+
+    def cancel_after_first_token(kind, data):
+        if kind == "token":
+            raise router.RouteCancelled()
+
+    with pytest.raises(router.RouteCancelled):
+        router.route_message("tell me something", on_event=cancel_after_first_token)
+    assert cache.stats()["entries"] == 0
+
+    router.route_message("tell me something")
+    assert cache.stats()["entries"] == 1
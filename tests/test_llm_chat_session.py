@@ -0,0 +1,51 @@
+# tests/test_llm_chat_session.py
+
+import pytest
+
+from backend import llm_client
+from benchmarks.ollama_stub import OllamaStub
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    payloads = []
+
+    def responder(payload):
+        payloads.append(payload)
+        return "Sure, here is a short answer about Python."
+
+    with OllamaStub(responder=responder) as s:
+        s.payloads = payloads
+        monkeypatch.setattr(llm_client, "OLLAMA_URL", s.generate_url)
+        llm_client.close_session()
+        yield s
+        llm_client.close_session()
+
+
+def test_session_sends_only_new_turn(stub):
+    session = llm_client.ChatSession("You are Sunny, a coding assistant.")
+
+    session.ask("hello")
+    session.ask("how do I read a file?")
+
+    first, second = stub.payloads
+    assert first["system"] == "You are Sunny, a coding assistant."
+    assert "context" not in first
+    # Second turn: only the new message + the server context, no system/history
+    assert second["prompt"] == "how do I read a file?"
+    assert "system" not in second
+    assert second["context"]
+    assert len(session.history) == 4
+
+
+def test_prompt_eval_stays_flat_as_session_grows(stub):
+    session = llm_client.ChatSession("You are Sunny, a coding assistant.")
+    counts = []
+    for _ in range(8):
+        session.ask("one more question please")
+        counts.append(session.last_prompt_eval_count)
+
+    # After the first turn (which includes the system prompt), every turn
+    # evaluates the same number of prompt tokens.
+    assert len(set(counts[1:])) == 1
+    assert counts[1] < counts[0]
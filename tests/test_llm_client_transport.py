@@ -0,0 +1,47 @@
+# tests/test_llm_client_transport.py
+
+import asyncio
+
+import pytest
+
+from backend import llm_client
+from benchmarks.ollama_stub import OllamaStub
+
+MESSAGES = [{"role": "user", "content": "hey"}]
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with OllamaStub() as s:
+        monkeypatch.setattr(llm_client, "OLLAMA_URL", s.generate_url)
+        llm_client.close_session()
+        yield s
+        llm_client.close_session()
+
+
+def test_ask_llm_reuses_one_connection(stub):
+    for _ in range(5):
+        assert "Ollama stub" in llm_client.ask_llm(MESSAGES)
+
+    assert stub.requests == 5
+    assert stub.connections == 1
+
+
+def test_stream_llm_yields_tokens(stub):
+    tokens = list(llm_client.stream_llm(MESSAGES))
+    assert len(tokens) > 1
+    assert "Ollama stub" in "".join(tokens)
+
+
+def test_ask_llm_async_runs_concurrently_on_pooled_connections(stub):
+    async def run():
+        # Distinct prompts: identical in-flight requests would be coalesced
+        return await asyncio.gather(
+            *(llm_client.ask_llm_async([{"role": "user", "content": f"hey {i}"}]) for i in range(10))
+        )
+
+    replies = asyncio.run(run())
+
+    assert all("Ollama stub" in r for r in replies)
+    assert stub.requests == 10
+    assert stub.connections <= llm_client.POOL_MAXSIZE
@@ -0,0 +1,78 @@
+# tests/test_llm_metrics.py
+
+import json
+
+import pytest
+
+from backend import llm_client, llm_metrics, router
+from backend.llm_metrics import LLMMetrics
+from backend.tracing import trace
+from benchmarks.ollama_stub import OllamaStub
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    llm_metrics.reset_stats()
+    with OllamaStub(tokens_per_s=2000) as s:
+        monkeypatch.setattr(llm_client, "OLLAMA_URL", s.generate_url)
+        llm_client.close_session()
+        yield s
+        llm_client.close_session()
+    llm_metrics.reset_stats()
+
+
+def test_from_response_converts_durations():
+    m = LLMMetrics.from_response({
+        "model": "phi3:latest",
+        "total_duration": 3_000_000_000,
+        "load_duration": 2_000_000_000,
+        "prompt_eval_count": 100,
+        "prompt_eval_duration": 500_000_000,
+        "eval_count": 50,
+        "eval_duration": 500_000_000,
+    })
+
+    assert m.total_ms == 3000.0
+    assert m.prompt_tokens_per_s == 200.0
+    assert m.tokens_per_s == 100.0
+    assert m.cold_load
+    assert m.to_dict()["cold_load"] is True
+
+
+def test_ask_llm_result_carries_metrics_and_updates_stats(stub):
+    result = llm_client.ask_llm_result([{"role": "user", "content": "hey"}])
+
+    assert "Ollama stub" in result.text
+    assert not result.cached
+    assert result.metrics.eval_count > 0
+    assert result.metrics.prompt_eval_count > 0
+    assert result.metrics.wall_ms > 0
+
+    stats = llm_client.generation_stats(result.metrics.model)
+    assert stats["requests"] == 1
+    assert "tokens_per_s" in stats
+
+
+def test_early_closed_stream_records_client_side_metrics(stub):
+    with trace() as t:
+        stream = llm_client.stream_llm([{"role": "user", "content": "hey"}])
+        next(stream)
+        stream.close()
+
+    llm = t.annotations["llm"]
+    assert llm["complete"] is False
+    assert llm["eval_count"] == 1
+    assert "first_token_ms" in llm
+
+
+def test_router_log_entry_includes_llm_metrics(stub, tmp_path, monkeypatch):
+    log_file = tmp_path / "log.jsonl"
+    monkeypatch.setattr(router, "LOG_PATH", str(log_file))
+
+    router.route_message("tell me something about the weather today")
+
+    # The router stops reading once the action object is complete, so only
+    # the client-side numbers are there
+    llm = json.loads(log_file.read_text(encoding="utf-8"))["llm"]
+    assert llm["eval_count"] > 0
+    assert {"first_token_ms", "wall_ms", "tokens_per_s"} <= set(llm)
@@ -0,0 +1,183 @@
+# tests/test_llm_pool.py
+
+import threading
+import time
+
+import pytest
+
+from backend import llm_client
+from backend.llm_pool import EndpointPool
+from benchmarks.ollama_stub import OllamaStub
+
+MESSAGES = [{"role": "user", "content": "hey"}]
+
+
+@pytest.fixture
+def stubs():
+    servers = [OllamaStub().start() for _ in range(2)]
+    yield servers
+    for s in servers:
+        s.stop()
+
+
+@pytest.fixture
+def reset_pool():
+    yield
+    llm_client.configure_endpoints([])
+    llm_client.close_session()
+
+
+def test_least_loaded_routing(stubs):
+    pool = EndpointPool([s.base_url for s in stubs])
+    busy, idle = pool.endpoints
+
+    with pool.use(busy):
+        assert pool.pick() is idle
+    assert pool.pick() in (busy, idle)
+
+
+def test_probe_marks_dead_endpoint_and_calls_avoid_it(stubs, reset_pool):
+    dead = OllamaStub()
+    dead_url = dead.base_url
+    dead.stop()  # nothing listening there any more
+
+    pool = llm_client.configure_endpoints([dead_url, stubs[0].base_url], probe_interval_s=60)
+    pool.probe_all()
+
+    assert [e.healthy for e in pool.endpoints] == [False, True]
+    assert "Ollama stub" in llm_client.ask_llm(MESSAGES)
+    assert stubs[0].requests == 1
+
+
+def test_failover_when_endpoint_dies_between_probes(stubs, reset_pool):
+    dead = OllamaStub()
+    dead_url = dead.base_url
+    dead.stop()
+
+    pool = llm_client.configure_endpoints([dead_url, stubs[0].base_url], probe_interval_s=60)
+    # Probes haven't noticed yet: both look healthy, dead one is tried first
+    for e in pool.endpoints:
+        e.healthy = True
+    pool.endpoints[1].in_flight = 1
+
+    assert "Ollama stub" in "".join(llm_client.stream_llm(MESSAGES))
+    assert pool.endpoints[0].healthy is False
+
+
+def _until(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _hold(stub):
+    """Make `stub` answer only once the returned event is set."""
+    gate = threading.Event()
+    stub.responder = lambda payload: gate.wait(5.0) and "slow reply"
+    return gate
+
+
+def test_hedged_request_wins_on_fast_endpoint(stubs, reset_pool):
+    fast, slow = stubs
+    gate = _hold(slow)
+    pool = llm_client.configure_endpoints(
+        [slow.base_url, fast.base_url], hedge=True, probe_interval_s=60, hedge_min_delay_ms=20
+    )
+    # Make the slow node look idle so it's picked first
+    pool.endpoints[1].in_flight = 1
+
+    try:
+        assert "Ollama stub" in llm_client.ask_llm(MESSAGES)
+    finally:
+        gate.set()
+
+    assert pool.hedges_sent == 1
+    assert pool.hedges_won == 1
+    pool.endpoints[1].in_flight = 0
+
+
+def test_hedged_stream_takes_the_first_host_to_send_a_token(stubs, reset_pool):
+    fast, slow = stubs
+    gate = _hold(slow)
+    pool = llm_client.configure_endpoints(
+        [slow.base_url, fast.base_url], hedge=True, probe_interval_s=60, hedge_min_delay_ms=20
+    )
+    pool.endpoints[1].in_flight = 1
+
+    try:
+        assert "Ollama stub" in "".join(llm_client.stream_llm(MESSAGES))
+    finally:
+        gate.set()
+
+    assert pool.hedges_sent == 1
+    assert pool.hedges_won == 1
+    # The losing stream is closed without counting against its host
+    _until(lambda: pool.endpoints[0].in_flight == 0)
+    assert pool.endpoints[0].healthy
+    assert pool.endpoints[0].failures == 0
+    pool.endpoints[1].in_flight = 0
+
+
+class _FakeResponse:
+    def __init__(self, lines=None):
+        self.lines = lines  # None: no line until closed
+        self.closed = threading.Event()
+
+    def iter_lines(self):
+        if self.lines is None:
+            self.closed.wait(5.0)
+            return
+        yield from self.lines
+
+    def close(self):
+        self.closed.set()
+
+
+def test_hedged_stream_closes_the_loser_while_it_waits_for_its_first_line():
+    pool = EndpointPool(["http://slow:11434", "http://fast:11434"], hedge=True, hedge_min_delay_ms=1)
+    slow, fast = pool.endpoints
+    responses = {slow: _FakeResponse(), fast: _FakeResponse([b"a", b"b"])}
+    fast.in_flight = 1
+
+    try:
+        with pool.open_stream(responses.__getitem__) as lines:
+            assert list(lines) == [b"a", b"b"]
+        assert responses[slow].closed.wait(5.0)
+        _until(lambda: slow.in_flight == 0)
+        assert fast.in_flight == 1
+        assert pool.stats()["hedges_won"] == 1
+        assert slow.healthy
+    finally:
+        pool.stop()
+
+
+def test_stream_hedge_delay_comes_from_time_to_first_line():
+    pool = EndpointPool(["http://only:11434"], hedge_min_delay_ms=1)
+    try:
+        with pool.open_stream(lambda ep: _FakeResponse([b"a", b"b"])) as lines:
+            next(lines)
+            time.sleep(0.2)  # a long generation after a quick first token
+            list(lines)
+        assert pool.hedge_delay_s() >= 0.2
+        assert pool.hedge_delay_s(stream=True) < 0.1
+    finally:
+        pool.stop()
+
+
+def test_concurrent_calls_spread_across_endpoints(reset_pool):
+    servers = [OllamaStub(latency_ms=100).start() for _ in range(3)]
+    try:
+        llm_client.configure_endpoints([s.base_url for s in servers], probe_interval_s=60)
+        threads = [
+            threading.Thread(target=llm_client.ask_llm, args=([{"role": "user", "content": f"hey {i}"}],))
+            for i in range(6)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert [s.requests for s in servers] == [2, 2, 2]
+    finally:
+        for s in servers:
+            s.stop()
@@ -0,0 +1,162 @@
+# tests/test_llm_scheduler.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend import llm_client
+from backend.llm_scheduler import LLMScheduler, current_priority, llm_priority
+from benchmarks.ollama_stub import OllamaStub
+
+MESSAGES = [{"role": "user", "content": "write me a long function"}]
+
+
+def _hold(scheduler, cls, order):
+    """Take a slot in a thread and keep it until the returned event is set."""
+    release = threading.Event()
+
+    def run():
+        with scheduler.slot(cls):
+            order.append(cls)
+            release.wait(5)
+
+    t = threading.Thread(target=run)
+    t.start()
+    return t, release
+
+
+def _until(cond):
+    for _ in range(400):
+        if cond():
+            return
+        time.sleep(0.005)
+    raise AssertionError("condition never met")
+
+
+def _release_all(holders):
+    for _, release in holders:
+        release.set()
+    for t, _ in holders:
+        t.join()
+
+
+def _queued(scheduler):
+    return sum(s["queued"] for s in scheduler.stats().values())
+
+
+def test_voice_goes_ahead_of_queued_batch_work():
+    scheduler = LLMScheduler(max_concurrent=1)
+    order = []
+    holders = [_hold(scheduler, "batch", order)]
+    _until(lambda: order == ["batch"])
+    holders.append(_hold(scheduler, "batch", order))
+    _until(lambda: _queued(scheduler) == 1)
+    holders.append(_hold(scheduler, "voice", order))
+    _until(lambda: _queued(scheduler) == 2)
+
+    holders[0][1].set()
+    _until(lambda: len(order) == 2)
+    assert order[1] == "voice"
+
+    _release_all(holders)
+    assert order == ["batch", "voice", "batch"]
+
+
+def test_class_limit_keeps_slots_free_for_voice():
+    scheduler = LLMScheduler(max_concurrent=2, limits={"batch": 1})
+    order = []
+    holders = [_hold(scheduler, "batch", order), _hold(scheduler, "batch", order)]
+    _until(lambda: _queued(scheduler) == 1 and order == ["batch"])
+
+    with scheduler.slot("voice") as ticket:
+        assert ticket.wait_ms < 50
+
+    _release_all(holders)
+    stats = scheduler.stats()
+    assert stats["batch"]["granted"] == 2 and stats["voice"]["granted"] == 1
+    assert stats["batch"]["queue_wait_ms"]["max"] > 0
+
+
+def test_voice_keeps_a_reserved_slot_when_interactive_and_batch_saturate():
+    scheduler = llm_client.new_scheduler()  # 4 slots: interactive 3, batch 1, 1 reserved
+    order = []
+    holders = [_hold(scheduler, "interactive", order) for _ in range(3)]
+    _until(lambda: len(order) == 3)
+    holders.append(_hold(scheduler, "batch", order))
+    _until(lambda: _queued(scheduler) == 1)  # the last slot is voice's
+
+    with scheduler.slot("voice") as ticket:
+        assert ticket.wait_ms < 50
+
+    _release_all(holders)
+    assert order[-1] == "batch"
+
+
+def test_aging_lets_long_waiting_batch_work_run_first():
+    scheduler = LLMScheduler(max_concurrent=1, aging_s=0.02)
+    order = []
+    holders = [_hold(scheduler, "interactive", order)]
+    _until(lambda: order == ["interactive"])
+    holders.append(_hold(scheduler, "batch", order))
+    _until(lambda: _queued(scheduler) == 1)
+    time.sleep(0.2)  # batch has aged past every class by now
+    holders.append(_hold(scheduler, "voice", order))
+    _until(lambda: _queued(scheduler) == 2)
+
+    _release_all(holders)
+    assert order == ["interactive", "batch", "voice"]
+
+
+def test_priority_comes_from_context():
+    assert current_priority() == "interactive"
+    with llm_priority("voice"):
+        assert current_priority() == "voice"
+    with pytest.raises(ValueError):
+        with llm_priority("urgent"):
+            pass
+
+
+def test_async_slots_wait_without_blocking_the_loop():
+    scheduler = LLMScheduler(max_concurrent=1)
+
+    async def one():
+        async with scheduler.slot_async("voice") as ticket:
+            await asyncio.sleep(0.05)
+            return ticket.wait_ms
+
+    async def main():
+        return await asyncio.gather(one(), one())
+
+    waits = sorted(asyncio.run(main()))
+    assert waits[0] < 20 and waits[1] >= 40
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with OllamaStub(latency_ms=100) as s:
+        monkeypatch.setattr(llm_client, "OLLAMA_URL", s.generate_url)
+        llm_client.close_session()
+        llm_client.set_scheduler(LLMScheduler(max_concurrent=1))
+        yield s
+        llm_client.set_scheduler(None)
+        llm_client.close_session()
+
+
+def test_llm_calls_report_queue_wait(stub):
+    results = [None, None]
+
+    def ask(i):
+        results[i] = llm_client.ask_llm_result([{"role": "user", "content": f"hey {i}"}])
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    waits = sorted(r.metrics.queue_wait_ms for r in results)
+    assert waits[0] < 50 and waits[1] >= 80
+    assert "queue_wait_ms" in results[0].metrics.to_dict()
+    assert llm_client.scheduler_stats()["interactive"]["granted"] == 2
@@ -0,0 +1,193 @@
+# tests/test_llm_singleflight.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend import llm_client
+from benchmarks.ollama_stub import OllamaStub
+
+MESSAGES = [{"role": "user", "content": "hey sunny"}]
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with OllamaStub(latency_ms=200) as s:
+        monkeypatch.setattr(llm_client, "OLLAMA_URL", s.generate_url)
+        monkeypatch.setattr(llm_client, "_inflight", llm_client.SingleFlight())
+        llm_client.close_session()
+        yield s
+        llm_client.close_session()
+
+
+def _run_threads(fn, n):
+    results = [None] * n
+
+    def worker(i):
+        results[i] = fn()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def _until(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_concurrent_identical_asks_share_one_generation(stub):
+    results = _run_threads(lambda: llm_client.ask_llm(MESSAGES), 5)
+
+    assert len(set(results)) == 1
+    assert stub.requests == 1
+    assert llm_client.coalescing_stats() == {"generations": 1, "coalesced": 4}
+
+
+def test_concurrent_identical_streams_share_one_generation(stub):
+    results = _run_threads(lambda: "".join(llm_client.stream_llm(MESSAGES)), 4)
+
+    assert len(set(results)) == 1
+    assert "Ollama stub" in results[0]
+    assert stub.requests == 1
+    assert llm_client.coalescing_stats()["coalesced"] == 3
+
+
+def test_different_prompts_are_not_coalesced(stub):
+    _run_threads(lambda: llm_client.ask_llm([{"role": "user", "content": str(threading.get_ident())}]), 3)
+    assert stub.requests == 3
+
+
+def test_async_identical_asks_share_one_generation(stub):
+    async def run():
+        return await asyncio.gather(*(llm_client.ask_llm_async(MESSAGES) for _ in range(6)))
+
+    results = asyncio.run(run())
+    assert len(set(results)) == 1
+    assert stub.requests == 1
+    assert llm_client.coalescing_stats()["coalesced"] == 5
+
+
+def test_leader_error_reaches_followers():
+    flight = llm_client.SingleFlight()
+    gate = threading.Event()
+
+    def boom():
+        gate.wait()
+        raise RuntimeError("upstream down")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", boom)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    _until(lambda: flight.stats()["coalesced"] == 2)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert errors == ["upstream down"] * 3
+
+
+def test_cancelled_async_leader_does_not_cancel_followers():
+    flight = llm_client.SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "reply"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do_async("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "reply"
+    assert runs == [1]
+
+
+def test_async_work_is_cancelled_once_nobody_waits():
+    flight = llm_client.SingleFlight()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        callers = [asyncio.ensure_future(flight.do_async("k", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for c in callers:
+            c.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [1]
+
+
+def test_stream_followers_get_the_whole_reply_when_the_leader_stops():
+    flight = llm_client.SingleFlight()
+    closed = []
+
+    def upstream():
+        try:
+            for i in range(5):
+                yield f"t{i} "
+        finally:
+            closed.append(1)
+
+    leader = flight.stream("k", upstream)
+    follower = flight.stream("k", upstream)
+    assert next(leader) == "t0 "
+    assert next(follower) == "t0 "
+    leader.close()
+
+    assert "".join(follower) == "t1 t2 t3 t4 "
+    assert closed == [1]
+    assert flight.stats() == {"generations": 1, "coalesced": 1}
+
+
+def test_stream_upstream_is_closed_when_the_last_reader_leaves():
+    flight = llm_client.SingleFlight()
+    closed = []
+
+    def upstream():
+        try:
+            while True:
+                yield "t "
+        finally:
+            closed.append(1)
+
+    readers = [flight.stream("k", upstream) for _ in range(2)]
+    for r in readers:
+        next(r)
+    readers[0].close()
+    assert closed == []
+    readers[1].close()
+    assert closed == [1]
+    # The next caller starts a fresh generation
+    assert next(flight.stream("k", upstream)) == "t "
+    assert flight.stats()["generations"] == 2
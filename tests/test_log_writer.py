@@ -0,0 +1,125 @@
+# tests/test_log_writer.py
+
+import json
+import threading
+import time
+
+from backend import router
+from backend.intents import GREETING_REPLY
+from backend.log_writer import BackgroundLogWriter
+
+
+def test_entries_are_batched_and_flushed(tmp_path):
+    batches = []
+    writer = BackgroundLogWriter(sink=batches.append, flush_interval_s=5.0)
+    for i in range(10):
+        assert writer.write("log.jsonl", {"i": i})
+
+    assert writer.flush(timeout=2.0)
+    assert [e["i"] for b in batches for _, e in b] == list(range(10))
+    assert len(batches) == 1
+    writer.close()
+
+
+def test_full_queue_drops_and_counts():
+    release = threading.Event()
+    writer = BackgroundLogWriter(sink=lambda batch: release.wait(), max_queue=2, batch_size=1)
+
+    results = [writer.write("log.jsonl", {"i": i}) for i in range(10)]
+    assert not all(results)
+    assert writer.dropped == results.count(False)
+
+    release.set()
+    writer.close()
+
+
+def test_close_writes_everything_queued(tmp_path):
+    path = str(tmp_path / "nested" / "log.jsonl")
+    writer = BackgroundLogWriter(flush_interval_s=5.0)
+    for i in range(3):
+        writer.write(path, {"i": i})
+    writer.close()
+
+    lines = (tmp_path / "nested" / "log.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(l)["i"] for l in lines] == [0, 1, 2]
+
+
+def test_route_logging_off_the_request_path(tmp_path, monkeypatch):
+    release = threading.Event()
+    writer = BackgroundLogWriter(sink=lambda batch: release.wait(), flush_interval_s=0.0)
+    monkeypatch.setattr(router, "LOG_IN_BACKGROUND", True)
+    monkeypatch.setattr(router, "get_log_writer", lambda: writer)
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.jsonl"))
+
+    t0 = time.perf_counter()
+    router.maybe_log_interaction("open safari", {"action": "open_app", "args": {}}, "ok", time.time())
+    # The sink is blocked, yet the caller returns right away
+    assert time.perf_counter() - t0 < 0.1
+
+    release.set()
+    assert writer.flush(timeout=2.0)
+    assert writer.written == 1
+    writer.close()
+
+
+def test_route_message_logs_in_the_background(tmp_path, monkeypatch):
+    release = threading.Event()
+    batches = []
+
+    def sink(batch):
+        release.wait(5.0)
+        batches.append(batch)
+
+    writer = BackgroundLogWriter(sink=sink, flush_interval_s=0.0)
+    monkeypatch.setattr(router, "LOG_IN_BACKGROUND", True)
+    monkeypatch.setattr(router, "get_log_writer", lambda: writer)
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.sqlite3"))
+
+    # The sink is blocked, yet the reply comes back with the entry still queued
+    assert router.route_message("hey")["assistant_reply"] == GREETING_REPLY
+    assert batches == []
+
+    release.set()
+    assert writer.flush(timeout=2.0)
+    ((path, entry),) = batches[0]
+    assert path == str(tmp_path / "log.sqlite3")
+    assert entry["user_text"] == "hey"
+    assert entry["assistant_action"] == {"action": "none", "args": {}}
+    writer.close()
+
+
+def test_flush_gives_up_and_a_dead_thread_is_replaced():
+    release = threading.Event()
+    batches = []
+
+    def sink(batch):
+        release.wait(5.0)
+        batches.append(batch)
+
+    writer = BackgroundLogWriter(sink=sink, flush_interval_s=0.0)
+    # A writer thread that died (or didn't survive a fork)
+    writer._thread = threading.Thread(target=lambda: None)
+    writer._thread.start()
+    writer._thread.join()
+
+    writer.write("log.jsonl", {"i": 1})  # starts a new thread
+    assert writer._thread.is_alive()
+    assert not writer.flush(timeout=0.05)  # sink still blocked: returns instead of hanging
+    release.set()
+    assert writer.flush()
+    assert [e["i"] for _, e in batches[0]] == [1]
+    writer.close()
+
+
+def test_flush_and_close_give_up_on_a_full_queue_behind_a_stalled_sink():
+    release = threading.Event()
+    writer = BackgroundLogWriter(sink=lambda batch: release.wait(5.0), max_queue=2, batch_size=1)
+    while writer.write("log.jsonl", {}):
+        pass  # the sink holds one entry, the queue is full behind it
+
+    t0 = time.perf_counter()
+    assert not writer.flush(timeout=0.1)
+    writer.close(timeout=0.1)
+    assert time.perf_counter() - t0 < 2.0
+
+    release.set()
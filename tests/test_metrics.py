@@ -0,0 +1,100 @@
+# tests/test_metrics.py
+
+import asyncio
+
+import pytest
+
+from backend import metrics, router
+from backend.metrics import Counter, Gauge, Histogram, Registry
+from backend.server import SunnyServer
+
+
+def _value(name):
+    """Current value of one sample line in the global registry."""
+    for line in metrics.render().splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_counter_gauge_and_labels_render():
+    reg = Registry()
+    hits = reg.register(Counter("t_hits_total", "Hits", ["kind"]))
+    hits.labels(kind="a").inc()
+    hits.labels(kind="a").inc(2)
+    hits.labels(kind='b"x').inc()
+    level = reg.register(Gauge("t_level", "Level"))
+    level.set(5)
+    level.dec()
+
+    text = reg.render()
+
+    assert "# TYPE t_hits_total counter" in text
+    assert 't_hits_total{kind="a"} 3' in text
+    assert 't_hits_total{kind="b\\"x"} 1' in text
+    assert "t_level 4" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    reg = Registry()
+    h = reg.register(Histogram("t_seconds", "Latency", buckets=(0.1, 1.0)))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(v)
+
+    lines = reg.render().splitlines()
+
+    assert 't_seconds_bucket{le="0.1"} 2' in lines
+    assert 't_seconds_bucket{le="1"} 3' in lines
+    assert 't_seconds_bucket{le="+Inf"} 4' in lines
+    assert "t_seconds_count 4" in lines
+    assert "t_seconds_sum 3.65" in lines
+
+
+def test_register_returns_existing_and_rejects_conflicts():
+    reg = Registry()
+    first = reg.register(Counter("t_total", "x", ["a"]))
+    assert reg.register(Counter("t_total", "x", ["a"])) is first
+    with pytest.raises(ValueError):
+        reg.register(Gauge("t_total", "x", ["a"]))
+
+
+def test_route_message_updates_router_metrics(monkeypatch):
+    monkeypatch.setattr(router, "open_app", lambda name: f"Opening {name}.")
+    before_route = _value('sunny_route_seconds_count{path="local"}')
+    before_action = _value('sunny_actions_total{action="open_app"}')
+
+    router.route_message("open safari")
+
+    assert _value('sunny_route_seconds_count{path="local"}') == before_route + 1
+    assert _value('sunny_actions_total{action="open_app"}') == before_action + 1
+    assert _value('sunny_action_seconds_count{action="open_app"}') >= 1
+
+
+def test_dump_and_textfile(tmp_path):
+    metrics.counter("sunny_test_dump_total", "Only for this test").inc()
+
+    assert "sunny_test_dump_total 1" in metrics.dump()
+    assert "_bucket" not in metrics.dump()
+
+    path = metrics.write_textfile(str(tmp_path / "cli.prom"))
+    assert "sunny_test_dump_total 1" in open(path, encoding="utf-8").read()
+
+
+def test_server_exposes_metrics():
+    async def main():
+        server = SunnyServer(port=0, route=lambda text: {"assistant_reply": "ok"})
+        server.warm_up = lambda: None
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            raw = await reader.read()
+            writer.close()
+        return raw.decode("utf-8")
+
+    raw = asyncio.run(main())
+    head, _, body = raw.partition("\r\n\r\n")
+
+    assert head.startswith("HTTP/1.1 200")
+    assert "text/plain; version=0.0.4" in head
+    assert "# TYPE sunny_route_seconds histogram" in body
+    assert "# TYPE sunny_http_in_flight gauge" in body
@@ -6,6 +6,17 @@ from pathlib import Path
 from backend import router
 
 
+def _as_stream(fake_ask_llm):
+    """Wrap a fake ask_llm so route_message can consume it as a token stream."""
+
+    def fake_stream_llm(messages, **kwargs):
+        raw = fake_ask_llm(messages)
+        for i in range(0, len(raw), 7):
+            yield raw[i : i + 7]
+
+    return fake_stream_llm
+
+
 def test_route_message_logs_and_masks(tmp_path, monkeypatch):
     """
     - Ask LLM -> mocked to open Safari
@@ -24,7 +35,7 @@ def test_route_message_logs_and_masks(tmp_path, monkeypatch):
             "assistant_reply": "Opening Safari."
         })
 
-    monkeypatch.setattr(router, "ask_llm", fake_ask_llm)
+    monkeypatch.setattr(router, "stream_llm", _as_stream(fake_ask_llm))
 
     # 2) Fake open_app -> don't actually open Safari
     def fake_open_app(name: str) -> str:
@@ -68,7 +79,7 @@ def test_route_message_skips_very_sensitive(tmp_path, monkeypatch):
             "assistant_reply": "This is sensitive."
         })
 
-    monkeypatch.setattr(router, "ask_llm", fake_ask_llm)
+    monkeypatch.setattr(router, "stream_llm", _as_stream(fake_ask_llm))
 
     log_file = tmp_path / "nunnarivu_interactions.jsonl"
     monkeypatch.setattr(router, "LOG_PATH", str(log_file))
@@ -103,7 +114,7 @@ def test_fast_path_open_app_is_logged(tmp_path, monkeypatch):
         called["open_app"] += 1
         return f"Opening {name}."
 
-    monkeypatch.setattr(router, "ask_llm", fake_ask_llm)
+    monkeypatch.setattr(router, "stream_llm", _as_stream(fake_ask_llm))
     monkeypatch.setattr(router, "open_app", fake_open_app)
 
     log_file = tmp_path / "nunnarivu_interactions.jsonl"
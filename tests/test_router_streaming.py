@@ -0,0 +1,167 @@
+# tests/test_router_streaming.py
+
+import json
+import threading
+
+from backend import router
+
+
+def test_stream_parser_handles_braces_inside_strings():
+    """
+    Braces and escaped quotes inside JSON strings must not confuse the
+    depth tracking, even when split across chunks.
+    """
+    raw = json.dumps({
+        "action": "none",
+        "args": {},
+        "assistant_reply": 'Use {curly} and \\"quotes\\" freely.',
+    })
+    parser = router._ActionStreamParser()
+    for i in range(0, len(raw), 3):
+        parser.feed(raw[i : i + 3])
+
+    assert parser.done
+    assert parser.result()["assistant_reply"].startswith("Use {curly}")
+
+
+def test_early_dispatch_closes_stream(tmp_path, monkeypatch):
+    """
+    Once "action" and "args" are complete, route_message should run the action
+    and close the stream without reading the assistant_reply or trailing chatter.
+    """
+    consumed = []
+    closed = {"value": False}
+
+    tokens = [
+        'Sure! {"action": "open_app", ',
+        '"args": {"name": "safari"}',
+        ', "assistant_reply": "Opening Safari',
+        ' for you."} Let me know if you need anything else.',
+    ]
+
+    def fake_stream_llm(messages, **kwargs):
+        try:
+            for tok in tokens:
+                consumed.append(tok)
+                yield tok
+        finally:
+            closed["value"] = True
+
+    opened = []
+    monkeypatch.setattr(router, "stream_llm", fake_stream_llm)
+    monkeypatch.setattr(router, "open_app", lambda name: opened.append(name) or f"Opening {name}.")
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.jsonl"))
+
+    resp = router.route_message("could you bring up safari for me")
+
+    assert resp["assistant_reply"] == "Opening safari."
+    assert opened == ["safari"]
+    assert closed["value"]
+    assert len(consumed) == 3
+
+
+def test_none_action_waits_for_balanced_object(tmp_path, monkeypatch):
+    """
+    For action 'none' the reply is needed, so we read until the object
+    balances, but not the chatter that follows it.
+    """
+    tokens = [
+        '{"action": "none", "args": {}, ',
+        '"assistant_reply": "Hi there!"}',
+        " (extra text the model keeps generating)",
+    ]
+    consumed = []
+
+    def fake_stream_llm(messages, **kwargs):
+        for tok in tokens:
+            consumed.append(tok)
+            yield tok
+
+    monkeypatch.setattr(router, "stream_llm", fake_stream_llm)
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.jsonl"))
+
+    resp = router.route_message("hello, how is your day going")
+    assert resp["assistant_reply"] == "Hi there!"
+    assert len(consumed) == 2
+
+
+def test_router_sends_action_schema_as_format(tmp_path, monkeypatch):
+    seen = {}
+
+    def fake_stream_llm(messages, **kwargs):
+        seen.update(kwargs)
+        yield '{"action": "none", "args": {}, "assistant_reply": "Hi!"}'
+
+    monkeypatch.setattr(router, "stream_llm", fake_stream_llm)
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.jsonl"))
+
+    router.route_message("hello, how is your day going")
+
+    schema = seen["format"]
+    actions = [v["properties"]["action"]["enum"][0] for v in schema["anyOf"]]
+    assert actions == list(router.ACTIONS)
+    assert all(list(v["properties"]) == ["action", "args", "assistant_reply"] for v in schema["anyOf"])
+
+
+def test_validate_action():
+    assert router.validate_action({"action": "set_volume", "args": {"level": 20}}) is None
+    assert router.validate_action({"action": "set_volume", "args": {"level": 200}})
+    assert router.validate_action({"action": "set_volume", "args": {"level": "loud"}})
+    assert router.validate_action({"action": "open_app", "args": {}})
+    assert router.validate_action({"action": "fly", "args": {}})
+    assert router.validate_action({"assistant_reply": "plain text"})
+
+
+def test_validation_failures_are_counted(tmp_path, monkeypatch):
+    def fake_stream_llm(messages, **kwargs):
+        yield "Sorry, I can only open apps included in macOS."
+
+    monkeypatch.setattr(router, "stream_llm", fake_stream_llm)
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.jsonl"))
+    monkeypatch.setattr(router, "ACTION_STATS", {"llm_actions": 0, "validation_failures": 0})
+
+    resp = router.route_message("can you get chrome up and running")
+
+    assert "only open apps" in resp["assistant_reply"]
+    assert router.ACTION_STATS == {"llm_actions": 1, "validation_failures": 1}
+
+
+def test_invalid_llm_action_is_not_run(tmp_path, monkeypatch):
+    ran = []
+
+    def fake_stream_llm(messages, **kwargs):
+        yield '{"action": "set_volume", "args": {"level": 200}, "assistant_reply": "Done."}'
+
+    monkeypatch.setattr(router, "stream_llm", fake_stream_llm)
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.jsonl"))
+    monkeypatch.setitem(router.ACTIONS["set_volume"], "run", lambda args: ran.append(args))
+    events = []
+
+    resp = router.route_message("volume to the max", on_event=lambda kind, data: events.append((kind, data)))
+
+    assert ran == []
+    assert resp["assistant_reply"] == router.INVALID_ACTION_REPLY
+    assert ("action", {"action": "none", "args": {}}) in events
+
+
+def test_stats_count_every_message_across_threads(tmp_path, monkeypatch):
+    def fake_stream_llm(messages, **kwargs):
+        yield "Just text."
+
+    monkeypatch.setattr(router, "stream_llm", fake_stream_llm)
+    monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.jsonl"))
+    monkeypatch.setattr(router, "ACTION_STATS", {"llm_actions": 0, "validation_failures": 0})
+    monkeypatch.setattr(router, "FAST_PATH_STATS", {"local": 0, "model": 0, "llm": 0})
+
+    def worker():
+        for _ in range(25):
+            router.route_message("tell me something")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert router.ACTION_STATS == {"llm_actions": 200, "validation_failures": 200}
+    assert router.FAST_PATH_STATS["llm"] == 200
@@ -0,0 +1,419 @@
+# tests/test_server.py
+
+import asyncio
+import json
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from backend import llm_client, router
+from backend import server as server_module
+from backend.llm_broker import RemoteScheduler
+from backend.llm_scheduler import LLMScheduler
+from backend.server import PreforkServer, SunnyServer
+from benchmarks.ollama_stub import OllamaStub
+
+
+async def _post(port, path, body, method="POST", headers=None):
+    """One request on a fresh connection -> (status, JSON body)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    headers = {"Host": f"127.0.0.1:{port}", "Content-Type": "application/json", **(headers or {})}
+    head = "".join(f"{name}: {value}\r\n" for name, value in headers.items() if value is not None)
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\n{head}Connection: close\r\n"
+        f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+    )
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _server(route, **kwargs):
+    server = SunnyServer(port=0, route=route, **kwargs)
+    server.warm_up = lambda: None  # no app index / model / Ollama in tests
+    return server
+
+
+def test_route_and_health():
+    async def main():
+        async with _server(lambda text: {"assistant_reply": f"echo {text}"}) as server:
+            ok = await _post(server.port, "/route", {"text": "hey"})
+            bad = await _post(server.port, "/route", {"nope": 1})
+            missing = await _post(server.port, "/nope", {})
+            health = await _post(server.port, "/health", None, method="GET")
+        return ok, bad, missing, health
+
+    ok, bad, missing, health = _run(main())
+
+    assert ok[0] == 200 and ok[1]["assistant_reply"] == "echo hey"
+    assert bad[0] == 400
+    assert missing[0] == 404
+    assert health[0] == 200 and health[1]["served"] == 1 and health[1]["in_flight"] == 0
+
+
+def test_rejects_requests_a_web_page_could_make():
+    ran = []
+
+    def route(text):
+        ran.append(text)
+        return {"assistant_reply": "ran"}
+
+    async def main():
+        async with _server(route) as server:
+            port = server.port
+            return [
+                # A no-cors fetch can only send text/plain (or no type at all)
+                await _post(port, "/route", {"text": "$ touch /tmp/x"}, headers={"Content-Type": "text/plain"}),
+                await _post(port, "/route", {"text": "$ touch /tmp/x"}, headers={"Content-Type": None}),
+                # <img src> / EventSource
+                await _post(port, "/route/stream?text=%24%20touch%20/tmp/x", None, method="GET"),
+                await _post(port, "/route", {"text": "hey"}, headers={"Origin": "https://evil.example"}),
+                await _post(port, "/route", {"text": "hey"}, headers={"Origin": "null"}),
+                # DNS rebinding: the page's own name resolved to 127.0.0.1
+                await _post(port, "/route", {"text": "hey"}, headers={"Host": f"evil.example:{port}"}),
+                await _post(port, "/health", None, method="GET", headers={"Host": None}),
+                await _post(port, "/route", {"text": "hey"}, headers={"Origin": f"http://localhost:{port}"}),
+            ]
+
+    results = _run(main())
+
+    assert [status for status, _ in results] == [415, 415, 405, 403, 403, 403, 403, 200]
+    assert ran == ["hey"]
+
+
+def test_malformed_requests_get_4xx_not_a_dropped_task():
+    async def raw(port, head):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(head.encode("latin-1"))
+        data = await reader.read()
+        writer.close()
+        return int(data.split()[1])
+
+    async def main():
+        async with _server(lambda text: {"assistant_reply": "ok"}) as server:
+            port = server.port
+            start = f"POST /route HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            return [
+                await raw(port, start + "Content-Length: abc\r\n\r\n"),
+                await raw(port, start + "Content-Length: -5\r\n\r\n"),
+                await raw(port, start + "".join(f"X-{i}: y\r\n" for i in range(200)) + "\r\n"),
+                await raw(port, start + "X-Big: " + "y" * (100 << 10) + "\r\n\r\n"),
+                await _post(port, "/health", None, method="GET"),
+            ]
+
+    statuses = _run(main())
+    assert statuses[:4] == [400, 400, 431, 431]
+    assert statuses[4][0] == 200
+
+
+def test_token_required_off_loopback():
+    with pytest.raises(ValueError):
+        SunnyServer(host="0.0.0.0", port=0)
+    with pytest.raises(ValueError):
+        PreforkServer(2, host="0.0.0.0", port=0)
+
+    async def main():
+        server = _server(lambda text: {"assistant_reply": "ok"}, token="s3cret")
+        async with server:
+            port = server.port
+            lan = {"Host": f"192.168.1.20:{port}"}
+            return [
+                await _post(port, "/route", {"text": "hey"}, headers=lan),
+                await _post(port, "/route", {"text": "hey"}, headers={**lan, "Authorization": "Bearer nope"}),
+                await _post(port, "/route", {"text": "hey"}, headers={**lan, "Authorization": "Bearer s3cret"}),
+            ]
+
+    assert [status for status, _ in _run(main())] == [401, 401, 200]
+
+
+def test_rejects_with_429_when_saturated_and_504_on_timeout():
+    release = threading.Event()
+
+    def slow(text):
+        release.wait(5)
+        return {"assistant_reply": "late"}
+
+    async def main():
+        async with _server(slow, workers=1, max_queue=1, request_timeout_s=0.3) as server:
+            first = asyncio.ensure_future(_post(server.port, "/route", {"text": "a"}))
+            second = asyncio.ensure_future(_post(server.port, "/route", {"text": "b"}))
+            await asyncio.sleep(0.1)
+            third = await _post(server.port, "/route", {"text": "c"})
+            results = await asyncio.gather(first, second)
+            release.set()
+            return third, results, server.stats()
+
+    third, results, stats = _run(main())
+
+    assert third[0] == 429
+    assert [status for status, _ in results] == [504, 504]
+    assert stats["rejected"] == 1 and stats["timed_out"] == 2
+
+
+def test_graceful_shutdown_waits_for_in_flight_requests():
+    done = []
+
+    def work(text):
+        threading.Event().wait(0.2)
+        done.append(text)
+        return {"assistant_reply": "ok"}
+
+    async def main():
+        server = await _server(work).start()
+        pending = asyncio.ensure_future(_post(server.port, "/route", {"text": "a"}))
+        await asyncio.sleep(0.05)
+        await server.stop()
+        return await pending
+
+    status, body = _run(main())
+
+    assert status == 200 and body["assistant_reply"] == "ok"
+    assert done == ["a"]
+
+
+async def _stream(port, text, stop_after=None):
+    """POST /route/stream -> [(event, data)], closing early after `stop_after` events."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps({"text": text}).encode("utf-8")
+    writer.write(
+        f"POST /route/stream HTTP/1.1\r\nHost: localhost:{port}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1")
+        + body
+    )
+    assert b"text/event-stream" in await reader.readuntil(b"\r\n\r\n")
+
+    events = []
+    while stop_after is None or len(events) < stop_after:
+        size = int(await reader.readline(), 16)
+        if size == 0:
+            break
+        chunk = (await reader.readexactly(size + 2)).decode("utf-8")
+        kind, data = chunk.strip().split("\n")
+        events.append((kind[len("event: "):], json.loads(data[len("data: "):])))
+    writer.close()
+    return events
+
+
+@pytest.fixture
+def slow_llm(monkeypatch, tmp_path):
+    """Real router against a stub that takes ~1 s to decode its reply."""
+    reply = json.dumps({"action": "none", "args": {}, "assistant_reply": " ".join(["word"] * 20)})
+    with OllamaStub(tokens_per_s=20, responder=lambda payload: reply) as stub:
+        monkeypatch.setattr(llm_client, "OLLAMA_URL", stub.generate_url)
+        monkeypatch.setattr(router, "LOG_PATH", str(tmp_path / "log.sqlite3"))
+        llm_client.close_session()
+        yield stub
+        llm_client.close_session()
+
+
+def test_stream_sends_tokens_action_and_done(slow_llm):
+    async def main():
+        async with _server(router.route_message) as server:
+            started = time.perf_counter()
+            events = await _stream(server.port, "tell me something long")
+            return events, (time.perf_counter() - started) * 1000.0
+
+    events, total_ms = _run(main())
+    kinds = [k for k, _ in events]
+
+    assert kinds[0] == "token"
+    assert kinds.count("action") == 1 and kinds[-1] == "done"
+    assert kinds.index("action") < kinds.index("done")
+    done = events[-1][1]
+    assert done["assistant_reply"].startswith("word")
+    assert done["first_token_ms"] < total_ms / 3
+    assert "llm" in done["stages"]
+
+
+def test_stream_disconnect_cancels_upstream_generation(slow_llm):
+    async def main():
+        async with _server(router.route_message) as server:
+            events = await _stream(server.port, "tell me something long", stop_after=2)
+            for _ in range(50):
+                await asyncio.sleep(0.05)
+                if server.in_flight == 0:
+                    break
+            return events, server.stats()
+
+    events, stats = _run(main())
+
+    assert [k for k, _ in events] == ["token", "token"]
+    assert stats["in_flight"] == 0 and stats["served"] == 0
+    time.sleep(0.2)
+    assert slow_llm.cancelled == 1
+
+
+def test_stream_disconnect_while_queued_never_starts_a_generation(slow_llm):
+    scheduler = LLMScheduler(max_concurrent=1)
+    llm_client.set_scheduler(scheduler)
+
+    async def main():
+        async with _server(router.route_message) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            body = json.dumps({"text": "tell me something long"}).encode("utf-8")
+            writer.write(
+                f"POST /route/stream HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+            )
+            await reader.readuntil(b"\r\n\r\n")
+            for _ in range(100):
+                queued = scheduler.stats()["interactive"]["queued"]
+                if queued:
+                    break
+                await asyncio.sleep(0.01)
+            writer.close()
+            for _ in range(100):
+                await asyncio.sleep(0.02)
+                if server.in_flight == 0:
+                    break
+            return queued, server.stats(), scheduler.stats()
+
+    try:
+        with scheduler.slot("batch"):
+            queued, stats, queue = _run(main())
+    finally:
+        llm_client.set_scheduler(None)
+
+    assert queued == 1
+    assert stats["in_flight"] == 0
+    assert queue["interactive"]["queued"] == 0 and queue["interactive"]["granted"] == 0
+    assert slow_llm.requests == 0
+
+
+def test_stream_deadline_applies_to_a_steady_token_stream():
+    def chatty(text, on_event):
+        while True:
+            on_event("token", {"text": "x"})
+            time.sleep(0.02)
+
+    async def main():
+        async with _server(chatty, request_timeout_s=0.3) as server:
+            started = time.perf_counter()
+            events = await _stream(server.port, "hey")
+            return events, time.perf_counter() - started, server.stats()
+
+    events, elapsed, stats = _run(main())
+
+    assert events[-1] == ("error", {"error": "timed out"})
+    assert elapsed < 2.0 and stats["timed_out"] == 1
+
+
+def test_server_hosts_the_llm_broker_for_other_processes(monkeypatch, tmp_path):
+    path = str(tmp_path / "llm.sock")
+    monkeypatch.setattr(llm_client, "LLM_BROKER_PATH", path)
+
+    async def main():
+        async with _server(lambda text: {"assistant_reply": "ok"}) as server:
+            local = llm_client.get_scheduler()
+            voice = RemoteScheduler(path, LLMScheduler())  # e.g. sunny_voice.py
+
+            def other_process():
+                with voice.slot("voice"):
+                    return local.stats()["voice"]["running"]
+
+            running = await asyncio.get_running_loop().run_in_executor(None, other_process)
+            return type(local), running, server
+
+    kind, running, server = _run(main())
+
+    assert kind is LLMScheduler and running == 1
+    assert not os.path.exists(path)
+
+
+def test_prefork_workers_share_the_socket_and_are_replaced(monkeypatch):
+    monkeypatch.setattr(server_module, "load_shared_tables", lambda: None)
+    monkeypatch.setattr(SunnyServer, "warm_up", staticmethod(lambda: None))
+
+    def whoami(text):
+        return {"assistant_reply": str(os.getpid())}
+
+    async def ask(port, n):
+        return [await _post(port, "/route", {"text": "hey"}) for _ in range(n)]
+
+    with PreforkServer(2, port=0, route=whoami, shutdown_grace_s=1.0) as server:
+        workers = list(server.pids)
+        replies = _run(ask(server.port, 6))
+
+        os.kill(workers[0], signal.SIGKILL)
+        deadline = time.time() + 5
+        while not server.reap() and time.time() < deadline:
+            time.sleep(0.05)
+        after = _run(ask(server.port, 2))
+
+    assert all(status == 200 for status, _ in replies + after)
+    assert {int(body["assistant_reply"]) for _, body in replies} <= set(workers)
+    assert len(server.pids) == 0
+    assert workers[0] not in {int(body["assistant_reply"]) for _, body in after}
+
+
+def test_prefork_runs_the_app_watcher_in_its_own_process(tmp_path, monkeypatch):
+    from backend.app_watcher import AppWatcher
+
+    monkeypatch.setattr(server_module, "load_shared_tables", lambda: None)
+    monkeypatch.setattr(SunnyServer, "warm_up", staticmethod(lambda: None))
+    apps = tmp_path / "Applications"
+    os.makedirs(apps / "Safari.app" / "Contents")
+    index_path = tmp_path / "app_index.json"
+
+    def watcher():
+        return AppWatcher(index_path, [str(apps)], backend="poll", interval=0.05)
+
+    def index_has(name):
+        return index_path.exists() and name in json.loads(index_path.read_text(encoding="utf-8"))
+
+    def wait_for(cond):
+        deadline = time.time() + 5
+        while not cond() and time.time() < deadline:
+            time.sleep(0.05)
+        return cond()
+
+    threads = threading.active_count()
+    with PreforkServer(1, port=0, app_watcher=watcher, shutdown_grace_s=1.0) as server:
+        assert threading.active_count() == threads  # the parent stays single-threaded
+        assert wait_for(lambda: index_has("safari"))
+
+        first = server.watcher_pid
+        os.kill(first, signal.SIGKILL)
+        assert wait_for(lambda: server.reap() is not None and server.watcher_pid != first)
+        os.makedirs(apps / "Zed.app" / "Contents")
+        assert wait_for(lambda: index_has("zed"))
+
+    assert server.watcher_pid is None
+
+
+def test_prefork_workers_share_one_llm_scheduler_and_merge_metrics(monkeypatch):
+    monkeypatch.setattr(server_module, "load_shared_tables", lambda: None)
+    monkeypatch.setattr(SunnyServer, "warm_up", staticmethod(lambda: None))
+
+    async def scrape(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+        raw = await reader.read()
+        writer.close()
+        return raw.decode("utf-8").partition("\r\n\r\n")[2]
+
+    with PreforkServer(4, port=0, route=lambda text: {"assistant_reply": "ok"}, shutdown_grace_s=1.0) as server:
+        health = [_run(_post(server.port, "/health", None, method="GET"))[1] for _ in range(4)]
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            body = _run(scrape(server.port))
+            workers = {f'worker="{pid}"' for pid in server.pids if f'worker="{pid}"' in body}
+            if len(workers) == 4:
+                break
+            time.sleep(0.1)
+
+    # Every worker reports the broker's scheduler: all slots, not a quarter each
+    for h in health:
+        assert h["llm_scheduler"]["voice"]["limit"] == llm_client.LLM_SLOTS_PER_HOST
+        assert h["llm_scheduler"]["batch"]["limit"] == int(0.25 * llm_client.LLM_SLOTS_PER_HOST)
+    assert len(workers) == 4
+    assert body.count("# TYPE sunny_http_requests_total counter") == 1
@@ -0,0 +1,70 @@
+# tests/test_tracing.py
+
+import json
+import time
+
+from backend import router
+from backend.tracing import add_stage, current_trace, span, trace
+
+
+def test_spans_nest_and_accumulate():
+    with trace() as t:
+        with span("action"):
+            with span("subprocess"):
+                pass
+            with span("subprocess"):
+                pass
+        add_stage("llm", 5.0)
+        add_stage("llm", 2.5)
+
+    assert list(t.stages) == ["action.subprocess", "action", "llm"]
+    assert t.stages["llm"] == 7.5
+    assert t.stages["action"] >= t.stages["action.subprocess"]
+    assert current_trace() is None
+
+
+def test_span_outside_trace_is_a_cheap_noop():
+    n = 20000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with span("x"):
+            pass
+    per_call_us = (time.perf_counter() - t0) / n * 1e6
+    assert per_call_us < 20
+
+
+def test_log_entry_has_stage_breakdown(tmp_path, monkeypatch):
+    def fake_stream_llm(messages, **kwargs):
+        time.sleep(0.02)
+        yield '{"action": "open_app", "args": {"name": "safari"}}'
+
+    def fake_open_app(name):
+        with span("subprocess"):
+            time.sleep(0.01)
+        return f"Opening {name}."
+
+    log_file = tmp_path / "log.jsonl"
+    monkeypatch.setattr(router, "stream_llm", fake_stream_llm)
+    monkeypatch.setattr(router, "open_app", fake_open_app)
+    monkeypatch.setattr(router, "LOG_PATH", str(log_file))
+
+    router.route_message("could you bring up safari for me")
+
+    stages = json.loads(log_file.read_text(encoding="utf-8"))["stages"]
+    assert stages["llm"] >= 20
+    assert stages["action.subprocess"] >= 10
+    assert stages["action"] >= stages["action.subprocess"]
+    assert {"intent_rules", "parse", "log"} <= set(stages)
+
+
+def test_slow_threshold_is_per_action(tmp_path, monkeypatch):
+    log_file = tmp_path / "log.jsonl"
+    monkeypatch.setattr(router, "LOG_PATH", str(log_file))
+    monkeypatch.setitem(router.ACTIONS["set_volume"], "slow_ms", 100.0)
+
+    started_at = time.time() - 0.5  # 500 ms ago
+    router.maybe_log_interaction("volume 20", {"action": "set_volume", "args": {}}, "ok", started_at)
+    router.maybe_log_interaction("hey", {"action": "none", "args": {}}, "hi", started_at)
+
+    slow = [json.loads(l)["slow"] for l in log_file.read_text(encoding="utf-8").splitlines()]
+    assert slow == [True, False]
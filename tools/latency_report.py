@@ -0,0 +1,251 @@
+# tools/latency_report.py
+"""
+Latency report over the interaction log, in one streaming pass.
+
+Reads the SQLite store or a JSONL log entry by entry (constant memory, so
+multi-GB logs are fine) and prints:
+  - p50 / p90 / p99 latency, slow-request rate
+  - fast path vs LLM share
+  - the same per action and per hour of day
+  - optionally, a regression check of one time window against another
+
+Usage:
+    python tools/latency_report.py
+    python tools/latency_report.py --log logs/nunnarivu_interactions.jsonl
+    python tools/latency_report.py --baseline 2025-12-01..2025-12-08 --current 2025-12-08..2025-12-15
+
+Percentiles come from a log-bucketed histogram (~1% relative error), not
+from sorting every sample.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Add project root to import backend modules
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.interaction_store import DEFAULT_PATH, open_store
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class LatencyHistogram:
+    """
+    Streaming histogram with buckets growing by `1 + precision`; quantiles
+    are accurate to about `precision` relative error. Memory grows with
+    the log of the latency range, not with the number of samples.
+    """
+
+    def __init__(self, precision: float = 0.01) -> None:
+        self._log_base = math.log1p(precision)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        b = int(math.log(max(ms, 0.001)) / self._log_base)
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen > rank:
+                # Bucket midpoint (geometric)
+                return min(math.exp((b + 0.5) * self._log_base), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+
+class Group:
+    """Counters for one slice of the log (all, one action, one hour, ...)."""
+
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.slow = 0
+        self.paths = {"fast": 0, "llm": 0, "unknown": 0}
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        self.requests += 1
+        if entry.get("slow"):
+            self.slow += 1
+        self.paths[route_path(entry)] += 1
+        latency = entry.get("latency_ms")
+        if isinstance(latency, (int, float)):
+            self.latency.add(float(latency))
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "requests": self.requests,
+            "slow_rate": round(self.slow / self.requests, 4) if self.requests else 0.0,
+        }
+        for q in QUANTILES:
+            v = self.latency.quantile(q)
+            out[f"p{int(q * 100)}_ms"] = round(v, 1) if v is not None else None
+        known = self.paths["fast"] + self.paths["llm"]
+        out["llm_share"] = round(self.paths["llm"] / known, 4) if known else None
+        return out
+
+
+def route_path(entry: Dict[str, Any]) -> str:
+    """
+    "llm" / "fast" from the per-stage breakdown; entries logged before
+    stages were recorded are "unknown".
+    """
+    stages = entry.get("stages")
+    if "llm" in entry or (stages and "llm" in stages):
+        return "llm"
+    if stages is not None:
+        return "fast"
+    return "unknown"
+
+
+Window = Tuple[float, float]
+
+
+def parse_window(text: str) -> Window:
+    """'2025-12-01..2025-12-08' (dates or ISO datetimes) -> (start, end) epoch seconds."""
+    start, _, end = text.partition("..")
+    if not end:
+        raise argparse.ArgumentTypeError("window must look like START..END")
+    return datetime.fromisoformat(start).timestamp(), datetime.fromisoformat(end).timestamp()
+
+
+class Report:
+    def __init__(self, baseline: Optional[Window] = None, current: Optional[Window] = None) -> None:
+        self.all = Group()
+        self.by_action: Dict[str, Group] = {}
+        self.by_hour: Dict[int, Group] = {}
+        self.windows: Dict[str, Tuple[Window, Group]] = {}
+        if baseline is not None:
+            self.windows["baseline"] = (baseline, Group())
+        if current is not None:
+            self.windows["current"] = (current, Group())
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        self.all.add(entry)
+        action = (entry.get("assistant_action") or {}).get("action") or "unknown"
+        self.by_action.setdefault(action, Group()).add(entry)
+
+        ts = entry.get("timestamp")
+        if isinstance(ts, (int, float)):
+            self.by_hour.setdefault(datetime.fromtimestamp(ts).hour, Group()).add(entry)
+            for (start, end), group in self.windows.values():
+                if start <= ts < end:
+                    group.add(entry)
+
+    def consume(self, entries: Iterable[Dict[str, Any]]) -> "Report":
+        for entry in entries:
+            self.add(entry)
+        return self
+
+    def regression(self, threshold: float = 0.1) -> Optional[Dict[str, Any]]:
+        """Relative change current vs baseline; regressed if p50/p90 grew > threshold."""
+        if set(self.windows) != {"baseline", "current"}:
+            return None
+        base = self.windows["baseline"][1].summary()
+        cur = self.windows["current"][1].summary()
+        deltas: Dict[str, Optional[float]] = {}
+        for key in ("p50_ms", "p90_ms", "p99_ms"):
+            b, c = base[key], cur[key]
+            deltas[key] = round((c - b) / b, 4) if b and c is not None else None
+        regressed = any(
+            d is not None and d > threshold for k, d in deltas.items() if k in ("p50_ms", "p90_ms")
+        )
+        return {"baseline": base, "current": cur, "change": deltas, "regressed": regressed}
+
+    def to_dict(self, threshold: float = 0.1) -> Dict[str, Any]:
+        return {
+            "all": self.all.summary(),
+            "paths": dict(self.all.paths),
+            "by_action": {a: g.summary() for a, g in sorted(self.by_action.items())},
+            "by_hour": {h: g.summary() for h, g in sorted(self.by_hour.items())},
+            "regression": self.regression(threshold),
+        }
+
+
+def _fmt(v: Any) -> str:
+    if v is None:
+        return "-"
+    if isinstance(v, float):
+        return f"{v:.1f}"
+    return str(v)
+
+
+def _print_table(title: str, rows: Dict[Any, Dict[str, Any]]) -> None:
+    print(f"\n{title}")
+    print(f"  {'':<20} {'requests':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'slow %':>7} {'llm %':>6}")
+    for name, s in rows.items():
+        llm = f"{100 * s['llm_share']:.0f}" if s["llm_share"] is not None else "-"
+        print(
+            f"  {str(name):<20} {s['requests']:>8} {_fmt(s['p50_ms']):>8} {_fmt(s['p90_ms']):>8} "
+            f"{_fmt(s['p99_ms']):>8} {100 * s['slow_rate']:>7.1f} {llm:>6}"
+        )
+
+
+def print_report(data: Dict[str, Any]) -> None:
+    paths = data["paths"]
+    _print_table("Overall", {"all": data["all"]})
+    print(f"  paths: fast {paths['fast']}, llm {paths['llm']}, unknown (older entries) {paths['unknown']}")
+    _print_table("Per action", data["by_action"])
+    _print_table("Per hour of day", {f"{h:02d}:00": s for h, s in data["by_hour"].items()})
+
+    reg = data["regression"]
+    if reg is not None:
+        _print_table("Windows", {"baseline": reg["baseline"], "current": reg["current"]})
+        changes = ", ".join(
+            f"{k} {100 * v:+.1f}%" if v is not None else f"{k} -" for k, v in reg["change"].items()
+        )
+        status = "[WARN] REGRESSION" if reg["regressed"] else "[OK] no regression"
+        print(f"  {status}: {changes}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latency report over the interaction log.")
+    parser.add_argument("--log", default=DEFAULT_PATH, help="SQLite store or JSONL log (default: %(default)s)")
+    parser.add_argument("--baseline", type=parse_window, help="START..END window to compare against")
+    parser.add_argument("--current", type=parse_window, help="START..END window to check")
+    parser.add_argument("--threshold", type=float, default=0.1, help="p50/p90 growth counted as a regression")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"[WARN] No log file found at {args.log}")
+        sys.exit(1)
+
+    store = open_store(args.log)
+    report = Report(args.baseline, args.current).consume(store.iter_entries())
+    store.close()
+
+    data = report.to_dict(args.threshold)
+    if args.json:
+        print(json.dumps(data, indent=2))
+    else:
+        print_report(data)
+
+    if data["regression"] is not None and data["regression"]["regressed"]:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()